@@ -2,4 +2,84 @@
 
 """
 Demonstrates using Enharmony to parse Last.fm data.
+
+Fetches a user's scrobble history (or a synthetic one from a local mock
+server with --mock) and streams each page into the duplicate index.
 """
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+try:
+    from enharmony import lastfm, synthetic
+    from enharmony.index import DedupIndex
+except ImportError:  # run from a source checkout
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from enharmony import lastfm, synthetic
+    from enharmony.index import DedupIndex
+
+
+async def demo(args):
+    """Fetch the history, index it as it arrives, and show the duplicates."""
+    server = None
+    url, user, key = lastfm.API, args.user, args.api_key
+    if args.mock:
+        library = synthetic.generate(args.mock, seed=args.seed)
+        server = lastfm.MockServer(library, user=user, api_key=key or 'key',
+                                   fail_every=args.fail_every, delay=args.delay)
+        url, key = await server.start(), key or 'key'
+    elif not key:
+        sys.exit("an API key is required (--api-key or LASTFM_API_KEY)")
+
+    fetcher = lastfm.Fetcher(user, key, url=url, concurrency=args.concurrency,
+                             rate=args.rate or None)
+    index = DedupIndex(strategy=args.blocking)
+    start = time.perf_counter()
+    try:
+        async for _, song in fetcher.songs():
+            index.add(song, len(index))
+            index.events.clear()
+    finally:
+        if server:
+            await server.close()
+    elapsed = time.perf_counter() - start
+
+    clusters = sorted(index.clusters.values(), key=len, reverse=True)
+    for members in clusters[:args.show]:
+        print()
+        for song_id in sorted(members):
+            print(index[song_id])
+    print()
+    print("{0:,} scrobbles, {1:,} duplicate clusters".format(len(index), len(clusters)))
+    print("{0:,} requests ({1:,} retried) in {2:.2f}s".format(
+        fetcher.requests, fetcher.retried, elapsed))
+
+
+def main():
+    """Parse the arguments and run the demo."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('user', nargs='?', default='user', help="Last.fm user name")
+    parser.add_argument('--api-key', default=os.getenv('LASTFM_API_KEY'), help="Last.fm API key")
+    parser.add_argument('--mock', type=int, metavar='COUNT',
+                        help="serve COUNT synthetic scrobbles from a local mock server")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the synthetic history")
+    parser.add_argument('--fail-every', type=int, metavar='N',
+                        help="mock server fails every Nth request")
+    parser.add_argument('--delay', type=float, default=0.05, help="mock server latency (seconds)")
+    parser.add_argument('-j', '--concurrency', type=int, default=4, help="requests in flight")
+    parser.add_argument('--rate', type=float, default=5.0, help="requests per second (0: unlimited)")
+    parser.add_argument('-b', '--blocking', default='artist', help="blocking strategy")
+    parser.add_argument('--show', type=int, default=5, help="number of clusters to print")
+    args = parser.parse_args()
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(demo(args))
+    finally:
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -17,5 +17,6 @@ try:
     from enharmony.title import Title
     from enharmony.artist import Artist
     from enharmony.album import Album
+    from enharmony.tools import match
 except ImportError:  # pragma: no cover (manual test)
     pass
@@ -8,8 +8,9 @@ from comparable.base import Similarity, Comparable
 from comparable.simple import Number, TextTitle, TextEnum
 from comparable.compound import Group
 
-from enharmony.base import TextList
-from enharmony import settings
+from enharmony.base import TextList, Flyweight
+from enharmony.config import Setting, current
+from enharmony import metrics
 
 
 RE_FEATURING = r"""
@@ -28,17 +29,25 @@ RE_KIND = r"""
 """.strip()
 
 
-class Year(Number):
+def _kinds(config):
+    """Compile a pattern for each bracketed album kind."""
+    return [(kind, re.compile(RE_KIND.replace('<kind>', kind), re.IGNORECASE | re.VERBOSE))
+            for kind in config.KINDS]
+
+
+class Year(Number, metaclass=Flyweight):
 
     """Comparable album year."""
 
-    threshold = settings.ALBUM_YEAR_THRESHOLD
+    threshold = Setting('ALBUM_YEAR_THRESHOLD')
 
     def __init__(self, value):
         self.value = value
 
     def equality(self, other):
         """Get equality allowing for blanks."""
+        if self is other:
+            return True
         if not self and not other:
             return True
         elif False in (bool(self), bool(other)):
@@ -48,11 +57,11 @@ class Year(Number):
 
     def similarity(self, other):
         """Mathematical comparison of years."""
-        if not self or not other:
+        if self is other or not self or not other:
             return self.Similarity(1.0)
         else:
             delta = int(abs(self.value - other.value))
-            logging.debug("delta: {}".format(delta))
+            logging.debug("delta: %s", delta)
             if delta == 0:
                 return self.Similarity(1.0,)
             elif delta == 1:
@@ -61,7 +70,7 @@ class Year(Number):
                 return self.Similarity(0.0,)
 
 
-class Kind(TextEnum):
+class Kind(TextEnum, metaclass=Flyweight):
 
     """Comparable album kind."""
 
@@ -71,9 +80,13 @@ class Kind(TextEnum):
         else:
             return super().__str__()
 
+    def equality(self, other):
+        """Get equality short-circuiting on shared instances."""
+        return self is other or super().equality(other)
+
     def similarity(self, other):
         """Get similarity allowing for blanks."""
-        if not self or not other:
+        if self is other or not self or not other:
             return self.Similarity(1.0)
         else:
             return super().similarity(other)
@@ -83,8 +96,8 @@ class Name(CompoundComparable):
 
     """Comparable album name."""
 
-    threshold = settings.ALBUM_NAME_THRESHOLD
-    attributes = settings.ALBUM_NAME_WEIGHTS
+    threshold = Setting('ALBUM_NAME_THRESHOLD')
+    attributes = Setting('ALBUM_NAME_WEIGHTS')
 
     def __init__(self, title, kind=None):
         """Initialize a new album.
@@ -93,7 +106,7 @@ class Name(CompoundComparable):
         @param kind: album type
 
         """
-        self.title, self.kind, self.featuring = self._split(title)
+        self.title, self.kind, self.featuring = self._split(title or "")
         self.kind = self.kind or Kind(kind)
 
     def __repr__(self):
@@ -117,36 +130,36 @@ class Name(CompoundComparable):
         """Split an album title into parts.
 
         @param text: string to split into parts
-        @return: title, kind
+        @return: title, kind, featuring
         """
         kind = featuring = None
         # Strip featured artists
         match = re.search(RE_FEATURING, text, re.IGNORECASE | re.VERBOSE)
         if match:
-            featuring = match.group(1)
-            logging.debug("match found: {0}".format(featuring))
+            featuring = TextList(match.group(1))
+            logging.debug("match found: %s", featuring)
             text = text.replace(match.group(0), '').strip()  # remove the match from the remaining text
         # Strip album kind
-        for kind in settings.KINDS:
-            re_kind = RE_KIND.replace('<kind>', kind)
-            match = re.search(re_kind, text, re.IGNORECASE | re.VERBOSE)
+        for kind, pattern in current().compiled('kinds', ('KINDS',), _kinds):
+            match = pattern.search(text)
             if match:
-                logging.debug("match found: {0}".format(kind))
+                logging.debug("match found: %s", kind)
                 text = text.replace(match.group(0), '').strip()  # remove the match from the remaining text
                 break
         else:
             kind = None
         # Return parts
-        return TextTitle(text), Kind(kind), featuring  # TODO: featuring not used
+        return TextTitle(text), Kind(kind), featuring
 
 
 class Album(CompoundComparable):
 
     """Comparable album."""
 
-    threshold = settings.ALBUM_THRESHOLD
-    attributes = settings.ALBUM_WEIGHTS
+    threshold = Setting('ALBUM_THRESHOLD')
+    attributes = Setting('ALBUM_WEIGHTS')
 
+    @metrics.timed('album.parse')
     def __init__(self, name, year=None, kind=None, featuring=None):
         """Initialize a new album.
 
@@ -154,7 +167,8 @@ class Album(CompoundComparable):
         """
         self.name = Name(name)
         self.name.kind = self.name.kind or Kind(kind)
-        self.name.featuring = self.name.featuring or featuring  # TODO: featuring not used
+        if not self.name.featuring and featuring:
+            self.name.featuring = TextList(featuring)
         self.year = Year(year)
 
     def __repr__(self):
@@ -163,16 +177,14 @@ class Album(CompoundComparable):
         if self.name.kind:
             kwargs['kind'] = self.name.kind
         if self.name.featuring:
-            kwargs['featuring'] = self.name.featuring
+            kwargs['featuring'] = str(self.name.featuring)
         return self._repr(self.name, self.year, **kwargs)
 
     def __str__(self):
         """Format the album as a string."""
         parts = []
         if self.name:
-            parts.append(self.name)
-        if self.kind:
-            parts.append("[{kind}]".format(kind=self.kind))
+            parts.append(self.name)  # includes the album's kind
         if self.year:
             pass  # year is not part of the album's string representation
         return ' '.join(str(part) for part in parts)
@@ -189,14 +201,13 @@ class Album(CompoundComparable):
         match = re.search(RE_FEATURING, text, re.IGNORECASE | re.VERBOSE)
         if match:
             featuring = match.group(1)
-            logging.debug("match found: {0}".format(featuring))
+            logging.debug("match found: %s", featuring)
             text = text.replace(match.group(0), '').strip()  # remove the match from the remaining text
         # Strip song kinds
-        for kind in settings.KINDS:
-            re_kind = RE_KIND.replace('<kind>', kind)
-            match = re.search(re_kind, text, re.IGNORECASE | re.VERBOSE)
+        for kind, pattern in current().compiled('kinds', ('KINDS',), _kinds):
+            match = pattern.search(text)
             if match:
-                logging.debug("match found: {0}".format(kind))
+                logging.debug("match found: %s", kind)
                 text = text.replace(match.group(0), '').strip()  # remove the match from the remaining text
                 break
         else:
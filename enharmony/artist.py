@@ -1,10 +1,12 @@
 """Artist class used by song objects."""
 
-from comparable import CompoundComparable
 from comparable.compound import Group
 
+from enharmony.base import TextList, Flyweight, parse_string, normalize
+from enharmony import phonetic, translit, distance, config, metrics
 
-class Artist(Group):
+
+class Artist(Group, metaclass=Flyweight):
 
     """Stores a song's artist name and provides comparison algorithms."""
 
@@ -13,24 +15,79 @@ class Artist(Group):
 
         @param name: provided name of song's artist
         """
-        self.name = self._parse_string(name, "artist name")
-        super(Artist, self).__init__()
+        self.name = parse_string(name, "artist name")
+        super(Artist, self).__init__(TextList.fromstring(self.name).items)
 
     def __str__(self):
         """Format the artist name as a string."""
-        return self.name
+        return self.name or ""
 
     def __repr__(self):
         """Represent the artist name object."""
-        return self._get_repr([self.name])
+        return self._repr(self.name)
+
+    @property
+    def keys(self):
+        """Get the normalized full name as the only credited artist.
+
+        Commas and joiners in a primary name often belong to one band (e.g.
+        "Earth, Wind & Fire"), so the name is not split into credits.
+        """
+        key = normalize(self.name)
+        return (key,) if key else ()
+
+    @property
+    def phonetic(self):
+        """Get the phonetic key of the artist name (computed once per config)."""
+        stamp = config.current().stamp(*phonetic.FIELDS)
+        try:
+            if self._phonetic[0] == stamp:
+                return self._phonetic[1]
+        except AttributeError:
+            pass
+        self._phonetic = (stamp, phonetic.encode(self.name or ""))  # pylint: disable=W0201
+        return self._phonetic[1]
 
+    @property
+    def latin(self):
+        """Get the Latin key of the artist name (computed once per config)."""
+        stamp = config.current().stamp(*translit.FIELDS)
+        try:
+            if self._latin[0] == stamp:
+                return self._latin[1]
+        except AttributeError:
+            pass
+        self._latin = (stamp, translit.key(self.name))  # pylint: disable=W0201
+        return self._latin[1]
+
+    def _transliterated(self, other):
+        """Determine if two artists share a Latin key (when enabled)."""
+        if not translit.enabled() or not isinstance(other, Artist):
+            return False
+        return bool(self.latin) and self.latin == other.latin
+
+    def equality(self, other):
+        """Determine if two artists are equal (shared instances always are)."""
+        return self is other or self._transliterated(other) or super(Artist, self).equality(other)
+
+    @metrics.timed('artist.similarity')
     def similarity(self, other):
         """Calculate percent similarity between two artists.
 
         @return: 0.0 to 1.0 where 1.0 indicates the two artist names should be considered equal
         """
         # Compare types
+        if self is other:
+            return self.Similarity(1.0)
         if type(self) != type(other):
-            return 0.0
+            return self.Similarity(0.0)
+        if self._transliterated(other):
+            return self.Similarity(1.0)
         # Compare attributes
-        return self._compare_text_lists(self.name, other.name)
+        if distance.enabled():
+            return self.Similarity(distance.ratio(normalize(self.name), normalize(other.name),
+                                                  config.current().TEXT_SIMILARITY_MINIMUM))
+        return super(Artist, self).similarity(other)
+
+
+config.subscribe(('JOINERS',), Artist._instances.clear)  # shared artists are split on joiners
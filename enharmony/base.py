@@ -1,10 +1,116 @@
 """Base class to extended by other song attribute classes."""
 
+import re
+import logging
+import weakref
+import functools
+from abc import ABCMeta
 
 from comparable import CompoundComparable
-from comparable.simple import TextTitle
+from comparable import simple
 from comparable.compound import Group
 
+from enharmony import config, metrics
+
+
+def parse_string(value, name):
+    """Convert a value to a stripped string.
+
+    @param value: value to convert
+    @param name: description of the value for logging
+    @return: string or None if the value is blank
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        logging.debug("blank %s: %r", name, value)
+        return None
+    return text
+
+
+def parse_int(value, name):
+    """Convert a value to an integer.
+
+    @param value: value to convert
+    @param name: description of the value for logging
+    @return: integer or None if the value cannot be converted
+    """
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        logging.debug("invalid %s: %r", name, value)
+        return None
+
+
+def normalize(text):
+    """Get a normalized key for comparing names.
+
+    @param text: name to normalize
+    @return: lowercase text with joiners replaced and articles stripped
+    """
+    if not text:
+        return ""
+    current = config.current()
+    words = str(text).lower().split()
+    words = ['and' if word in current.JOINERS else word for word in words]
+    if len(words) > 1 and words[0] in current.ARTICLES:
+        words = words[1:]
+    return ' '.join(words)
+
+
+def _joiners(current):
+    """Compile a pattern that splits names on commas and joiners."""
+    joiners = [r"\b{0}\b".format(re.escape(joiner)) if joiner.isalpha() else re.escape(joiner)
+               for joiner in current.JOINERS]
+    return re.compile(r"\s*(?:,|{0})\s*".format('|'.join(joiners)), re.IGNORECASE)
+
+
+class Flyweight(ABCMeta):
+
+    """Metaclass to share one instance between equal immutable values.
+
+    Instances are registered by the types and values of their constructor
+    arguments (so 1999.0 and True do not return the instance for 1999 or
+    1) and only held while in use elsewhere, so rare values do not accumulate.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super(Flyweight, cls).__init__(name, bases, namespace)
+        cls._instances = weakref.WeakValueDictionary()
+        cls.__reduce__ = Flyweight._reduce
+        metrics.gauge('flyweight.{0}.size'.format(name.lower()), lambda: len(cls._instances))
+
+    def __call__(cls, *args, **kwargs):
+        key = tuple((type(arg), arg) for arg in args)
+        key += tuple((name, type(value), value) for name, value in sorted(kwargs.items()))
+        try:
+            instance = cls._instances.get(key)
+        except TypeError:  # unhashable arguments are not shared
+            instance = None
+        else:
+            if instance is not None:
+                metrics.count('flyweight.hits')
+                return instance
+            metrics.count('flyweight.misses')
+        instance = super(Flyweight, cls).__call__(*args, **kwargs)
+        instance._arguments = (args, kwargs)  # pylint: disable=W0212
+        try:
+            cls._instances[key] = instance
+        except TypeError:
+            pass
+        return instance
+
+    @staticmethod
+    def _reduce(instance):
+        """Pickle an instance as a call to its class, so it is shared again when loaded."""
+        args, kwargs = instance._arguments  # pylint: disable=W0212
+        if kwargs:
+            return functools.partial(type(instance), **kwargs), args
+        return type(instance), args
+
 
 class TextTitle(CompoundComparable):
 
@@ -48,8 +154,33 @@ class TextTitle(CompoundComparable):
 
 class TextList(Group):
 
-    """TBD."""
+    """Comparable list of names parsed from joined text."""
+
+    def __init__(self, text):
+        self.text = text or ""
+        super(TextList, self).__init__(self._split(self.text))
+
+    def __repr__(self):
+        return self._repr(self.text)
+
+    def __str__(self):
+        return ', '.join(str(item) for item in self.items)
+
+    @staticmethod
+    def fromstring(text):
+        """Return a new instance parsed from text."""
+        if text is None:
+            return TextList("")
+        else:
+            return TextList(text)
 
     @staticmethod
-    def fromtext(text):
-        pass
+    def _split(text):
+        """Split text into names on commas and joiners.
+
+        @param text: string to split into names
+        @return: list of comparable names
+        """
+        pattern = config.current().compiled('joiners', ('JOINERS',), _joiners)
+        names = pattern.split(text.strip())
+        return [simple.TextTitle(name) for name in names if name]
@@ -0,0 +1,171 @@
+"""Benchmarks of parsing, comparison and deduplication on synthetic libraries."""
+
+import json
+import time
+import logging
+import tracemalloc
+
+from enharmony import records, synthetic
+from enharmony.dedupe import dedupe
+
+SIZES = (1000, 5000)
+HIGHER = ('parse', 'compare', 'shared')  # rates: lower values are regressions
+LOWER = ('dedupe', 'memory')  # costs: higher values are regressions
+
+
+def _best(function, repeat):
+    """Get the fastest of several timed calls and the last result."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return max(best, 1e-9), result
+
+
+def _parsed(record):
+    """Create a song and parse all of its (lazy) attributes."""
+    song = records.song(record)
+    song.title, song.artist, song.album  # pylint: disable=W0104
+    return song
+
+
+def parse(library, repeat=3):
+    """Measure the rate records are fully parsed into songs.
+
+    @param library: list of song records
+    @param repeat: number of runs to take the fastest of
+    @return: songs per second, list of songs
+    """
+    elapsed, songs = _best(lambda: [_parsed(record) for record in library], repeat)
+    return len(library) / elapsed, songs
+
+
+def compare(songs, repeat=3, limit=10000):
+    """Measure the rate songs are compared.
+
+    Each song is compared with the next song by the same artist, so the
+    pairs resemble the candidates produced by blocking.
+
+    @param songs: list of songs
+    @param repeat: number of runs to take the fastest of
+    @param limit: largest number of pairs to compare
+    @return: comparisons per second
+    """
+    previous, pairs = {}, []
+    for song in songs:
+        key = str(song.artist)
+        if key in previous:
+            pairs.append((previous[key], song))
+        previous[key] = song
+    pairs = pairs[:limit] or list(zip(songs, songs[1:]))[:limit]
+    elapsed, _ = _best(lambda: [song1.similarity(song2) for song1, song2 in pairs], repeat)
+    return len(pairs) / elapsed
+
+
+def shared(songs):
+    """Measure how many parsed parts reuse an interned instance.
+
+    Artists, album years and album kinds are shared through the
+    Flyweight registry, so a library with repeated values creates far
+    fewer objects than it has parts.
+
+    @param songs: list of parsed songs
+    @return: share of the parts that did not need a new instance (0.0 to 1.0)
+    """
+    parts = [part for song in songs for part in (song.artist, song.album.year, song.album.name.kind)]
+    if not parts:
+        return 0.0
+    return 1.0 - len({id(part) for part in parts}) / len(parts)
+
+
+def end_to_end(library, strategy='artist', repeat=1):
+    """Measure the time and memory to parse and deduplicate a library.
+
+    Memory is measured in a separate traced run so tracing does not
+    slow down the timed runs.
+
+    @param library: list of song records
+    @param strategy: name of a blocking strategy in blocking.STRATEGIES
+    @param repeat: number of timed runs to take the fastest of
+    @return: seconds, peak bytes allocated, list of clusters
+    """
+    def run():
+        """Parse and deduplicate the library."""
+        return dedupe((records.song(record) for record in library), strategy=strategy)
+
+    elapsed, clusters = _best(run, repeat)
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return elapsed, peak, clusters
+
+
+def run(sizes=SIZES, seed=0, repeat=3, strategy='artist'):
+    """Run every benchmark on synthetic libraries of several sizes.
+
+    @param sizes: numbers of records per library
+    @param seed: random seed for the synthetic libraries
+    @param repeat: number of runs to take the fastest of
+    @param strategy: name of a blocking strategy in blocking.STRATEGIES
+    @return: dictionary of size (as text) to dictionary of metrics
+    """
+    results = {}
+    for size in sizes:
+        library = synthetic.generate(size, seed=seed)
+        parsed, songs = parse(library, repeat)
+        compared = compare(songs, repeat)
+        interned = shared(songs)
+        elapsed, peak, clusters = end_to_end(library, strategy)
+        results[str(size)] = {'parse': parsed,
+                              'compare': compared,
+                              'shared': interned,
+                              'dedupe': elapsed,
+                              'memory': peak,
+                              'clusters': len(clusters)}
+        logging.info("{0:,} songs: {1:,.0f} parsed/s, {2:,.0f} compared/s, {3:.0%} shared, "
+                     "{4:.2f}s dedupe, {5:.1f} MB".format(size, parsed, compared, interned, elapsed,
+                                                          peak / 1024 / 1024))
+    return results
+
+
+def regressions(results, baseline, tolerance=0.2):
+    """Find metrics that are worse than a baseline.
+
+    @param results: dictionary returned by run()
+    @param baseline: dictionary returned by an earlier run()
+    @param tolerance: allowed ratio of change before reporting
+    @return: list of messages describing each regression
+    """
+    messages = []
+    for size, metrics in sorted(results.items(), key=lambda item: int(item[0])):
+        expected = baseline.get(size, {})
+        for name in HIGHER + LOWER:
+            if name not in metrics or not expected.get(name):
+                continue
+            change = metrics[name] / expected[name] - 1.0
+            if (name in HIGHER and change < -tolerance) or (name in LOWER and change > tolerance):
+                messages.append("{0} songs: {1} changed {2:+.1%} ({3:,.2f} -> {4:,.2f})".format(
+                    size, name, change, expected[name], metrics[name]))
+    return messages
+
+
+def load(path):
+    """Read baseline results from a JSON file."""
+    with open(path) as stream:
+        return json.load(stream)
+
+
+def save(path, results):
+    """Write baseline results to a JSON file."""
+    with open(path, 'w') as stream:
+        json.dump(results, stream, indent=2, sort_keys=True)
+        stream.write('\n')
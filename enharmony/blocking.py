@@ -0,0 +1,212 @@
+"""Blocking keys to limit which songs are compared with each other."""
+
+from enharmony import translit
+
+SEPARATOR = '\x1f'  # joins a block's key with the secondary key that split it
+DURATION_BUCKET = 30  # seconds per duration bucket
+DURATION_OVERLAP = 2  # seconds near a bucket's end that also go in the next bucket
+
+
+def artist(song):
+    """Block songs by their normalized artist name."""
+    return (song.artist_key,)
+
+
+def title(song):
+    """Block songs by their normalized title name."""
+    return (song.title_key,)
+
+
+def sounds(song):
+    """Block songs by the phonetic key of their artist name."""
+    return (song.phonetic,)
+
+
+def latin(song):
+    """Block songs by their artist name and its Latin transliteration."""
+    primary, transliterated = song.artist_key, song.latin_key
+    return (primary,) if transliterated == primary else (primary, transliterated)
+
+
+def credited(song):
+    """Block songs by each credited artist (primary and featured)."""
+    return song.credits or ("",)
+
+
+STRATEGIES = {'artist': artist,
+              'title': title,
+              'credits': credited,
+              'phonetic': sounds,
+              'latin': latin}
+
+
+def keys(song, strategy='artist'):
+    """Get the blocking keys for a song.
+
+    @param song: song to get keys for
+    @param strategy: name of a blocking strategy in STRATEGIES
+    @return: tuple of keys
+    """
+    return STRATEGIES[strategy](song)
+
+
+def blocks(songs, strategy='artist', maximum=None, report=None):
+    """Group songs by blocking key.
+
+    @param songs: list of songs
+    @param strategy: name of a blocking strategy in STRATEGIES
+    @param maximum: (optional) split blocks larger than this (see adapt)
+    @param report: (optional) dictionary to fill with block statistics
+    @return: dictionary of key to list of song indices
+    """
+    groups = {}
+    for index, song in enumerate(songs):
+        for key in keys(song, strategy):
+            groups.setdefault(key, []).append(index)
+    if report is not None:
+        report['before'] = statistics(groups)
+    if maximum:
+        groups = adapt(songs, groups, maximum, report=report)
+    if report is not None:
+        report['after'] = statistics(groups)
+    return groups
+
+
+def _prefix(song):
+    """Get the first letters of a song's normalized or Latin title key."""
+    if translit.enabled():
+        return translit.key(song.title.name)[:3],
+    return (song.title_key or "")[:3],
+
+
+def _duration(song):
+    """Get the duration bucket of a song (two near a bucket's end, none if unknown)."""
+    if song.duration is None:
+        return ()
+    first = song.duration // DURATION_BUCKET
+    last = (song.duration + DURATION_OVERLAP) // DURATION_BUCKET
+    return tuple(str(bucket) for bucket in range(first, last + 1))
+
+
+def _year(song):
+    """Get the album year of a song (none if unknown)."""
+    year = song.album.year.value
+    return () if year is None else (str(year),)
+
+
+SECONDARY = (('title', _prefix), ('duration', _duration), ('year', _year))
+
+
+def adapt(songs, groups, maximum=1000, minimum=None, report=None):
+    """Split oversized blocks with secondary keys and merge the tiny parts.
+
+    Blocks larger than the maximum are split by title prefix, then by
+    duration bucket, then by album year until every part fits. Parts
+    smaller than the minimum are merged with other parts of the same
+    block, so splitting does not scatter songs into blocks too small to
+    find their duplicates. Blocks of identical songs that no secondary
+    key can split are kept whole.
+
+    Song.similarity requires equal titles, so title prefixes never
+    separate duplicates; with TRANSLITERATE the prefix comes from the Latin
+    key, which titles in different scripts share. Duration buckets overlap
+    near their ends, but duplicates whose durations or album years differ
+    more can be split apart, which is the price of bounding the largest block.
+    Songs without a duration or album year join every part split by it, so
+    they are still compared with their duplicates that have one.
+
+    @param songs: list of songs
+    @param groups: dictionary of key to list of song indices from blocks()
+    @param maximum: largest number of songs per block
+    @param minimum: (optional) smallest part kept on its own (default: maximum / 10)
+    @param report: (optional) dictionary to add split and merge counts to
+    @return: dictionary of key to list of song indices
+    """
+    minimum = max(2, maximum // 10) if minimum is None else minimum
+    counts = {'split': 0, 'merged': 0, 'unsplittable': 0}
+    result = {}
+    for key, indices in groups.items():
+        if len(indices) <= maximum:
+            result[key] = indices
+            continue
+        counts['split'] += 1
+        for part, members in _split(songs, key, indices, maximum, 0, counts):
+            result[part] = members
+    for key, indices in list(result.items()):
+        if len(indices) < minimum and SEPARATOR in key:
+            del result[key]
+            result.setdefault(key.split(SEPARATOR, 1)[0] + SEPARATOR + '*', []).append(indices)
+            counts['merged'] += 1
+    for key in [key for key in result if key.endswith(SEPARATOR + '*')]:
+        parts = result.pop(key)
+        for number, members in enumerate(_pack(parts, maximum)):
+            result["{0}{1}".format(key, number)] = members
+    if report is not None:
+        report.update(counts)
+    return result
+
+
+def _split(songs, key, indices, maximum, level, counts):
+    """Get the (key, indices) parts of an oversized block."""
+    if level == len(SECONDARY):
+        counts['unsplittable'] += 1
+        return [(key, indices)]
+    name, function = SECONDARY[level]
+    parts = {}
+    unknown = []
+    for index in indices:
+        secondaries = function(songs[index])
+        if not secondaries:
+            unknown.append(index)
+        for secondary in secondaries:
+            parts.setdefault(secondary, []).append(index)
+    if len(parts) <= 1:
+        return _split(songs, key, indices, maximum, level + 1, counts)
+    results = []
+    for secondary, members in sorted(parts.items()):
+        if unknown:
+            members = sorted(members + unknown)
+        part = "{0}{1}{2}={3}".format(key, SEPARATOR, name, secondary)
+        if len(members) > maximum:
+            results.extend(_split(songs, part, members, maximum, level + 1, counts))
+        else:
+            results.append((part, members))
+    return results
+
+
+def _pack(parts, maximum):
+    """Merge lists of indices into as few lists as fit in a maximum."""
+    bins = []
+    for members in sorted(parts, key=len, reverse=True):
+        for bin_ in bins:
+            if len(bin_) + len(members) <= maximum:
+                bin_.update(members)
+                break
+        else:
+            bins.append(set(members))
+    return [sorted(bin_) for bin_ in bins]
+
+
+def statistics(groups):
+    """Summarize the sizes of blocks and the comparisons they need.
+
+    @param groups: dictionary of key to list of song indices
+    @return: dictionary of statistics
+    """
+    sizes = sorted((len(indices) for indices in groups.values() if len(indices) > 1), reverse=True)
+    pairs = [size * (size - 1) // 2 for size in sizes]
+    total = sum(pairs)
+    top = max(1, len(sizes) // 100)
+
+    def percentile(share):
+        """Get the block size at a percentile (largest first)."""
+        return sizes[min(len(sizes) - 1, int(len(sizes) * (1 - share)))] if sizes else 0
+
+    return {'blocks': len(sizes),
+            'members': sum(sizes),
+            'largest': sizes[0] if sizes else 0,
+            'median': percentile(0.5),
+            'p90': percentile(0.9),
+            'p99': percentile(0.99),
+            'pairs': total,
+            'top_share': sum(pairs[:top]) / total if total else 0.0}
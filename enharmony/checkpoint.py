@@ -0,0 +1,116 @@
+"""Checkpoints to resume long-running dedupe jobs."""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from array import array
+
+
+class Checkpoint(object):
+
+    """Periodically persisted progress of a dedupe run.
+
+    Blocks are scored in a deterministic order, so progress is the number
+    of completed blocks (the cursor) plus the union-find state. Merging
+    duplicates is idempotent, so rescoring a block after a crash between
+    writes cannot change the result.
+    """
+
+    STATE = 'state.json'
+    PARENTS = 'parents.bin'
+
+    def __init__(self, directory, interval=60.0):
+        """Initialize a new checkpoint.
+
+        @param directory: local directory to store progress in
+        @param interval: minimum seconds between saves
+        """
+        self.directory = directory
+        self.interval = interval
+        self.fingerprint = None
+        self.skipped = {'blocks': 0, 'candidates': 0, 'comparisons': 0}
+        self._saved = time.time()
+
+    @staticmethod
+    def digest(items):
+        """Get a fingerprint identifying a run's input and blocking.
+
+        @param items: iterable of JSON-serializable items (other values are hashed as text)
+        @return: hex digest string
+        """
+        sha = hashlib.sha1()
+        for item in items:
+            sha.update(json.dumps(item, sort_keys=True, default=str).encode('utf-8'))
+        return sha.hexdigest()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def restore(self, fingerprint, clusters):
+        """Load the saved progress for a run.
+
+        @param fingerprint: digest of the run's input and blocking
+        @param clusters: Clusters to restore the union-find state into
+        @return: number of blocks already completed
+        """
+        self.fingerprint = fingerprint
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        try:
+            with open(self._path(self.STATE)) as stream:
+                state = json.load(stream)
+            parents = array('q')
+            with open(self._path(self.PARENTS), 'rb') as stream:
+                parents.frombytes(stream.read())
+        except (IOError, ValueError) as error:
+            logging.debug("no checkpoint restored: %s", error)
+            return 0
+        if state['fingerprint'] != fingerprint or len(parents) != len(clusters):
+            logging.warning("checkpoint in {0} is for a different run".format(self.directory))
+            return 0
+
+        clusters.parent = parents
+        self.skipped['blocks'] = state['cursor']
+        self.skipped['comparisons'] = state['comparisons']
+        return state['cursor']
+
+    def skip(self, sizes):
+        """Report the work skipped by resuming.
+
+        @param sizes: sizes of the blocks already completed
+        """
+        self.skipped['candidates'] = sum(size * (size - 1) // 2 for size in sizes)
+        if self.skipped['blocks']:
+            logging.info("resuming after {blocks:,} blocks, skipping {candidates:,} candidate pairs "
+                         "and {comparisons:,} comparisons".format(**self.skipped))
+
+    def update(self, cursor, clusters, comparisons, force=False):
+        """Record progress, saving it when the interval has elapsed.
+
+        @param cursor: number of blocks completed
+        @param clusters: current Clusters
+        @param comparisons: comparisons performed since restoring
+        @param force: save regardless of the interval
+        """
+        if force or time.time() - self._saved >= self.interval:
+            self.save(cursor, clusters, comparisons)
+
+    def save(self, cursor, clusters, comparisons):
+        """Atomically write the current progress to the directory."""
+        state = {'fingerprint': self.fingerprint,
+                 'cursor': cursor,
+                 'comparisons': self.skipped['comparisons'] + comparisons}
+        # Parents are replaced first: a newer union-find with an older
+        # cursor only causes completed blocks to be scored again
+        temp = self._path(self.PARENTS + '.tmp')
+        with open(temp, 'wb') as stream:
+            stream.write(clusters.parent.tobytes())
+        os.replace(temp, self._path(self.PARENTS))
+        temp = self._path(self.STATE + '.tmp')
+        with open(temp, 'w') as stream:
+            json.dump(state, stream)
+        os.replace(temp, self._path(self.STATE))
+        self._saved = time.time()
+        logging.debug("saved checkpoint after %s blocks", cursor)
@@ -0,0 +1,391 @@
+"""Command-line interface for Enharmony."""
+
+import os
+import sys
+import argparse
+import logging
+
+from enharmony import VERSION
+from enharmony import settings
+from enharmony import blocking, records, external, benchmark, shard, scan, metrics, estimate
+from enharmony.dedupe import Stats, MemoryLimitError, dedupe
+from enharmony.checkpoint import Checkpoint
+from enharmony.graph import Graph
+from enharmony.song import Song
+from enharmony.server import serve
+
+
+def main(args=None):
+    """Process command-line arguments and run the program."""
+    parser = argparse.ArgumentParser(prog='enharmony', description="Locate duplicate songs.")
+    parser.add_argument('--version', action='version', version=VERSION)
+    parser.add_argument('-v', '--verbose', action='count', default=0, help="enable verbose logging")
+    subparsers = parser.add_subparsers(dest='command')
+
+    sub = subparsers.add_parser('dedupe', help="write clusters of duplicate songs as JSON lines")
+    sub.add_argument('input', help="file of song records ('-' for stdin)")
+    sub.add_argument('-o', '--output', default='-', help="file for duplicate clusters ('-' for stdout)")
+    sub.add_argument('-f', '--format', choices=('jsonl', 'csv'), help="input format (default: from extension)")
+    sub.add_argument('-j', '--workers', type=int, default=1, metavar='N', help="number of scoring processes")
+    sub.add_argument('-m', '--memory', type=int, metavar='MB', help="abort when peak memory exceeds this cap")
+    sub.add_argument('-b', '--blocking', choices=sorted(blocking.STRATEGIES), default='artist',
+                     help="blocking strategy to select candidate pairs")
+    sub.add_argument('-i', '--interval', type=float, default=5.0, metavar='SEC',
+                     help="seconds between progress reports")
+    sub.add_argument('--out-of-core', action='store_true',
+                     help="spill sorted blocks to disk instead of loading the whole library")
+    sub.add_argument('--run-size', type=int, default=100000, metavar='N',
+                     help="records held in memory per sorted run (out-of-core)")
+    sub.add_argument('--temp', metavar='DIR', help="directory for sorted runs (out-of-core)")
+    sub.add_argument('-c', '--checkpoint', metavar='DIR', help="save progress to (and resume from) a directory")
+    sub.add_argument('--checkpoint-interval', type=float, default=60.0, metavar='SEC',
+                     help="seconds between checkpoint saves")
+    sub.add_argument('--max-block', type=int, metavar='N',
+                     help="split blocks larger than this by title prefix, duration and year")
+    sub.add_argument('--preparse', action='store_true',
+                     help="load every record and parse distinct titles and albums in the worker processes")
+    sub.add_argument('--metrics', metavar='PATH', help="write stage counters and timers (Prometheus text)")
+    sub.add_argument('--profile', metavar='PATH', help="write sampled stacks (collapsed flame graph format)")
+    sub.add_argument('--profile-after', type=float, default=0.0, metavar='SEC',
+                     help="only start sampling once a run takes this long")
+
+    sub = subparsers.add_parser('serve', help="serve match and dedupe requests over HTTP")
+    sub.add_argument('input', nargs='?', help="file of song records to index")
+    sub.add_argument('-f', '--format', choices=('jsonl', 'csv'), help="input format (default: from extension)")
+    sub.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    sub.add_argument('-p', '--port', type=int, default=8000, help="port to listen on")
+    sub.add_argument('-j', '--workers', type=int, default=1, metavar='N', help="number of scoring processes")
+    sub.add_argument('-b', '--blocking', choices=sorted(blocking.STRATEGIES), default='artist',
+                     help="blocking strategy to select candidates")
+    sub.add_argument('--batch-size', type=int, default=64, metavar='N', help="largest micro-batch")
+    sub.add_argument('--batch-delay', type=float, default=0.005, metavar='SEC',
+                     help="seconds to wait for a micro-batch to fill")
+
+    sub = subparsers.add_parser('partition', help="split song records into shards by blocking key")
+    sub.add_argument('input', help="file of song records ('-' for stdin)")
+    sub.add_argument('directory', help="directory for the shard files and manifest")
+    sub.add_argument('-f', '--format', choices=('jsonl', 'csv'), help="input format (default: from extension)")
+    sub.add_argument('-n', '--shards', type=int, default=4, metavar='N', help="number of shards")
+    sub.add_argument('-b', '--blocking', choices=sorted(blocking.STRATEGIES), default='artist',
+                     help="blocking strategy to partition by")
+    sub.add_argument('--run', action='store_true', help="also dedupe every shard in local processes")
+    sub.add_argument('-j', '--workers', type=int, metavar='N', help="number of local processes (with --run)")
+
+    sub = subparsers.add_parser('shard', help="find duplicate pairs within shard files (one host each)")
+    sub.add_argument('paths', nargs='+', metavar='path', help="shard file from 'partition'")
+
+    sub = subparsers.add_parser('merge', help="write global duplicate clusters from every shard's pairs")
+    sub.add_argument('directory', help="directory from 'partition'")
+    sub.add_argument('-o', '--output', default='-', help="file for duplicate clusters ('-' for stdout)")
+
+    sub = subparsers.add_parser('blocks', help="report block sizes before and after adaptive splitting")
+    sub.add_argument('input', help="file of song records ('-' for stdin)")
+    sub.add_argument('-f', '--format', choices=('jsonl', 'csv'), help="input format (default: from extension)")
+    sub.add_argument('-b', '--blocking', choices=sorted(blocking.STRATEGIES), default='artist',
+                     help="blocking strategy to group songs by")
+    sub.add_argument('--max-block', type=int, metavar='N', help="split blocks larger than this")
+
+    sub = subparsers.add_parser('estimate', help="estimate duplicates and dedupe cost from samples")
+    sub.add_argument('input', help="file of song records ('-' for stdin)")
+    sub.add_argument('-f', '--format', choices=('jsonl', 'csv'), help="input format (default: from extension)")
+    sub.add_argument('-b', '--blocking', choices=sorted(blocking.STRATEGIES), default='artist',
+                     help="blocking strategy to select candidate pairs")
+    sub.add_argument('-n', '--samples', type=int, default=500, metavar='N', help="songs to compare with their blocks")
+    sub.add_argument('-p', '--pairs', type=int, default=2000, metavar='N', help="candidate pairs to compare")
+    sub.add_argument('-c', '--confidence', type=float, choices=sorted(estimate.Z), default=0.95,
+                     help="confidence level of the intervals")
+    sub.add_argument('--seed', type=int, default=0, help="random seed for the samples")
+
+    sub = subparsers.add_parser('graph', help="score candidate pairs once into a saved similarity graph")
+    sub.add_argument('input', help="file of song records ('-' for stdin)")
+    sub.add_argument('path', help="file for the similarity graph")
+    sub.add_argument('-f', '--format', choices=('jsonl', 'csv'), help="input format (default: from extension)")
+    sub.add_argument('-b', '--blocking', choices=sorted(blocking.STRATEGIES), default='artist',
+                     help="blocking strategy to select candidate pairs")
+    sub.add_argument('--minimum', type=float, default=0.5, help="lowest score to keep in the graph")
+    sub.add_argument('--max-block', type=int, metavar='N', help="split blocks larger than this")
+
+    sub = subparsers.add_parser('cut', help="write duplicate clusters from a similarity graph at thresholds")
+    sub.add_argument('path', help="similarity graph from 'graph'")
+    sub.add_argument('input', help="file of the song records the graph was built from")
+    sub.add_argument('-f', '--format', choices=('jsonl', 'csv'), help="input format (default: from extension)")
+    sub.add_argument('-t', '--thresholds', type=float, nargs='+', default=[1.0], metavar='T',
+                     help="scores at or above which songs are duplicates")
+    sub.add_argument('-o', '--output', default='-', help="file for duplicate clusters ('-' for stdout)")
+
+    sub = subparsers.add_parser('scan', help="write song records read from the tags of audio files")
+    sub.add_argument('directory', help="directory of audio files to scan recursively")
+    sub.add_argument('-o', '--output', default='-', help="file for song records ('-' for stdout)")
+    sub.add_argument('-m', '--manifest', metavar='PATH', help="file of scanned files to skip when unchanged")
+    sub.add_argument('-j', '--workers', type=int, default=8, metavar='N', help="number of threads reading tags")
+
+    sub = subparsers.add_parser('benchmark', help="measure performance on synthetic libraries")
+    sub.add_argument('-s', '--sizes', type=int, nargs='+', default=list(benchmark.SIZES), metavar='N',
+                     help="numbers of songs per synthetic library")
+    sub.add_argument('--seed', type=int, default=0, help="random seed for the synthetic libraries")
+    sub.add_argument('-r', '--repeat', type=int, default=3, metavar='N', help="runs to take the fastest of")
+    sub.add_argument('--baseline', metavar='PATH', help="JSON file of results to compare against")
+    sub.add_argument('--save', action='store_true', help="write the results to the baseline file")
+    sub.add_argument('-t', '--tolerance', type=float, default=0.2,
+                     help="allowed ratio of change before a metric is a regression")
+
+    args = parser.parse_args(args=args)
+    _configure_logging(args.verbose)
+    if args.command == 'dedupe':
+        return _run_dedupe(args)
+    if args.command == 'serve':
+        return _run_serve(args)
+    if args.command == 'blocks':
+        return _run_blocks(args)
+    if args.command == 'estimate':
+        return _run_estimate(args)
+    if args.command in ('graph', 'cut'):
+        return _run_graph(args)
+    if args.command == 'scan':
+        return _run_scan(args)
+    if args.command == 'benchmark':
+        return _run_benchmark(args)
+    if args.command in ('partition', 'shard', 'merge'):
+        return _run_sharded(args)
+    parser.print_help()
+    return 1
+
+
+class _QuietFilter(logging.Filter):  # pylint: disable=R0903
+
+    """Hide the per-comparison messages logged by the comparable package."""
+
+    def filter(self, record):
+        return 'comparable' not in record.pathname.split(os.sep)
+
+
+def _configure_logging(verbosity):
+    """Configure logging to stderr based on the verbosity level."""
+    if verbosity:
+        logging.basicConfig(format=settings.VERBOSE_LOGGING_FORMAT, level=settings.VERBOSE_LOGGING_LEVEL)
+    else:
+        logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT, level=settings.DEFAULT_LOGGING_LEVEL)
+        for handler in logging.getLogger().handlers:
+            handler.addFilter(_QuietFilter())
+
+
+def _open(path, mode):
+    """Open a file path or standard stream ('-')."""
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+    return open(path, mode, newline='' if 'r' in mode else None)
+
+
+def _read(path, fmt):
+    """Stream song records from a file path or stdin ('-')."""
+    stream = _open(path, 'r')
+    try:
+        for record in records.read(stream, fmt):
+            yield record
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _run_dedupe(args):
+    """Run the dedupe command."""
+    fmt = args.format or ('csv' if args.input.endswith('.csv') else 'jsonl')
+    memory = args.memory * 1024 * 1024 if args.memory else None
+    stats = Stats(memory=memory, interval=args.interval)
+    checkpoint = Checkpoint(args.checkpoint, args.checkpoint_interval) if args.checkpoint else None
+
+    if args.out_of_core:
+        if args.input == '-':
+            logging.error("out-of-core mode reads the input twice and cannot use stdin")
+            return 1
+        if args.max_block:
+            logging.error("out-of-core mode streams whole blocks and cannot split them")
+            return 1
+        kwargs = dict(run_size=args.run_size, directory=args.temp)
+
+        def clusters():
+            """Cluster on disk then collect the records of each cluster."""
+            found = external.cluster(_read(args.input, fmt), strategy=args.blocking,
+                                     workers=args.workers, stats=stats, checkpoint=checkpoint, **kwargs)
+            return external.groups(_read(args.input, fmt), found, **kwargs)
+    else:
+        raw = []
+
+        def songs():
+            """Stream songs (parsed lazily) while keeping their records."""
+            for record in _read(args.input, fmt):
+                raw.append(record)
+                yield records.song(record)
+
+        def preparsed():
+            """Load every record then parse distinct titles and albums in parallel."""
+            for record in _read(args.input, fmt):
+                raw.append(record)
+                if not len(raw) % 1000:
+                    stats.tick()  # the memory cap applies while loading
+            return Song.from_records(raw, workers=args.workers)
+
+        def clusters():
+            """Cluster in memory then look up the records of each cluster."""
+            found = dedupe(preparsed() if args.preparse else songs(), strategy=args.blocking,
+                           workers=args.workers, stats=stats, checkpoint=checkpoint, maximum=args.max_block)
+            return ([raw[index] for index in cluster] for cluster in found)
+
+    count = 0
+    output = _open(args.output, 'w')
+    sampler = metrics.Sampler(delay=args.profile_after) if args.profile else None
+    if sampler:
+        sampler.start()
+    try:
+        for cluster in clusters():
+            records.write(output, {'songs': cluster})
+            count += 1
+    except MemoryLimitError as error:
+        logging.error(error)
+        return 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if sampler:
+            sampler.stop()
+            with open(args.profile, 'w') as stream:
+                stream.write(sampler.collapsed())
+            logging.info("{0:,} profile samples".format(sampler.samples))
+        if args.metrics:
+            with open(args.metrics, 'w') as stream:
+                stream.write(metrics.prometheus())
+    logging.info("{0:,} duplicate clusters: {1}".format(count, stats))
+    if checkpoint and checkpoint.skipped['blocks']:
+        logging.info("resumed run skipped {blocks:,} blocks, {candidates:,} candidate pairs, "
+                     "and {comparisons:,} comparisons".format(**checkpoint.skipped))
+    return 0
+
+
+def _run_serve(args):
+    """Run the serve command."""
+    stream = ()
+    if args.input:
+        fmt = args.format or ('csv' if args.input.endswith('.csv') else 'jsonl')
+        stream = _read(args.input, fmt)
+    serve(stream, host=args.host, port=args.port, strategy=args.blocking, workers=args.workers,
+          size=args.batch_size, delay=args.batch_delay)
+    return 0
+
+
+def _run_sharded(args):
+    """Run the partition, shard, or merge command."""
+    if args.command == 'partition':
+        fmt = args.format or ('csv' if args.input.endswith('.csv') else 'jsonl')
+        shard.partition(_read(args.input, fmt), args.directory, args.shards, args.blocking)
+        if args.run:
+            shard.run(args.directory, args.workers)
+    elif args.command == 'shard':
+        for path in args.paths:
+            logging.info("wrote {0}".format(shard.dedupe_shard(path)))
+    else:
+        try:
+            clusters = shard.merge(args.directory)
+        except ValueError as error:
+            logging.error(error)
+            return 1
+        output = _open(args.output, 'w')
+        try:
+            for cluster in shard.groups(args.directory, clusters):
+                records.write(output, {'songs': cluster})
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        logging.info("{0:,} duplicate clusters".format(len(clusters)))
+    return 0
+
+
+def _run_blocks(args):
+    """Run the blocks command."""
+    fmt = args.format or ('csv' if args.input.endswith('.csv') else 'jsonl')
+    songs = [records.song(record) for record in _read(args.input, fmt)]
+    report = {}
+    blocking.blocks(songs, args.blocking, maximum=args.max_block, report=report)
+    records.write(sys.stdout, report)
+    return 0
+
+
+def _run_estimate(args):
+    """Run the estimate command."""
+    fmt = args.format or ('csv' if args.input.endswith('.csv') else 'jsonl')
+    songs = [records.song(record) for record in _read(args.input, fmt)]
+    result = estimate.estimate(songs, strategy=args.blocking, samples=args.samples, pairs=args.pairs,
+                               confidence=args.confidence, seed=args.seed)
+    records.write(sys.stdout, estimate.asdict(result))
+    logging.info("{0:.1%} of songs have duplicates ({1:.1%} to {2:.1%}), "
+                 "a full run takes about {3:,.0f}s ({4:,.0f}s to {5:,.0f}s)".format(
+                     *(result.rate + result.seconds)))
+    return 0
+
+
+def _run_graph(args):
+    """Run the graph or cut command."""
+    fmt = args.format or ('csv' if args.input.endswith('.csv') else 'jsonl')
+    raw = list(_read(args.input, fmt))
+    if args.command == 'graph':
+        graph = Graph.build(Song.from_records(raw), strategy=args.blocking, minimum=args.minimum,
+                            maximum=args.max_block)
+        graph.save(args.path)
+        logging.info("saved {0!r} to {1}".format(graph, args.path))
+        return 0
+    try:
+        graph = Graph.load(args.path)
+    except ValueError as error:
+        logging.error(error)
+        return 1
+    if graph.count != len(raw):
+        logging.error("graph has {0:,} songs but the input has {1:,}".format(graph.count, len(raw)))
+        return 1
+    output = _open(args.output, 'w')
+    try:
+        for threshold, clusters in sorted(graph.hierarchy(args.thresholds).items(), reverse=True):
+            for cluster in clusters:
+                records.write(output, {'threshold': threshold, 'songs': [raw[index] for index in cluster]})
+            logging.info("{0:,} duplicate clusters at {1}".format(len(clusters), threshold))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def _run_scan(args):
+    """Run the scan command."""
+    if not os.path.isdir(args.directory):
+        logging.error("not a directory: {0}".format(args.directory))
+        return 1
+    scanner = scan.Scanner(args.directory, manifest=args.manifest, workers=args.workers)
+    output = _open(args.output, 'w')
+    try:
+        for record in scanner:
+            records.write(output, record)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def _run_benchmark(args):
+    """Run the benchmark command."""
+    results = benchmark.run(args.sizes, seed=args.seed, repeat=args.repeat)
+    records.write(sys.stdout, results)
+    if not args.baseline:
+        return 0
+    if args.save:
+        benchmark.save(args.baseline, results)
+        logging.info("saved baseline to {0}".format(args.baseline))
+        return 0
+    if not os.path.exists(args.baseline):
+        logging.error("no baseline at {0} (create one with --save)".format(args.baseline))
+        return 1
+    messages = benchmark.regressions(results, benchmark.load(args.baseline), args.tolerance)
+    for message in messages:
+        logging.error("regression: {0}".format(message))
+    return 1 if messages else 0
+
+
+if __name__ == '__main__':  # pragma: no cover (manual test)
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Immutable, versioned snapshots of the settings used for comparisons.
+
+Values are read from the current snapshot instead of the settings module,
+so a new snapshot can be swapped in at runtime. Each field remembers the
+version it last changed in, which lets caches and precompiled artifacts
+rebuild only when a field they depend on has changed.
+"""
+
+import logging
+from itertools import count
+from types import MappingProxyType
+
+from enharmony import settings, metrics
+
+FIELDS = ('ARTICLES',
+          'JOINERS',
+          'VARIANTS',
+          'KINDS',
+          'ALBUM_YEAR_THRESHOLD',
+          'ALBUM_NAME_THRESHOLD',
+          'ALBUM_NAME_WEIGHTS',
+          'ALBUM_THRESHOLD',
+          'ALBUM_WEIGHTS',
+          'TEXT_SIMILARITY',
+          'TEXT_SIMILARITY_MINIMUM',
+          'TRANSLITERATE')
+
+_versions = count(1)  # versions are unique across all snapshots
+
+
+def _freeze(value):
+    """Get an immutable copy of a setting value."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    """Get a plain copy of a frozen value for comparison."""
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    return value
+
+
+class Config(object):
+
+    """Immutable snapshot of the comparison settings."""
+
+    __slots__ = ('version', '_values', '_changed', '_stamps', '_artifacts')
+
+    def __init__(self, values, changed=None, artifacts=None):
+        """Initialize a new snapshot.
+
+        @param values: dictionary of every name in FIELDS to its value
+        @param changed: (optional) dictionary of field to the version it last changed in
+        @param artifacts: (optional) compiled artifacts to reuse when still current
+        """
+        version = next(_versions)
+        missing = set(FIELDS) - set(values)
+        if missing:
+            raise ValueError("missing settings: {0}".format(', '.join(sorted(missing))))
+        set_ = super(Config, self).__setattr__
+        set_('version', version)
+        set_('_values', {name: _freeze(values[name]) for name in FIELDS})
+        set_('_changed', dict(changed or {}))
+        for name in FIELDS:
+            self._changed.setdefault(name, version)
+        set_('_stamps', {})
+        set_('_artifacts', dict(artifacts or {}))
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("config snapshots are immutable (use replace)")
+
+    def __repr__(self):
+        return "<Config version {0}>".format(self.version)
+
+    @classmethod
+    def fromsettings(cls, module=settings):
+        """Create a snapshot of the values in a settings module."""
+        return cls({name: getattr(module, name) for name in FIELDS})
+
+    def asdict(self):
+        """Get a plain (picklable) dictionary of the values."""
+        return {name: _thaw(value) for name, value in self._values.items()}
+
+    def replace(self, **values):
+        """Get a new snapshot with some values changed.
+
+        Fields set to an equal value keep their change version, so
+        artifacts that depend on them are not rebuilt.
+
+        @return: new Config with a new version
+        """
+        unknown = set(values) - set(FIELDS)
+        if unknown:
+            raise ValueError("unknown settings: {0}".format(', '.join(sorted(unknown))))
+        merged = dict(self._values)
+        changed = dict(self._changed)
+        for name, value in values.items():
+            if _thaw(_freeze(value)) != _thaw(merged[name]):
+                merged[name] = value
+                del changed[name]  # set to the new version
+        return Config(merged, changed=changed, artifacts=self._artifacts)
+
+    def changes(self, other):
+        """Get the names of the fields that differ from another snapshot."""
+        return {name for name in FIELDS if self._changed[name] != other._changed[name]}
+
+    def stamp(self, *fields):
+        """Get the latest version any of the fields changed in."""
+        try:
+            return self._stamps[fields]
+        except KeyError:
+            stamp = self._stamps[fields] = max(self._changed[name] for name in fields)
+            return stamp
+
+    def compiled(self, name, fields, build):
+        """Get an artifact built from this snapshot, rebuilding it only when stale.
+
+        @param name: unique name of the artifact
+        @param fields: names of the fields the artifact depends on
+        @param build: function taking a Config and returning the artifact
+        @return: the artifact
+        """
+        stamp = self.stamp(*fields)
+        entry = self._artifacts.get(name)
+        if entry is None or entry[0] != stamp:
+            logging.debug("compiling %s for config version %s", name, self.version)
+            metrics.count('config.compiled')
+            entry = (stamp, build(self))
+            self._artifacts[name] = entry
+        return entry[1]
+
+
+class Setting(object):  # pylint: disable=R0903
+
+    """Class attribute that reads a field from the current snapshot."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        return getattr(_current, self.name)
+
+
+_current = Config.fromsettings()
+_listeners = []
+
+
+def current():
+    """Get the snapshot in use."""
+    return _current
+
+
+def use(snapshot):
+    """Swap in a new snapshot and notify the listeners of changed fields.
+
+    @param snapshot: Config to use
+    @return: the previous snapshot
+    """
+    global _current  # pylint: disable=W0603
+    previous, _current = _current, snapshot
+    changed = snapshot.changes(previous)
+    logging.debug("using config version %s (changed: %s)", snapshot.version, ', '.join(sorted(changed)))
+    for fields, function in _listeners:
+        if changed & fields:
+            function()
+    return previous
+
+
+def reload(module=settings):
+    """Swap in a snapshot of the current values in a settings module."""
+    return use(_current.replace(**{name: getattr(module, name) for name in FIELDS}))
+
+
+def update(**values):
+    """Swap in a snapshot with some values changed."""
+    return use(_current.replace(**values))
+
+
+def subscribe(fields, function):
+    """Call a function whenever any of the fields change.
+
+    @param fields: names of the fields to watch
+    @param function: function to call with no arguments (e.g. a cache clear)
+    """
+    _listeners.append((frozenset(fields), function))
@@ -0,0 +1,237 @@
+"""Batch pipeline to locate clusters of duplicate songs."""
+
+import sys
+import time
+import logging
+from array import array
+from itertools import chain, combinations
+from multiprocessing import Pool
+
+try:
+    import resource
+except ImportError:  # pragma: no cover (manual test)
+    resource = None
+
+from enharmony import blocking, metrics
+
+
+class MemoryLimitError(MemoryError):
+
+    """Raised when a pipeline exceeds its memory cap."""
+
+
+def peak_memory():
+    """Get the peak resident memory of this process and its workers.
+
+    @return: number of bytes or None if unavailable on this platform
+    """
+    if resource is None:  # pragma: no cover (manual test)
+        return None
+    scale = 1 if sys.platform == 'darwin' else 1024  # Linux reports KB
+    return scale * max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                       resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+class Clusters(object):
+
+    """Disjoint sets of song indices (union-find) in a compact array."""
+
+    def __init__(self, count=0):
+        self.parent = array('q', range(count))
+
+    def __len__(self):
+        return len(self.parent)
+
+    def add(self):
+        """Add a new single-item set and get its index."""
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, index):
+        """Get the root index of the set containing an index."""
+        parent = self.parent
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def union(self, index1, index2):
+        """Merge the sets containing two indices.
+
+        The lowest root becomes the new root so results are deterministic.
+
+        @return: True if the sets were separate
+        """
+        root1, root2 = self.find(index1), self.find(index2)
+        if root1 == root2:
+            return False
+        root1, root2 = sorted((root1, root2))
+        self.parent[root2] = root1
+        return True
+
+    def groups(self, minimum=2):
+        """Get the sets containing at least a minimum number of indices.
+
+        @param minimum: smallest set size to include
+        @return: list of sorted index lists ordered by their first index
+        """
+        groups = {}
+        for index in range(len(self.parent)):
+            groups.setdefault(self.find(index), []).append(index)
+        return [group for _, group in sorted(groups.items()) if len(group) >= minimum]
+
+
+class Stats(object):
+
+    """Throughput counters for a pipeline run."""
+
+    def __init__(self, memory=None, interval=None):
+        """Initialize new counters.
+
+        @param memory: (optional) memory cap in bytes
+        @param interval: (optional) seconds between progress reports
+        """
+        self.memory = memory
+        self.interval = interval
+        self.start = self._reported = time.time()
+        self.rows = 0
+        self.candidates = 0
+        self.comparisons = 0
+
+    def __str__(self):
+        peak = self.peak_memory
+        return ("{s.rows:,} rows ({s.rows_per_second:,.0f}/s), "
+                "{s.comparisons:,} comparisons ({s.comparisons_per_second:,.0f}/s), "
+                "{s.reduction:.2%} candidate reduction, "
+                "{m} peak memory").format(s=self, m="?" if peak is None else
+                                          "{:.1f} MB".format(peak / 1024 / 1024))
+
+    @property
+    def elapsed(self):
+        """Get the number of seconds since the run started."""
+        return max(time.time() - self.start, 1e-9)
+
+    @property
+    def rows_per_second(self):
+        """Get the rate songs were read."""
+        return self.rows / self.elapsed
+
+    @property
+    def comparisons_per_second(self):
+        """Get the rate songs were compared."""
+        return self.comparisons / self.elapsed
+
+    @property
+    def reduction(self):
+        """Get the ratio of all possible pairs that blocking avoided."""
+        total = self.rows * (self.rows - 1) // 2
+        if not total:
+            return 0.0
+        return 1.0 - min(self.candidates, total) / total
+
+    @property
+    def peak_memory(self):
+        """Get the peak memory in bytes."""
+        return peak_memory()
+
+    def asdict(self):
+        """Get the counters as a dictionary."""
+        return {'rows': self.rows,
+                'rows_per_second': self.rows_per_second,
+                'candidates': self.candidates,
+                'comparisons': self.comparisons,
+                'comparisons_per_second': self.comparisons_per_second,
+                'reduction': self.reduction,
+                'peak_memory': self.peak_memory,
+                'elapsed': self.elapsed}
+
+    def tick(self):
+        """Check the memory cap and periodically report progress."""
+        if self.memory:
+            peak = self.peak_memory
+            if peak is not None and peak > self.memory:
+                raise MemoryLimitError("peak memory {:,} exceeds cap {:,} bytes".format(peak, self.memory))
+        if self.interval is not None and time.time() - self._reported >= self.interval:
+            self._reported = time.time()
+            logging.info(str(self))
+
+
+@metrics.timed('dedupe.score')
+def score(block):
+    """Find duplicate pairs within a block of songs.
+
+    Pairs already linked by earlier duplicates in the block are skipped.
+
+    @param block: list of (index, song) pairs
+    @return: list of duplicate index pairs, number of comparisons
+    """
+    clusters = Clusters(len(block))
+    pairs = []
+    comparisons = 0
+    for (pos1, (index1, song1)), (pos2, (index2, song2)) in combinations(enumerate(block), 2):
+        if clusters.find(pos1) == clusters.find(pos2):
+            continue
+        comparisons += 1
+        if song1.similarity(song2):
+            clusters.union(pos1, pos2)
+            pairs.append((index1, index2))
+    metrics.count('dedupe.comparisons', comparisons)
+    return pairs, comparisons
+
+
+def dedupe(songs, strategy='artist', workers=1, stats=None, checkpoint=None, maximum=None):
+    """Locate clusters of duplicate songs.
+
+    @param songs: iterable of songs (consumed once)
+    @param strategy: name of a blocking strategy in blocking.STRATEGIES
+    @param workers: number of processes to score blocks with
+    @param stats: (optional) Stats to update while running
+    @param checkpoint: (optional) Checkpoint to resume from and save to
+    @param maximum: (optional) split blocks larger than this with secondary keys
+    @return: list of clusters (sorted lists of song indices)
+    """
+    stats = stats or Stats()
+    items = []
+    for song in songs:
+        items.append(song)
+        stats.rows += 1
+        if not stats.rows % 1000:
+            stats.tick()
+    report = {}
+    with metrics.Timer('dedupe.blocking'):
+        groups = sorted((key, indices) for key, indices in
+                        blocking.blocks(items, strategy, maximum=maximum, report=report).items()
+                        if len(indices) > 1)
+    logging.debug("blocks: %s", report)
+    stats.candidates += sum(len(indices) * (len(indices) - 1) // 2 for _, indices in groups)
+
+    clusters = Clusters(len(items))
+    start = 0
+    if checkpoint:
+        # the records are included so edits that keep every blocking key still start over
+        fingerprint = checkpoint.digest(chain([strategy, len(items)], groups, (song.record for song in items)))
+        start = checkpoint.restore(fingerprint, clusters)
+        checkpoint.skip(len(indices) for _, indices in groups[:start])
+    tasks = ([(index, items[index]) for index in indices] for _, indices in groups[start:])
+    logging.debug("scoring %s blocks of %s songs", len(groups) - start, len(items))
+
+    if workers > 1:
+        pool = Pool(workers)
+        results = pool.imap(score, tasks, chunksize=16)
+    else:
+        pool = None
+        results = (score(task) for task in tasks)
+    try:
+        for cursor, (pairs, comparisons) in enumerate(results, start=start + 1):
+            stats.comparisons += comparisons
+            for index1, index2 in pairs:
+                clusters.union(index1, index2)
+            stats.tick()
+            if checkpoint:
+                checkpoint.update(cursor, clusters, stats.comparisons)
+    finally:
+        if pool:
+            pool.terminate()
+    if checkpoint:
+        checkpoint.update(len(groups), clusters, stats.comparisons, force=True)
+    return clusters.groups()
@@ -0,0 +1,147 @@
+"""Bit-parallel edit distance (Myers/Hyyrö) for normalized names."""
+
+from functools import lru_cache
+
+from enharmony import config, metrics
+
+CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _pattern(text):
+    """Get a bit mask of the positions of each character in a text.
+
+    Python integers are arbitrary length, so one "word" holds any text.
+    """
+    masks = {}
+    for position, char in enumerate(text):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    return masks
+
+
+metrics.cache('distance.pattern', _pattern)
+
+
+def _distance(masks, length, text, maximum):
+    """Get the edit distance between a pattern (as masks) and a text.
+
+    @param masks: dictionary from _pattern()
+    @param length: length of the pattern
+    @param text: text to compare with
+    @param maximum: (optional) stop early once the distance must exceed this
+    @return: edit distance (or maximum + 1 if it was exceeded)
+    """
+    if not length:
+        edits = len(text)
+        return edits if maximum is None else min(edits, maximum + 1)
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    positive, negative = full, 0
+    score = length
+    remaining = len(text)
+    for char in text:
+        match = masks.get(char, 0)
+        vertical = match | negative
+        horizontal = (((match & positive) + positive) ^ positive) | match
+        up = negative | (~(horizontal | positive) & full)
+        down = positive & horizontal
+        if up & last:
+            score += 1
+        elif down & last:
+            score -= 1
+        remaining -= 1
+        if maximum is not None and score - remaining > maximum:
+            return maximum + 1
+        up = ((up << 1) | 1) & full
+        down = (down << 1) & full
+        positive = down | (~(vertical | up) & full)
+        negative = up & vertical
+    return score if maximum is None else min(score, maximum + 1)
+
+
+def distance(text1, text2, maximum=None):
+    """Get the Levenshtein distance between two texts.
+
+    @param text1: first text
+    @param text2: second text
+    @param maximum: (optional) stop early once the distance must exceed this
+    @return: number of edits (or maximum + 1 if it was exceeded)
+    """
+    if maximum is not None and abs(len(text1) - len(text2)) > maximum:
+        return maximum + 1
+    if len(text1) > len(text2):  # the shorter text is the bit pattern
+        text1, text2 = text2, text1
+    return _distance(_pattern(text1), len(text1), text2, maximum)
+
+
+def _maximum(length1, length2, minimum):
+    """Get the largest distance that still reaches a minimum ratio."""
+    if not minimum:
+        return None
+    return int((1.0 - minimum) * max(length1, length2) + 1e-9)
+
+
+def ratio(text1, text2, minimum=0.0):
+    """Get the similarity of two texts from their edit distance.
+
+    @param text1: first text
+    @param text2: second text
+    @param minimum: ratio below which 0.0 is returned without finishing
+    @return: 0.0 to 1.0 where 1.0 indicates identical texts
+    """
+    longest = max(len(text1), len(text2))
+    if not longest:
+        return 1.0
+    value = 1.0 - distance(text1, text2, _maximum(len(text1), len(text2), minimum)) / longest
+    return value if value >= minimum else 0.0
+
+
+def distances(query, texts, maximum=None):
+    """Get the distances between one query and many texts.
+
+    The query's bit masks are computed once and reused for every text.
+
+    @param query: text to compare
+    @param texts: iterable of texts to compare with
+    @param maximum: (optional) stop early once a distance must exceed this
+    @return: list of distances (capped at maximum + 1)
+    """
+    masks = _pattern(query)
+    length = len(query)
+    results = []
+    for text in texts:
+        if maximum is not None and abs(length - len(text)) > maximum:
+            results.append(maximum + 1)
+        else:
+            results.append(_distance(masks, length, text, maximum))
+    return results
+
+
+def ratios(query, texts, minimum=0.0):
+    """Get the similarities between one query and many texts.
+
+    @param query: text to compare
+    @param texts: iterable of texts to compare with
+    @param minimum: ratio below which 0.0 is returned for a text
+    @return: list of ratios
+    """
+    masks = _pattern(query)
+    length = len(query)
+    results = []
+    for text in texts:
+        longest = max(length, len(text))
+        if not longest:
+            results.append(1.0)
+            continue
+        maximum = _maximum(length, len(text), minimum)
+        if maximum is not None and abs(length - len(text)) > maximum:
+            results.append(0.0)
+            continue
+        value = 1.0 - _distance(masks, length, text, maximum) / longest
+        results.append(value if value >= minimum else 0.0)
+    return results
+
+
+def enabled():
+    """Determine if edit distance is the selected text similarity."""
+    return config.current().TEXT_SIMILARITY == 'levenshtein'
@@ -0,0 +1,158 @@
+"""Sampled estimates of a library's duplicates and the cost of deduplicating it.
+
+Blocking keys are cheap to compute for every song, so block sizes and the
+number of candidate pairs are exact. Only comparisons are sampled:
+
+- candidate pairs, chosen uniformly, estimate the number of duplicate
+  pairs and the time a full run spends parsing and comparing
+- songs, chosen uniformly and compared with their block, estimate the
+  share of songs with a duplicate and the distribution of cluster sizes
+"""
+
+import math
+import time
+import random
+import bisect
+from collections import Counter, namedtuple
+
+from enharmony import blocking
+
+Interval = namedtuple('Interval', ['value', 'low', 'high'])
+Interval.__doc__ = """Estimate with a confidence interval."""
+
+Estimate = namedtuple('Estimate', ['songs', 'blocks', 'largest', 'candidates', 'pairs', 'rate',
+                                   'clusters', 'seconds', 'comparisons', 'elapsed'])
+Estimate.__doc__ = """Sampled estimate of a library's duplicates.
+
+songs: number of songs
+blocks: number of blocks with more than one song
+largest: size of the largest block
+candidates: number of candidate pairs (exact, an upper bound on comparisons)
+pairs: Interval of duplicate candidate pairs
+rate: Interval of the share of songs that have a duplicate
+clusters: dictionary of cluster size to estimated number of clusters
+seconds: Interval of the seconds to parse every song and compare every candidate pair
+comparisons: number of comparisons made to estimate
+elapsed: seconds spent estimating
+"""
+
+Z = {0.9: 1.645, 0.95: 1.96, 0.99: 2.576}
+
+
+def wilson(successes, trials, z=1.96):
+    """Get the Wilson score interval of a proportion.
+
+    @param successes: number of successful trials
+    @param trials: number of trials
+    @param z: standard score of the confidence level (1.96 for 95%)
+    @return: Interval of the proportion
+    """
+    if not trials:
+        return Interval(0.0, 0.0, 1.0)
+    share = successes / trials
+    denominator = 1 + z ** 2 / trials
+    center = (share + z ** 2 / (2 * trials)) / denominator
+    spread = z * math.sqrt(share * (1 - share) / trials + z ** 2 / (4 * trials ** 2)) / denominator
+    return Interval(share, max(0.0, center - spread), min(1.0, center + spread))
+
+
+def _pair(rng, groups, offsets, total):
+    """Choose a candidate pair uniformly from every block's pairs."""
+    target = rng.randrange(total)
+    block = bisect.bisect_right(offsets, target) - 1
+    indices = groups[block]
+    index1, index2 = rng.sample(range(len(indices)), 2)
+    return indices[index1], indices[index2]
+
+
+def estimate(songs, strategy='artist', samples=500, pairs=2000, mates=200, confidence=0.95, seed=0):
+    """Estimate the duplicates in a library by sampling comparisons.
+
+    @param songs: list of songs
+    @param strategy: name of a blocking strategy in blocking.STRATEGIES
+    @param samples: number of songs to compare with their blocks
+    @param pairs: number of candidate pairs to compare
+    @param mates: most block mates to compare a sampled song with
+    @param confidence: confidence level of the intervals (0.9, 0.95 or 0.99)
+    @param seed: random seed for the samples
+    @return: Estimate
+    """
+    start = time.perf_counter()
+    rng = random.Random(seed)
+    z = Z[confidence]
+    groups = [indices for indices in blocking.blocks(songs, strategy).values() if len(indices) > 1]
+    offsets, total = [], 0
+    for indices in groups:
+        offsets.append(total)
+        total += len(indices) * (len(indices) - 1) // 2
+    comparisons = 0
+
+    # Sample candidate pairs for the number of duplicate pairs and the cost
+    found, parsing, timings = 0, {}, []
+    for _ in range(pairs if total else 0):
+        index1, index2 = _pair(rng, groups, offsets, total)
+        for index in (index1, index2):
+            if index not in parsing:  # a full run parses each song once
+                began = time.perf_counter()
+                songs[index].title, songs[index].artist  # pylint: disable=W0104
+                parsing[index] = time.perf_counter() - began
+        began = time.perf_counter()
+        duplicate = bool(songs[index1].similarity(songs[index2]))
+        timings.append(time.perf_counter() - began)
+        found += duplicate
+    comparisons += len(timings)
+    share = wilson(found, len(timings), z)
+    duplicates = Interval(*(value * total for value in share))
+    seconds = _add(_project(list(parsing.values()), len(songs), z), _project(timings, total, z))
+
+    # Sample songs for the share with duplicates and the cluster sizes
+    memberships = {}
+    for block, indices in enumerate(groups):
+        for index in indices:
+            memberships.setdefault(index, []).append(block)
+    sizes = Counter()
+    chosen = rng.sample(range(len(songs)), min(samples, len(songs)))
+    for index in chosen:
+        others = sorted({other for block in memberships.get(index, ()) for other in groups[block]} - {index})
+        if len(others) > mates:
+            others = rng.sample(others, mates)
+        matched = sum(1 for other in others if songs[index].similarity(songs[other]))
+        comparisons += len(others)
+        sizes[matched + 1] += 1
+    with_duplicates = sum(count for size, count in sizes.items() if size > 1)
+    rate = wilson(with_duplicates, len(chosen), z)
+    # a song in a cluster of k songs is k times as likely to be sampled
+    scale = len(songs) / len(chosen) if chosen else 0
+    clusters = {size: round(count * scale / size, 1) for size, count in sorted(sizes.items()) if size > 1}
+
+    return Estimate(songs=len(songs), blocks=len(groups),
+                    largest=max((len(indices) for indices in groups), default=0),
+                    candidates=total, pairs=duplicates, rate=rate, clusters=clusters,
+                    seconds=seconds, comparisons=comparisons, elapsed=time.perf_counter() - start)
+
+
+def _project(timings, total, z):
+    """Project the seconds for a number of operations from sampled timings."""
+    if not timings:
+        return Interval(0.0, 0.0, 0.0)
+    mean = sum(timings) / len(timings)
+    if len(timings) > 1:
+        variance = sum((value - mean) ** 2 for value in timings) / (len(timings) - 1)
+    else:
+        variance = 0.0
+    error = z * math.sqrt(variance / len(timings))
+    return Interval(mean * total, max(0.0, mean - error) * total, (mean + error) * total)
+
+
+def _add(interval1, interval2):
+    """Get the sum of two independent estimates."""
+    return Interval(*(value1 + value2 for value1, value2 in zip(interval1, interval2)))
+
+
+def asdict(result):
+    """Get an estimate as a JSON-compatible dictionary."""
+    data = result._asdict()
+    for name in ('pairs', 'rate', 'seconds'):
+        data[name] = data[name]._asdict()
+    data['clusters'] = {str(size): count for size, count in data['clusters'].items()}
+    return data
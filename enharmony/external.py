@@ -0,0 +1,167 @@
+"""Out-of-core dedupe using an external sort on blocking keys."""
+
+import os
+import json
+import heapq
+import hashlib
+import logging
+import tempfile
+from array import array
+from itertools import groupby, islice
+from multiprocessing import Pool
+
+from enharmony import blocking, records
+from enharmony.dedupe import Clusters, Stats, score
+
+
+def _position(item):
+    """Get the sort position of a [key, index, record] item."""
+    return item[0], item[1]
+
+
+class Runs(object):
+
+    """Sorted runs of [key, index, record] items spilled to temporary files."""
+
+    def __init__(self, size=100000, directory=None):
+        """Initialize a new set of runs.
+
+        @param size: number of items to buffer before spilling a run
+        @param directory: (optional) directory for temporary files
+        """
+        self.size = size
+        self.directory = directory
+        self.paths = []
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def add(self, key, index, record):
+        """Add an item, spilling a sorted run when the buffer is full."""
+        self._buffer.append([key, index, record])
+        if len(self._buffer) >= self.size:
+            self._spill()
+
+    def _spill(self):
+        """Write the sorted buffer to a new run file."""
+        self._buffer.sort(key=_position)
+        handle, path = tempfile.mkstemp(prefix='enharmony-', suffix='.run', dir=self.directory)
+        with os.fdopen(handle, 'w') as stream:
+            for item in self._buffer:
+                stream.write(json.dumps(item) + '\n')
+        logging.debug("spilled %s items to %s", len(self._buffer), path)
+        self.paths.append(path)
+        self._buffer = []
+
+    @staticmethod
+    def _read(path):
+        """Get an iterator of the items in a run file."""
+        with open(path) as stream:
+            for line in stream:
+                yield json.loads(line)
+
+    def merge(self):
+        """Get an iterator of all items in sorted order (k-way merge)."""
+        self._buffer.sort(key=_position)
+        streams = [self._read(path) for path in self.paths] + [iter(self._buffer)]
+        return heapq.merge(*streams, key=_position)
+
+    def close(self):
+        """Delete the run files."""
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self.paths = []
+        self._buffer = []
+
+
+def _blocks(runs):
+    """Get an iterator of (key, [(index, record), ...]) from merged runs."""
+    for key, items in groupby(runs.merge(), key=lambda item: item[0]):
+        yield key, [(index, record) for _, index, record in items]
+
+
+def _score(block):
+    """Score a block of records by parsing them into songs."""
+    return score([(index, records.song(record)) for index, record in block])
+
+
+def cluster(stream, strategy='artist', run_size=100000, directory=None, workers=1, stats=None,
+            checkpoint=None):  # pylint: disable=R0913
+    """Locate duplicate songs loading one block at a time.
+
+    @param stream: iterable of song records (consumed once)
+    @param strategy: name of a blocking strategy in blocking.STRATEGIES
+    @param run_size: number of items held in memory before spilling a run
+    @param directory: (optional) directory for temporary files
+    @param workers: number of processes to score blocks with
+    @param stats: (optional) Stats to update while running
+    @param checkpoint: (optional) Checkpoint to resume from and save to
+    @return: Clusters of record indices
+    """
+    stats = stats or Stats()
+    clusters = Clusters()
+    sha = hashlib.sha1(strategy.encode('utf-8'))
+    with Runs(run_size, directory) as runs:
+        for record in stream:
+            index = clusters.add()
+            for key in blocking.keys(records.song(record), strategy):
+                runs.add(key, index, record)
+                sha.update(json.dumps([key, index]).encode('utf-8'))
+            sha.update(json.dumps(record, sort_keys=True, default=str).encode('utf-8'))
+            stats.rows += 1
+            if not stats.rows % 1000:
+                stats.tick()
+        blocks = (block for _, block in _blocks(runs) if len(block) > 1)
+        cursor = 0
+        if checkpoint:
+            cursor = checkpoint.restore(sha.hexdigest(), clusters)
+            checkpoint.skip(len(block) for block in islice(blocks, cursor))
+            stats.candidates += checkpoint.skipped['candidates']
+        pool = Pool(workers) if workers > 1 else None
+        try:
+            while True:
+                batch = list(islice(blocks, max(workers, 1) * 4))
+                if not batch:
+                    break
+                stats.candidates += sum(len(block) * (len(block) - 1) // 2 for block in batch)
+                results = pool.map(_score, batch) if pool else map(_score, batch)
+                for pairs, comparisons in results:
+                    stats.comparisons += comparisons
+                    for index1, index2 in pairs:
+                        clusters.union(index1, index2)
+                cursor += len(batch)
+                stats.tick()
+                if checkpoint:
+                    checkpoint.update(cursor, clusters, stats.comparisons)
+        finally:
+            if pool:
+                pool.terminate()
+    if checkpoint:
+        checkpoint.update(cursor, clusters, stats.comparisons, force=True)
+    return clusters
+
+
+def groups(stream, clusters, run_size=100000, directory=None):
+    """Get the records of each duplicate cluster from a second pass.
+
+    @param stream: iterable of the same song records given to cluster()
+    @param clusters: Clusters returned by cluster()
+    @param run_size: number of items held in memory before spilling a run
+    @param directory: (optional) directory for temporary files
+    @return: generator of record lists ordered by their first index
+    """
+    sizes = array('q', bytes(8 * len(clusters)))
+    for index in range(len(clusters)):
+        sizes[clusters.find(index)] += 1
+    with Runs(run_size, directory) as runs:
+        for index, record in enumerate(stream):
+            root = clusters.find(index)
+            if sizes[root] > 1:
+                runs.add(root, index, record)
+        for _, block in _blocks(runs):
+            yield [record for _, record in block]
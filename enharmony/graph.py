@@ -0,0 +1,245 @@
+"""Sparse similarity graph of scored candidate pairs.
+
+Candidate pairs from blocking are scored once and stored in compressed
+sparse row (CSR) arrays. Duplicate clusters can then be cut at any
+threshold, or at many thresholds as a hierarchy, without scoring again.
+"""
+
+import sys
+import struct
+from array import array
+from itertools import chain
+
+from enharmony import blocking, metrics
+from enharmony.dedupe import Clusters
+
+MAGIC = b'ENHG'
+VERSION = 1
+HEADER = '<4sHcxqq'  # magic, version, byte order, node count, stored entries
+UNEQUAL = 0.999  # highest score of parts that are similar but not equal
+
+
+def _part(part1, part2):
+    """Get the score of one part: 1.0 if equal, otherwise its similarity."""
+    if part1 == part2:
+        return 1.0
+    return min(float(part1.similarity(part2)), UNEQUAL)
+
+
+def score(song1, song2):
+    """Get a graded similarity of two songs (0.0 to 1.0).
+
+    Averages the title and artist parts that Song.similarity checks for
+    equality, so a cut at 1.0 finds the same duplicates as dedupe().
+    """
+    return (_part(song1.title, song2.title) + _part(song1.artist, song2.artist)) / 2
+
+
+class Graph(object):
+
+    """Undirected graph of song similarities in CSR arrays.
+
+    Every edge is stored in the rows of both of its songs, so the
+    neighbors of a song are one contiguous slice.
+    """
+
+    def __init__(self, count, indptr, indices, scores):
+        """Initialize a graph from CSR arrays.
+
+        @param count: number of songs (nodes)
+        @param indptr: array('q') of count + 1 row offsets
+        @param indices: array('q') of neighbor indices
+        @param scores: array('d') of similarity scores (parallel to indices)
+        """
+        self.count = count
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+
+    def __len__(self):
+        """Get the number of edges."""
+        return len(self.indices) // 2
+
+    def __repr__(self):
+        return "<Graph of {0:,} songs and {1:,} edges>".format(self.count, len(self))
+
+    def __eq__(self, other):
+        if not isinstance(other, Graph):
+            return False
+        arrays = (self.count, self.indptr, self.indices, self.scores)
+        return arrays == (other.count, other.indptr, other.indices, other.scores)
+
+    @classmethod
+    def build(cls, songs, strategy='artist', minimum=0.5, scorer=score, maximum=None):
+        """Score every candidate pair once and keep those above a minimum.
+
+        A pair found in several blocks is only scored in the first block
+        both songs share, so no set of pairs is kept, and the stored edges
+        go straight into arrays.
+
+        @param songs: list of songs
+        @param strategy: name of a blocking strategy in blocking.STRATEGIES
+        @param minimum: lowest score to store (lower scores cannot be cut at)
+        @param scorer: function of two songs returning a score
+        @param maximum: (optional) split blocks larger than this (see blocking.adapt)
+        @return: Graph
+        """
+        sources, targets, scores = array('q'), array('q'), array('d')
+        comparisons = 0
+        with metrics.Timer('graph.build'):
+            groups = list(blocking.blocks(songs, strategy, maximum=maximum).values())
+            memberships = [[] for _ in songs]
+            for number, indices in enumerate(groups):
+                for index in indices:
+                    memberships[index].append(number)
+            for number, indices in enumerate(groups):
+                for position, index1 in enumerate(indices):
+                    earlier = [block for block in memberships[index1] if block < number]
+                    for index2 in indices[position + 1:]:
+                        if earlier and any(block in memberships[index2] for block in earlier):
+                            continue  # scored in an earlier block
+                        comparisons += 1
+                        value = scorer(songs[index1], songs[index2])
+                        if value >= minimum:
+                            sources.append(index1)
+                            targets.append(index2)
+                            scores.append(value)
+            metrics.count('graph.comparisons', comparisons)
+        return cls.fromedges(len(songs), sources, targets, scores)
+
+    @classmethod
+    def fromedges(cls, count, sources, targets, scores):
+        """Create a graph from parallel arrays of edges (each stored once).
+
+        @param count: number of songs (nodes)
+        @param sources: array('q') of the first song of each edge
+        @param targets: array('q') of the second song of each edge
+        @param scores: array('d') of similarity scores
+        """
+        indptr = array('q', [0]) * (count + 1)
+        for index in chain(sources, targets):
+            indptr[index + 1] += 1
+        for index in range(count):
+            indptr[index + 1] += indptr[index]
+        free = indptr[:-1]  # next position to fill in each row
+        indices = array('q', [0]) * (len(sources) * 2)
+        values = array('d', [0.0]) * (len(sources) * 2)
+        for index1, index2, value in zip(sources, targets, scores):
+            for row, neighbor in ((index1, index2), (index2, index1)):
+                indices[free[row]] = neighbor
+                values[free[row]] = value
+                free[row] += 1
+        for index in range(count):
+            start, end = indptr[index], indptr[index + 1]
+            if end - start > 1:
+                row = sorted(zip(indices[start:end], values[start:end]))
+                indices[start:end] = array('q', (neighbor for neighbor, _ in row))
+                values[start:end] = array('d', (value for _, value in row))
+        return cls(count, indptr, indices, values)
+
+    @classmethod
+    def fromrows(cls, rows):
+        """Create a graph from lists of (neighbor, score) pairs for each song."""
+        indptr, indices, scores = array('q', [0]), array('q'), array('d')
+        for row in rows:
+            row.sort()
+            indices.extend(index for index, _ in row)
+            scores.extend(value for _, value in row)
+            indptr.append(len(indices))
+        return cls(len(rows), indptr, indices, scores)
+
+    def neighbors(self, index):
+        """Get the (neighbor, score) pairs of a song."""
+        start, end = self.indptr[index], self.indptr[index + 1]
+        return list(zip(self.indices[start:end], self.scores[start:end]))
+
+    def edges(self, threshold=None):
+        """Get an iterator of (index1, index2, score) with index1 < index2.
+
+        @param threshold: (optional) lowest score to include
+        """
+        indptr, indices, scores = self.indptr, self.indices, self.scores
+        for index1 in range(self.count):
+            for position in range(indptr[index1], indptr[index1 + 1]):
+                index2 = indices[position]
+                if index2 > index1 and (threshold is None or scores[position] >= threshold):
+                    yield index1, index2, scores[position]
+
+    def cut(self, threshold):
+        """Get the duplicate clusters linked by scores at or above a threshold.
+
+        @param threshold: lowest score that links two songs
+        @return: list of clusters (sorted lists of song indices)
+        """
+        clusters = Clusters(self.count)
+        for index1, index2, _ in self.edges(threshold):
+            clusters.union(index1, index2)
+        return clusters.groups()
+
+    def hierarchy(self, thresholds):
+        """Get the clusters at many thresholds from one pass over sorted edges.
+
+        Lowering the threshold only adds links, so clusters at each
+        threshold are unions of the clusters at every higher threshold.
+
+        @param thresholds: iterable of thresholds
+        @return: dictionary of threshold to list of clusters
+        """
+        edges = sorted(self.edges(), key=lambda edge: edge[2], reverse=True)
+        clusters = Clusters(self.count)
+        results = {}
+        position = 0
+        for threshold in sorted(set(thresholds), reverse=True):
+            while position < len(edges) and edges[position][2] >= threshold:
+                clusters.union(edges[position][0], edges[position][1])
+                position += 1
+            results[threshold] = clusters.groups()
+        return results
+
+    def merges(self):
+        """Get the single-linkage merges in order of decreasing score.
+
+        @return: list of (score, index1, index2) for each edge that joined two clusters
+        """
+        clusters = Clusters(self.count)
+        merges = []
+        for index1, index2, value in sorted(self.edges(), key=lambda edge: edge[2], reverse=True):
+            if clusters.find(index1) != clusters.find(index2):
+                clusters.union(index1, index2)
+                merges.append((value, index1, index2))
+        return merges
+
+    def save(self, path):
+        """Write the graph to a binary file."""
+        with open(path, 'wb') as stream:
+            stream.write(struct.pack(HEADER, MAGIC, VERSION, sys.byteorder[0].encode('ascii'),
+                                     self.count, len(self.indices)))
+            self.indptr.tofile(stream)
+            self.indices.tofile(stream)
+            self.scores.tofile(stream)
+
+    @classmethod
+    def load(cls, path):
+        """Read a graph from a binary file.
+
+        @raise ValueError: when the file is not a saved graph
+        """
+        with open(path, 'rb') as stream:
+            header = stream.read(struct.calcsize(HEADER))
+            try:
+                magic, version, order, count, entries = struct.unpack(HEADER, header)
+            except struct.error:
+                raise ValueError("not a similarity graph: {0}".format(path))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("not a similarity graph: {0}".format(path))
+            indptr, indices, scores = array('q'), array('q'), array('d')
+            try:
+                indptr.fromfile(stream, count + 1)
+                indices.fromfile(stream, entries)
+                scores.fromfile(stream, entries)
+            except EOFError:
+                raise ValueError("truncated similarity graph: {0}".format(path))
+        if order.decode('ascii') != sys.byteorder[0]:
+            for values in (indptr, indices, scores):
+                values.byteswap()
+        return cls(count, indptr, indices, scores)
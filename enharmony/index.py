@@ -0,0 +1,606 @@
+"""Indexes to locate candidate songs without a full scan."""
+
+import bisect
+from array import array
+from collections import deque, namedtuple
+from itertools import count, chain
+
+from enharmony import blocking, config, phonetic, metrics
+from enharmony.base import normalize
+from enharmony.song import Song
+
+
+class ArtistIndex(object):
+
+    """Inverted index from every credited artist to their songs.
+
+    Credited names depend on the settings, so the index is rebuilt when
+    they change.
+    """
+
+    def __init__(self, songs=()):
+        """Initialize a new index.
+
+        @param songs: (optional) songs to add to the index
+        """
+        self._stamp = config.current().stamp(*phonetic.FIELDS)
+        self._songs = {}
+        self._keys = {}
+        self._postings = {}
+        for song in songs:
+            self.add(song)
+
+    def __len__(self):
+        """Get the number of distinct credited artists."""
+        self._refresh()
+        return len(self._postings)
+
+    def __contains__(self, name):
+        """Determine if an artist name is credited on any song."""
+        self._refresh()
+        return normalize(name) in self._postings
+
+    def _refresh(self):
+        """Rebuild the postings if the settings for credited names changed."""
+        stamp = config.current().stamp(*phonetic.FIELDS)
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self._keys = {}
+            self._postings = {}
+            for song in self._songs.values():
+                self._post(song)
+
+    def _post(self, song):
+        """Add a song to the postings of its credited artists."""
+        keys = self._keys[id(song)] = song.credits
+        for key in keys:
+            self._postings.setdefault(key, {})[id(song)] = song
+
+    def add(self, song):
+        """Add a song under each of its credited artists."""
+        self._refresh()
+        self._songs[id(song)] = song
+        self._post(song)
+
+    def remove(self, song):
+        """Remove a song from each of its credited artists."""
+        self._refresh()
+        self._songs.pop(id(song), None)
+        for key in self._keys.pop(id(song), ()):
+            posting = self._postings[key]
+            posting.pop(id(song), None)
+            if not posting:
+                del self._postings[key]
+
+    def find(self, name):
+        """Get songs crediting an artist (primary or featured).
+
+        @param name: artist name to look up
+        @return: list of songs
+        """
+        self._refresh()
+        return list(self._postings.get(normalize(name), {}).values())
+
+    @metrics.timed('index.artist.candidates')
+    def candidates(self, song):
+        """Get other songs sharing at least one credited artist with a song.
+
+        @param song: song to find candidates for
+        @return: list of candidate songs in index order
+        """
+        self._refresh()
+        seen = {id(song)}
+        candidates = []
+        for key in song.credits:
+            for item in self._postings.get(key, {}).values():
+                if id(item) not in seen:
+                    seen.add(id(item))
+                    candidates.append(item)
+        return candidates
+
+
+Event = namedtuple('Event', ['kind', 'cluster', 'songs', 'previous'])
+Event.__doc__ = """Change to a duplicate cluster.
+
+kind: 'merge' (songs joined a cluster), 'split' (a cluster was divided
+and this is one of its parts), 'shrink' (a song left a cluster that is
+still connected), or 'dissolve' (a cluster no longer has duplicates)
+cluster: ID of the affected cluster
+songs: frozenset of song IDs now in the cluster
+previous: IDs of clusters superseded by this one
+"""
+
+
+class DedupIndex(object):
+
+    """Duplicate clusters maintained as songs are added, removed and updated.
+
+    Each change only compares a song against the songs sharing one of its
+    blocking keys, and only revisits the duplicate cluster it touches.
+    When the settings change, every song is relinked on the next access.
+    """
+
+    def __init__(self, strategy='artist', listener=None):
+        """Initialize a new index.
+
+        @param strategy: name of a blocking strategy in blocking.STRATEGIES
+        @param listener: (optional) function called with each Event
+        """
+        self.strategy = strategy
+        self.listeners = [listener] if listener else []
+        self.events = deque()
+        self._config = config.current()
+        self._ids = count()
+        self._cluster_ids = count(1)
+        self._songs = {}
+        self._keys = {}
+        self._blocks = {}
+        self._edges = {}
+        self._cluster = {}
+        self._members = {}
+
+    def __len__(self):
+        return len(self._songs)
+
+    def _refresh(self):
+        """Rebuild the index if the settings changed since it was built."""
+        current = config.current()
+        if current is not self._config:
+            changed = current.changes(self._config)
+            self._config = current
+            if changed:
+                self.rebuild()
+
+    def rebuild(self):
+        """Dissolve every cluster and relink all songs from scratch."""
+        for cluster in sorted(self._members):
+            self._emit(Event('dissolve', cluster, frozenset(), ()))
+        songs = self._songs
+        self._songs, self._keys, self._blocks = {}, {}, {}
+        self._edges, self._cluster, self._members = {}, {}, {}
+        for song_id, song in songs.items():
+            self.add(song, song_id)
+
+    def __contains__(self, song_id):
+        return song_id in self._songs
+
+    def __getitem__(self, song_id):
+        return self._songs[song_id]
+
+    @property
+    def clusters(self):
+        """Get a dictionary of cluster ID to the song IDs it contains."""
+        self._refresh()
+        return {cluster: frozenset(members) for cluster, members in self._members.items()}
+
+    def cluster(self, song_id):
+        """Get the ID of the cluster containing a song (or None)."""
+        self._refresh()
+        return self._cluster.get(song_id)
+
+    def stream(self):
+        """Get an iterator that consumes the pending events."""
+        while self.events:
+            yield self.events.popleft()
+
+    @metrics.timed('index.add')
+    def add(self, song, song_id=None):
+        """Add a song and link it to its duplicates.
+
+        @param song: song to add
+        @param song_id: (optional) unique ID for the song (default: next integer)
+        @return: ID of the added song
+        """
+        self._refresh()
+        if song_id is None:
+            song_id = next(self._ids)
+            while song_id in self._songs:
+                song_id = next(self._ids)
+        elif song_id in self._songs:
+            raise KeyError("song {0!r} is already indexed".format(song_id))
+        keys = blocking.keys(song, self.strategy)
+        candidates = set()
+        for key in keys:
+            candidates.update(self._blocks.get(key, ()))
+        metrics.count('index.candidates', len(candidates))
+        duplicates = {other for other in candidates if song.similarity(self._songs[other])}
+
+        self._songs[song_id] = song
+        self._keys[song_id] = keys
+        for key in keys:
+            self._blocks.setdefault(key, set()).add(song_id)
+        self._edges[song_id] = duplicates
+        for other in duplicates:
+            self._edges[other].add(song_id)
+        if duplicates:
+            self._merge(song_id, duplicates)
+        return song_id
+
+    @metrics.timed('index.remove')
+    def remove(self, song_id):
+        """Remove a song, splitting its cluster if it was the only link.
+
+        @param song_id: ID of the song to remove
+        @return: the removed song
+        """
+        self._refresh()
+        song = self._songs.pop(song_id)
+        for key in self._keys.pop(song_id):
+            block = self._blocks[key]
+            block.discard(song_id)
+            if not block:
+                del self._blocks[key]
+        for other in self._edges.pop(song_id):
+            self._edges[other].discard(song_id)
+        cluster = self._cluster.pop(song_id, None)
+        if cluster is not None:
+            self._split(cluster, song_id)
+        return song
+
+    def update(self, song_id, song):
+        """Replace the song stored under an ID and relink its duplicates.
+
+        @param song_id: ID of the song to replace
+        @param song: new song for the ID
+        """
+        self.remove(song_id)
+        self.add(song, song_id)
+
+    def _emit(self, event):
+        """Queue an event and notify listeners."""
+        self.events.append(event)
+        for listener in self.listeners:
+            listener(event)
+
+    def _merge(self, song_id, duplicates):
+        """Join a song and the clusters of its duplicates."""
+        clusters = sorted({self._cluster[other] for other in duplicates if other in self._cluster})
+        if clusters:
+            cluster, previous = clusters[0], tuple(clusters[1:])
+        else:
+            cluster, previous = next(self._cluster_ids), ()
+        members = self._members.setdefault(cluster, set())
+        for other in previous:
+            absorbed = self._members.pop(other)
+            members.update(absorbed)
+        members.add(song_id)
+        members.update(duplicates)
+        for member in members:
+            self._cluster[member] = cluster
+        self._emit(Event('merge', cluster, frozenset(members), previous))
+
+    def _split(self, cluster, song_id):
+        """Find the connected parts of a cluster after removing a song.
+
+        Parts are found from their smallest song ID, so new cluster IDs
+        are assigned in the same order on every run.
+        """
+        remaining = self._members.pop(cluster)
+        remaining.discard(song_id)
+        parts = []
+        unvisited = set(remaining)
+        for start in sorted(remaining):
+            if start not in unvisited:
+                continue
+            unvisited.discard(start)
+            part, queue = {start}, [start]
+            while queue:
+                for other in self._edges[queue.pop()]:
+                    if other in unvisited:
+                        unvisited.discard(other)
+                        part.add(other)
+                        queue.append(other)
+            parts.append(part)
+        groups = [part for part in parts if len(part) > 1]
+        for member in remaining:
+            self._cluster.pop(member, None)
+
+        if len(parts) == 1 and groups:
+            self._members[cluster] = remaining
+            for member in remaining:
+                self._cluster[member] = cluster
+            self._emit(Event('shrink', cluster, frozenset(remaining), ()))
+        elif groups:
+            for part in groups:
+                new = next(self._cluster_ids)
+                self._members[new] = part
+                for member in part:
+                    self._cluster[member] = new
+                self._emit(Event('split', new, frozenset(part), (cluster,)))
+        else:
+            self._emit(Event('dissolve', cluster, frozenset(), ()))
+
+
+PREFIX_FIELDS = ('artist', 'title')
+MERGE = 1024  # songs added before they are merged into the sorted arrays
+SCAN = 100  # most candidates ranked for one lookup
+VISIT = 10000  # most postings read to find the candidates of one lookup
+LAST = '\U0010ffff'  # sorts after every name starting with a prefix
+
+
+class PrefixIndex(object):
+
+    """Sorted arrays of normalized artist and title names for search as you type.
+
+    Each field keeps its distinct names sorted and the songs of every name
+    in one contiguous slice of a postings array, so the songs whose name
+    starts with a prefix are found with two binary searches and read
+    without visiting any other song. Songs added later are kept in a short
+    list that is merged into the arrays once it grows.
+    """
+
+    def __init__(self, songs=()):
+        """Initialize a new index.
+
+        @param songs: (optional) songs to add to the index
+        """
+        self._config = config.current()
+        self._songs = list(songs)
+        self._count = len(self._songs)
+        self._keys = {field: [] for field in PREFIX_FIELDS}
+        self._names = {field: [] for field in PREFIX_FIELDS}
+        self._offsets = {field: array('q', [0]) for field in PREFIX_FIELDS}
+        self._postings = {field: array('q') for field in PREFIX_FIELDS}
+        self._pending = []
+        self.version = 0  # changes whenever the sorted arrays are rebuilt
+        self._build()
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, song_id):
+        return 0 <= song_id < len(self._songs) and self._songs[song_id] is not None
+
+    def __getitem__(self, song_id):
+        song = self._songs[song_id]
+        if song is None:
+            raise KeyError(song_id)
+        return song
+
+    @staticmethod
+    def _key(song, field):
+        """Get the normalized name of a song's field."""
+        return song.artist_key if field == 'artist' else song.title_key
+
+    def _build(self):
+        """Sort the names of every song into compact arrays."""
+        with metrics.Timer('index.prefix.build'):
+            for field in PREFIX_FIELDS:
+                keys = self._keys[field]
+                keys.extend(self._key(song, field) if song is not None else ""
+                            for song in self._songs[len(keys):])
+                postings = {}
+                for song_id, song in enumerate(self._songs):
+                    if song is not None:
+                        postings.setdefault(keys[song_id], []).append(song_id)
+                names = sorted(postings)
+                offsets, ids = array('q', [0]), array('q')
+                for name in names:
+                    ids.extend(postings[name])
+                    offsets.append(len(ids))
+                self._names[field], self._offsets[field], self._postings[field] = names, offsets, ids
+        self._pending = []
+        self.version += 1
+
+    def _refresh(self):
+        """Rebuild the arrays if the settings changed since they were built."""
+        current = config.current()
+        if current is not self._config:
+            changed = current.changes(self._config)
+            self._config = current
+            if changed:
+                for field in PREFIX_FIELDS:
+                    self._keys[field] = []
+                self._build()
+
+    def add(self, song):
+        """Add a song to the index.
+
+        @param song: song to add
+        @return: ID of the added song
+        """
+        self._refresh()
+        song_id = len(self._songs)
+        self._songs.append(song)
+        self._count += 1
+        for field in PREFIX_FIELDS:
+            self._keys[field].append(self._key(song, field))
+        self._pending.append(song_id)
+        if len(self._pending) >= MERGE:
+            self._build()
+        return song_id
+
+    def remove(self, song_id):
+        """Remove a song from the index (its name is dropped on the next merge).
+
+        @param song_id: ID of the song to remove
+        @return: the removed song
+        """
+        song = self[song_id]
+        self._songs[song_id] = None
+        self._count -= 1
+        if song_id in self._pending:
+            self._pending.remove(song_id)
+        return song
+
+    def span(self, field, prefix, low=0, high=None):
+        """Get the positions of the sorted names starting with a normalized prefix.
+
+        @param field: 'artist' or 'title'
+        @param prefix: normalized prefix
+        @param low: first position to search (narrow a shorter prefix's span)
+        @param high: (optional) position after the last one to search
+        @return: (start, end) positions in the sorted names
+        """
+        self._refresh()
+        names = self._names[field]
+        high = len(names) if high is None else high
+        start = bisect.bisect_left(names, prefix, low, high)
+        end = bisect.bisect_left(names, prefix + LAST, start, high)
+        return start, end
+
+    def complete(self, field, prefix, limit=10):
+        """Get distinct names starting with a prefix in sorted order.
+
+        @param field: 'artist' or 'title'
+        @param prefix: text typed so far
+        @param limit: most names to return
+        @return: list of normalized names
+        """
+        prefix = normalize(prefix)
+        start, end = self.span(field, prefix)
+        offsets, postings = self._offsets[field], self._postings[field]
+        names = set()
+        for position in range(start, end):
+            if len(names) >= limit:
+                break
+            if any(self._songs[postings[item]] is not None
+                   for item in range(offsets[position], offsets[position + 1])):
+                names.add(self._names[field][position])
+        names.update(self._keys[field][song_id] for song_id in self._pending
+                     if self._keys[field][song_id].startswith(prefix))
+        return sorted(names)[:limit]
+
+    def _matches(self, song_id, prefixes):
+        """Determine if a song is indexed and its names start with every prefix."""
+        if self._songs[song_id] is None:
+            return False
+        return all(self._keys[name][song_id].startswith(prefix) for name, prefix in prefixes.items())
+
+    def _exact(self, prefixes, spans):
+        """Get IDs of matching songs with a name equal to its whole prefix.
+
+        An exact name sorts first in its span, so its songs are one slice of
+        the postings (read up to VISIT songs per field).
+        """
+        exact = []
+        for field, (start, end) in spans.items():
+            if start < end and self._names[field][start] == prefixes[field]:
+                offsets, postings = self._offsets[field], self._postings[field]
+                for item in range(offsets[start], min(offsets[start + 1], offsets[start] + VISIT)):
+                    exact.append(postings[item])
+        keys = [(self._keys[field], prefix) for field, prefix in prefixes.items()]
+        exact.extend(song_id for song_id in self._pending
+                     if any(names[song_id] == prefix for names, prefix in keys))
+        found, seen = [], set()
+        for song_id in exact:
+            if song_id not in seen and self._matches(song_id, prefixes):
+                seen.add(song_id)
+                found.append(song_id)
+        return found
+
+    def _candidates(self, prefixes, spans, scan):
+        """Get IDs of songs whose names start with every prefix.
+
+        Songs with a name equal to the whole prefix come first, so they
+        are ranked however many other names share the prefix. The rest are
+        read from the postings of the field with the fewest songs in its
+        span, at most VISIT of them (with the unmerged songs), so a short
+        prefix of one field combined with a rare prefix of the other does
+        not read every song; other matches past that bound are not found.
+        """
+        def size(name):
+            """Get the number of postings in a field's span."""
+            offsets = self._offsets[name]
+            return offsets[spans[name][1]] - offsets[spans[name][0]]
+        field = min(spans, key=size)
+        start, end = spans[field]
+        offsets = self._offsets[field]
+        postings = self._postings[field]
+        ids = (postings[item] for item in range(offsets[start], offsets[end]))
+        candidates = self._exact(prefixes, spans)
+        exact = set(candidates)
+        visited = 0
+        for song_id in chain(ids, self._pending):
+            if len(candidates) >= scan:
+                break
+            visited += 1
+            if visited > VISIT:
+                break
+            if song_id not in exact and self._matches(song_id, prefixes):
+                candidates.append(song_id)
+        metrics.count('index.prefix.visited', min(visited, VISIT))
+        metrics.count('index.prefix.candidates', len(candidates))
+        return candidates
+
+    def _rank(self, candidates, prefixes, query, limit):
+        """Sort candidates by similarity to a query, then by the shortest completion.
+
+        A part can only equal the typed part when its name is the whole
+        prefix, so only those candidates are parsed and compared.
+        """
+        def rank(song_id):
+            """Get the sort key of a candidate."""
+            lengths = [len(self._keys[field][song_id]) - len(prefix) for field, prefix in prefixes.items()]
+            if 0 in lengths:
+                similarity = float(query.similarity(self._songs[song_id]))
+            else:
+                similarity = 0.0
+            return -similarity, sum(lengths), song_id
+        return [(song_id, self._songs[song_id]) for song_id in sorted(candidates, key=rank)[:limit]]
+
+    def search(self, artist="", title="", limit=10, scan=SCAN):
+        """Get songs whose artist and title start with the text typed so far.
+
+        @param artist: artist name typed so far
+        @param title: title typed so far
+        @param limit: most songs to return
+        @param scan: most matching songs to rank (bounds the time of short prefixes);
+            songs with a name equal to the typed text are always ranked
+        @return: list of (ID, song) pairs, exact duplicates of the typed song first
+        """
+        return PrefixSearch(self, limit, scan).update(artist, title)
+
+
+class PrefixSearch(object):
+
+    """Search session that narrows its spans as more text is typed.
+
+    A prefix that extends the previous one can only match names inside
+    the previous span, so each keystroke searches a smaller range.
+    """
+
+    def __init__(self, index, limit=10, scan=SCAN):
+        """Initialize a new session.
+
+        @param index: PrefixIndex to search
+        @param limit: most songs to return per update
+        @param scan: most matching songs to rank per update
+        """
+        self.index = index
+        self.limit = limit
+        self.scan = scan
+        self._version = None
+        self._prefixes = {}
+        self._spans = {}
+
+    @metrics.timed('index.prefix.search')
+    def update(self, artist="", title=""):
+        """Get songs matching the text typed so far.
+
+        @param artist: artist name typed so far
+        @param title: title typed so far
+        @return: list of (ID, song) pairs, exact duplicates of the typed song first
+        """
+        index = self.index
+        index._refresh()  # pylint: disable=W0212
+        if self._version != index.version:
+            self._version = index.version
+            self._prefixes, self._spans = {}, {}
+        prefixes, spans = {}, {}
+        for field, text in zip(PREFIX_FIELDS, (artist, title)):
+            prefix = normalize(text)
+            if not prefix:
+                continue
+            previous = self._prefixes.get(field)
+            if previous is not None and prefix.startswith(previous):
+                spans[field] = index.span(field, prefix, *self._spans[field])
+            else:
+                spans[field] = index.span(field, prefix)
+            prefixes[field] = prefix
+        self._prefixes, self._spans = prefixes, spans
+        if not prefixes:
+            return []
+        candidates = index._candidates(prefixes, spans, self.scan)  # pylint: disable=W0212
+        query = Song(artist, title)
+        return index._rank(candidates, prefixes, query, self.limit)  # pylint: disable=W0212
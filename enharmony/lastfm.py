@@ -0,0 +1,334 @@
+"""Asyncio client for Last.fm scrobble history, with a local mock server."""
+
+import json
+import time
+import asyncio
+import logging
+from urllib.parse import urlsplit, urlencode, parse_qs
+
+from enharmony import records
+
+API = 'https://ws.audioscrobbler.com/2.0/'
+RETRY_ERRORS = {8, 11, 16, 29}  # operation failed, offline, temporarily unavailable, rate limited
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 429: 'Too Many Requests',
+           500: 'Internal Server Error'}
+
+
+class LastfmError(Exception):
+
+    """Raised when Last.fm rejects a request that cannot be retried."""
+
+
+class RetryError(Exception):
+
+    """Raised internally for a failed request that may succeed if retried."""
+
+
+class RateLimiter(object):
+
+    """Token bucket spacing requests to an average rate."""
+
+    def __init__(self, rate=5.0, burst=1):
+        """Initialize a new limiter.
+
+        @param rate: requests per second (None for no limit)
+        @param burst: number of requests allowed at once
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        if not self.rate:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+async def get(url, timeout=10.0):
+    """Send an HTTP GET request and get the status and decoded JSON body.
+
+    @param url: http:// or https:// URL
+    @param timeout: seconds to wait for the whole response
+    @return: status code, JSON data
+    """
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+
+    async def request():
+        """Send the request and read the response."""
+        reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=True if secure else None)
+        try:
+            writer.write("GET {0} HTTP/1.1\r\nHost: {1}\r\nAccept: application/json\r\n"
+                         "User-Agent: enharmony\r\nConnection: close\r\n\r\n".format(path, parts.netloc)
+                         .encode('latin-1'))
+            await writer.drain()
+            line = (await reader.readline()).split()
+            if len(line) < 2 or not line[1].isdigit():
+                raise RetryError("malformed status line: {0!r}".format(b' '.join(line)))
+            status = int(line[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if headers.get('transfer-encoding', '').lower() == 'chunked':
+                body = b''
+                while True:
+                    size = int((await reader.readline()).split(b';')[0], 16)
+                    if not size:
+                        break
+                    body += await reader.readexactly(size)
+                    await reader.readline()
+            elif 'content-length' in headers:
+                body = await reader.readexactly(int(headers['content-length']))
+            else:
+                body = await reader.read()
+            return status, json.loads(body.decode('utf-8')) if body else {}
+        finally:
+            writer.close()
+
+    return await asyncio.wait_for(request(), timeout)
+
+
+def _record(track):
+    """Convert a recent track from the API into a song record."""
+    def text(value):
+        """Get the text of a field that may be a {'#text': ...} object."""
+        if isinstance(value, dict):
+            value = value.get('#text') or value.get('name')
+        return value or None
+
+    record = {'artist': text(track.get('artist')),
+              'title': text(track.get('name')),
+              'album': text(track.get('album'))}
+    date = track.get('date')
+    if date and date.get('uts'):
+        record['played'] = int(date['uts'])
+    return record
+
+
+class Fetcher(object):
+
+    """Fetches a user's recent tracks with concurrent, rate-limited requests."""
+
+    def __init__(self, user, api_key, url=API, limit=200, concurrency=4, rate=5.0,
+                 retries=5, backoff=0.5, timeout=10.0):
+        """Initialize a new fetcher.
+
+        @param user: Last.fm user name
+        @param api_key: Last.fm API key
+        @param url: API root URL (e.g. a MockServer's url)
+        @param limit: tracks per page (Last.fm allows up to 200)
+        @param concurrency: largest number of requests in flight
+        @param rate: average requests per second (Last.fm asks for at most 5)
+        @param retries: attempts after the first before giving up on a page
+        @param backoff: seconds to wait before the first retry (doubles each retry)
+        @param timeout: seconds to wait for each response
+        """
+        self.user = user
+        self.api_key = api_key
+        self.url = url
+        self.limit = limit
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.requests = 0
+        self.retried = 0
+
+    def _url(self, page):
+        query = {'method': 'user.getrecenttracks', 'user': self.user, 'api_key': self.api_key,
+                 'format': 'json', 'limit': self.limit, 'page': page}
+        return self.url + '?' + urlencode(query)
+
+    async def page(self, number):
+        """Fetch one page of recent tracks, retrying temporary failures.
+
+        @param number: page number (starting at 1)
+        @return: dictionary with 'track' (list) and '@attr' (paging) keys
+        """
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire()
+            self.requests += 1
+            try:
+                status, data = await get(self._url(number), self.timeout)
+                if 'error' in data:
+                    if data['error'] in RETRY_ERRORS:
+                        raise RetryError(data.get('message'))
+                    raise LastfmError("{0} (error {1})".format(data.get('message'), data['error']))
+                if status >= 500 or status == 429:
+                    raise RetryError("HTTP {0}".format(status))
+                if status != 200:
+                    raise LastfmError("HTTP {0}".format(status))
+                return data['recenttracks']
+            except (RetryError, OSError, ValueError, EOFError, asyncio.TimeoutError) as error:
+                if attempt == self.retries:
+                    raise LastfmError("page {0} failed after {1} attempts: {2}".format(
+                        number, attempt + 1, error))
+                delay = self.backoff * 2 ** attempt
+                logging.debug("page %s failed (%s), retrying in %ss", number, error, delay)
+                self.retried += 1
+                await asyncio.sleep(delay)
+
+    async def pages(self):
+        """Get an async iterator of pages as they arrive (not in page order)."""
+        first = await self.page(1)
+        yield first
+        total = int(first['@attr']['totalPages'])
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(number):
+            """Fetch a page while holding a concurrency slot."""
+            async with semaphore:
+                return await self.page(number)
+
+        tasks = [asyncio.ensure_future(bounded(number)) for number in range(2, total + 1)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def records(self):
+        """Get an async iterator of song records, converted page by page."""
+        async for page in self.pages():
+            tracks = page.get('track', [])
+            if isinstance(tracks, dict):  # a single track is not wrapped in a list
+                tracks = [tracks]
+            for track in tracks:
+                if track.get('@attr', {}).get('nowplaying'):
+                    continue  # not scrobbled yet (and repeated on every page 1)
+                yield _record(track)
+
+    async def songs(self):
+        """Get an async iterator of (record, Song) pairs."""
+        async for record in self.records():
+            yield record, records.song(record)
+
+
+def fetch(user, api_key, **kwargs):
+    """Fetch every recent track record of a user.
+
+    @return: list of song records (in arrival order)
+    """
+    async def collect():
+        """Gather the streamed records."""
+        return [record async for record in Fetcher(user, api_key, **kwargs).records()]
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(collect())
+    finally:
+        loop.close()
+
+
+class MockServer(object):
+
+    """Local HTTP server imitating Last.fm's user.getrecenttracks method."""
+
+    def __init__(self, library, user='user', api_key='key', fail_every=None, rate=None, delay=0.0):
+        """Initialize a new mock server.
+
+        @param library: list of song records (newest first)
+        @param user: the only known user name
+        @param api_key: the only valid API key
+        @param fail_every: (optional) respond with HTTP 500 to every Nth request
+        @param rate: (optional) requests per second before responding with error 29
+        @param delay: seconds to wait before each response
+        """
+        self.library = library
+        self.user = user
+        self.api_key = api_key
+        self.fail_every = fail_every
+        self.rate = rate
+        self.delay = delay
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self.url = None
+        self._times = []
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start listening and get the API root URL."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = "http://{0}:{1}/2.0/".format(host, port)
+        return self.url
+
+    async def close(self):
+        """Stop listening."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        """Serve one request."""
+        self.requests += 1
+        number = self.requests
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            line = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            await asyncio.sleep(self.delay)
+            status, payload = self._respond(number, line.decode('latin-1').split(' ')[1])
+            data = json.dumps(payload).encode('utf-8')
+            writer.write("HTTP/1.1 {0} {1}\r\nContent-Type: application/json\r\nContent-Length: {2}\r\n"
+                         "Connection: close\r\n\r\n".format(status, REASONS[status], len(data))
+                         .encode('latin-1') + data)
+            await writer.drain()
+        except (ConnectionError, IndexError) as error:
+            logging.debug("mock connection closed: %s", error)
+        finally:
+            self.active -= 1
+            writer.close()
+
+    def _respond(self, number, target):
+        """Get the status and JSON payload for the Nth request's target."""
+        if self.fail_every and number % self.fail_every == 0:
+            return 500, {'error': 16, 'message': "Temporarily unavailable"}
+        if self.rate:
+            now = time.monotonic()
+            self._times = [when for when in self._times if now - when < 1.0]
+            if len(self._times) >= self.rate:
+                return 429, {'error': 29, 'message': "Rate Limit Exceeded"}
+            self._times.append(now)
+        query = {name: values[0] for name, values in parse_qs(urlsplit(target).query).items()}
+        if query.get('api_key') != self.api_key:
+            return 400, {'error': 10, 'message': "Invalid API key"}
+        if query.get('method') != 'user.getrecenttracks':
+            return 400, {'error': 3, 'message': "Invalid Method"}
+        if query.get('user') != self.user:
+            return 404, {'error': 6, 'message': "User not found"}
+        limit = min(int(query.get('limit', 50)), 200)
+        page = int(query.get('page', 1))
+        total = max(1, -(-len(self.library) // limit))
+        tracks = []
+        for index, record in enumerate(self.library[(page - 1) * limit:page * limit]):
+            tracks.append({'artist': {'#text': record.get('artist') or ""},
+                           'name': record.get('title') or "",
+                           'album': {'#text': record.get('album') or ""},
+                           'date': {'uts': str(1400000000 - (page - 1) * limit - index)}})
+        return 200, {'recenttracks': {'track': tracks,
+                                      '@attr': {'user': self.user, 'page': str(page),
+                                                'perPage': str(limit), 'totalPages': str(total),
+                                                'total': str(len(self.library))}}}
@@ -0,0 +1,222 @@
+"""Low-overhead counters and timers for the parse, compare and index stages.
+
+Updates are plain dictionary increments (no locks or logging), so they
+can stay enabled on hot paths. Values are per process: work done in a
+worker pool is not included in the parent's snapshot.
+"""
+
+import sys
+import time
+import threading
+import functools
+from collections import Counter, defaultdict
+
+PREFIX = 'enharmony'
+
+_counts = defaultdict(int)
+_calls = defaultdict(int)
+_seconds = defaultdict(float)
+_gauges = {}
+_state = {'enabled': True}
+
+
+def enable(enabled=True):
+    """Turn collection on or off (off leaves one branch per call)."""
+    _state['enabled'] = enabled
+
+
+def enabled():
+    """Determine if metrics are being collected."""
+    return _state['enabled']
+
+
+def reset():
+    """Clear every counter and timer."""
+    _counts.clear()
+    _calls.clear()
+    _seconds.clear()
+
+
+def count(name, value=1):
+    """Add to a counter.
+
+    @param name: dotted name of the counter (e.g. 'index.candidates')
+    @param value: amount to add
+    """
+    if _state['enabled']:
+        _counts[name] += value
+
+
+def timed(name):
+    """Decorate a function to count its calls and the time spent in them.
+
+    @param name: dotted name of the timer (e.g. 'song.similarity')
+    """
+    def decorator(function):
+        """Wrap the function with a timer."""
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            """Call the function and record its duration."""
+            if not _state['enabled']:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _seconds[name] += time.perf_counter() - start
+                _calls[name] += 1
+        return wrapper
+    return decorator
+
+
+class Timer(object):  # pylint: disable=R0903
+
+    """Context manager to time a block of code."""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        if _state['enabled']:
+            _seconds[self.name] += time.perf_counter() - self.start
+            _calls[self.name] += 1
+
+
+def gauge(name, function):
+    """Register a function to read a value only when a snapshot is taken.
+
+    @param name: dotted name of the gauge (e.g. 'cache.phonetic.size')
+    @param function: function with no arguments returning a number
+    """
+    _gauges[name] = function
+
+
+def cache(name, function):
+    """Register the hits, misses and size of an lru_cache as gauges."""
+    gauge('cache.{0}.hits'.format(name), lambda: function.cache_info().hits)
+    gauge('cache.{0}.misses'.format(name), lambda: function.cache_info().misses)
+    gauge('cache.{0}.size'.format(name), lambda: function.cache_info().currsize)
+
+
+def snapshot():
+    """Get the current values as a dictionary.
+
+    @return: {'counters': {name: value},
+              'timers': {name: {'count': calls, 'seconds': total}},
+              'gauges': {name: value}}
+    """
+    return {'counters': dict(_counts),
+            'timers': {name: {'count': _calls[name], 'seconds': _seconds[name]} for name in list(_calls)},
+            'gauges': {name: function() for name, function in sorted(_gauges.items())}}
+
+
+def _metric(name, suffix=''):
+    """Get a Prometheus metric name from a dotted name."""
+    return "{0}_{1}{2}".format(PREFIX, name.replace('.', '_').replace('-', '_'), suffix)
+
+
+def prometheus(values=None):
+    """Format a snapshot in the Prometheus text exposition format.
+
+    @param values: (optional) dictionary from snapshot() (default: a new one)
+    @return: string
+    """
+    values = values or snapshot()
+    lines = []
+    for name, value in sorted(values['counters'].items()):
+        metric = _metric(name, '_total')
+        lines.append("# TYPE {0} counter".format(metric))
+        lines.append("{0} {1}".format(metric, value))
+    for name, timer in sorted(values['timers'].items()):
+        metric = _metric(name, '_seconds')
+        lines.append("# TYPE {0} summary".format(metric))
+        lines.append("{0}_count {1}".format(metric, timer['count']))
+        lines.append("{0}_sum {1!r}".format(metric, timer['seconds']))
+    for name, value in sorted(values['gauges'].items()):
+        metric = _metric(name)
+        lines.append("# TYPE {0} gauge".format(metric))
+        lines.append("{0} {1}".format(metric, value))
+    return '\n'.join(lines) + '\n'
+
+
+class Sampler(object):
+
+    """Sampling profiler that counts the stacks of one thread.
+
+    A background thread records the stack of the target thread every
+    interval, optionally only once a run has been going for a while, so
+    fast runs pay nothing. Stacks are in the collapsed format read by
+    flame graph tools.
+    """
+
+    def __init__(self, interval=0.005, delay=0.0, thread=None):
+        """Initialize a new sampler.
+
+        @param interval: seconds between samples
+        @param delay: seconds to wait before the first sample (only profile slow runs)
+        @param thread: (optional) ID of the thread to sample (default: the current one)
+        """
+        self.interval = interval
+        self.delay = delay
+        self.thread = thread or threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._worker = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def start(self):
+        """Start sampling in a background thread."""
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name='enharmony-sampler', daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """Stop sampling."""
+        self._stop.set()
+        if self._worker:
+            self._worker.join()
+            self._worker = None
+
+    def _run(self):
+        """Take samples until stopped."""
+        if self._stop.wait(self.delay):
+            return
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread)  # pylint: disable=W0212
+            if frame is None:
+                return
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append("{0}:{1}".format(code.co_filename.rsplit('/', 1)[-1], code.co_name))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Get the samples as collapsed stacks ('a;b;c count' lines)."""
+        return ''.join("{0} {1}\n".format(stack, number) for stack, number in self.stacks.most_common())
+
+    def top(self, limit=10):
+        """Get the functions seen most often at the top of a stack.
+
+        @return: list of (function, fraction of samples) pairs
+        """
+        leaves = Counter()
+        for stack, number in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += number
+        return [(name, number / self.samples) for name, number in leaves.most_common(limit)]
@@ -0,0 +1,136 @@
+"""Phonetic encoding of names so sound-alike spellings share a key."""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+from enharmony import config, metrics
+from enharmony.base import normalize
+
+VOWELS = frozenset('AEIOU')
+FRONT = frozenset('EIY')  # vowels that soften a preceding C or G
+SILENT_STARTS = ('AE', 'GN', 'KN', 'PN', 'WR')
+CACHE_SIZE = 65536
+RUNS = re.compile(r"\d+|\D+")  # digit runs and the text between them
+FIELDS = ('ARTICLES', 'JOINERS')  # settings used to normalize names
+
+
+def metaphone(word):  # pylint: disable=R0912,R0915
+    """Encode a single word with the (original) Metaphone algorithm.
+
+    @param word: word containing letters (other characters are ignored)
+    @return: uppercase phonetic code ('0' represents 'th')
+    """
+    text = ''.join(char for char in unicodedata.normalize('NFKD', word.upper())
+                   if 'A' <= char <= 'Z')
+    if not text:
+        return ""
+    if text[:2] in SILENT_STARTS:
+        text = text[1:]
+    elif text[0] == 'X':
+        text = 'S' + text[1:]
+    elif text[:2] == 'WH':
+        text = 'W' + text[2:]
+
+    code = []
+    length = len(text)
+    for index, char in enumerate(text):
+        prev = text[index - 1] if index else ''
+        following = text[index + 1] if index + 1 < length else ''
+        after = text[index + 2] if index + 2 < length else ''
+        if char == prev and char != 'C':
+            continue
+        if char in VOWELS:
+            if index == 0:
+                code.append(char)
+        elif char == 'B':
+            if not (prev == 'M' and index == length - 1):
+                code.append('B')
+        elif char == 'C':
+            if following == 'I' and after == 'A' or following == 'H':
+                code.append('K' if prev == 'S' else 'X')
+            elif following in FRONT:
+                if prev != 'S':
+                    code.append('S')
+            else:
+                code.append('K')
+        elif char == 'D':
+            code.append('J' if following == 'G' and after in FRONT else 'T')
+        elif char == 'G':
+            if following == 'H' and not (index + 2 == length or after in VOWELS):
+                continue
+            if following == 'N' and (index + 2 == length or text[index + 2:] == 'NED'):
+                continue
+            if prev == 'D' and following in FRONT:
+                continue
+            code.append('J' if following in FRONT else 'K')
+        elif char == 'H':
+            if prev in 'CSPTG':
+                continue
+            if prev in VOWELS and following not in VOWELS:
+                continue
+            code.append('H')
+        elif char == 'K':
+            if prev != 'C':
+                code.append('K')
+        elif char == 'P':
+            code.append('F' if following == 'H' else 'P')
+        elif char == 'Q':
+            code.append('K')
+        elif char == 'S':
+            if following == 'H' or following == 'I' and after in 'AO':
+                code.append('X')
+            else:
+                code.append('S')
+        elif char == 'T':
+            if following == 'I' and after in 'AO':
+                code.append('X')
+            elif following == 'H':
+                code.append('0')
+            elif not (following == 'C' and after == 'H'):
+                code.append('T')
+        elif char == 'V':
+            code.append('F')
+        elif char in 'WY':
+            if following in VOWELS:
+                code.append(char)
+        elif char == 'X':
+            code.append('KS')
+        elif char == 'Z':
+            code.append('S')
+        else:
+            code.append(char)
+    return ''.join(code)
+
+
+def encode(name):
+    """Get a cached phonetic key for a name.
+
+    The name is normalized first (lowercase, joiners replaced, articles
+    stripped), so spellings that only differ there share a cache entry.
+
+    @param name: name to encode
+    @return: space-separated phonetic codes
+    """
+    return _encode(normalize(name))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _encode(text):
+    """Encode each word of normalized text.
+
+    Digit runs are kept as written, including those inside words (e.g.
+    "blink-182" or "maroon5"). Text without any encodable words is
+    returned unchanged.
+    """
+    words = []
+    for word in text.split():
+        for run in RUNS.findall(word):
+            code = run if run.isdigit() else metaphone(run)
+            if code:
+                words.append(code)
+    return ' '.join(words) or text
+
+
+config.subscribe(FIELDS, _encode.cache_clear)
+metrics.cache('phonetic', _encode)
@@ -0,0 +1,198 @@
+"""One-to-one reconciliation of songs between two libraries."""
+
+import time
+import logging
+from collections import namedtuple
+
+from enharmony import blocking, metrics
+from enharmony.dedupe import Clusters
+
+OPTIMAL_LIMIT = 1000  # most songs in a component solved exactly (about a second)
+
+Reconciliation = namedtuple('Reconciliation', ['pairs', 'left', 'right', 'comparisons', 'timing'])
+Reconciliation.__doc__ = """Result of reconciling two libraries.
+
+pairs: list of (left index, right index, score) sorted by left index
+left: sorted indices of unmatched songs in the left library
+right: sorted indices of unmatched songs in the right library
+comparisons: number of candidate pairs scored
+timing: dictionary of seconds spent blocking, scoring, assigning and in total
+"""
+
+
+def candidates(left, right, strategy='artist'):
+    """Get the pairs of songs sharing a blocking key.
+
+    @param left: list of songs
+    @param right: list of songs
+    @param strategy: name of a blocking strategy in blocking.STRATEGIES
+    @return: sorted list of (left index, right index) pairs
+    """
+    groups = blocking.blocks(right, strategy)
+    pairs = set()
+    for index, song in enumerate(left):
+        for key in blocking.keys(song, strategy):
+            pairs.update((index, other) for other in groups.get(key, ()))
+    return sorted(pairs)
+
+
+def greedy(edges):
+    """Assign pairs in order of decreasing score.
+
+    @param edges: list of (left index, right index, score)
+    @return: list of assigned edges
+    """
+    used_left, used_right = set(), set()
+    assigned = []
+    for edge in sorted(edges, key=lambda edge: (-edge[2], edge[0], edge[1])):
+        index1, index2, _ = edge
+        if index1 not in used_left and index2 not in used_right:
+            used_left.add(index1)
+            used_right.add(index2)
+            assigned.append(edge)
+    return assigned
+
+
+def optimal(edges, limit=OPTIMAL_LIMIT):
+    """Assign pairs to maximize the total score.
+
+    The candidate graph is split into connected components and each
+    component is solved exactly with the (dense, cubic) Hungarian
+    algorithm, so the cost depends on the size of the largest block rather
+    than the size of the libraries. Components with more songs than the
+    limit are assigned with greedy() instead.
+
+    @param edges: list of (left index, right index, score)
+    @param limit: most songs (left and right) in a component solved exactly
+    @return: list of assigned edges
+    """
+    lefts = {index: position for position, index in enumerate(sorted({edge[0] for edge in edges}))}
+    rights = {index: len(lefts) + position
+              for position, index in enumerate(sorted({edge[1] for edge in edges}))}
+    clusters = Clusters(len(lefts) + len(rights))
+    for index1, index2, _ in edges:
+        clusters.union(lefts[index1], rights[index2])
+    components = {}
+    for edge in edges:
+        components.setdefault(clusters.find(lefts[edge[0]]), []).append(edge)
+    assigned = []
+    for _, component in sorted(components.items()):
+        size = len({edge[0] for edge in component}) + len({edge[1] for edge in component})
+        if size > limit:
+            logging.debug("assigning a component of %s songs greedily", size)
+            metrics.count('reconcile.greedy_components')
+            assigned.extend(greedy(component))
+        else:
+            assigned.extend(_assign(component))
+    return assigned
+
+
+def _assign(edges):
+    """Solve the maximum score assignment of one connected component."""
+    if len(edges) == 1:
+        return edges
+    rows = sorted({edge[0] for edge in edges})
+    columns = sorted({edge[1] for edge in edges})
+    transposed = len(rows) > len(columns)
+    if transposed:
+        rows, columns = columns, rows
+    row_positions = {index: position for position, index in enumerate(rows, start=1)}
+    column_positions = {index: position for position, index in enumerate(columns, start=1)}
+    cost = [[0.0] * (len(columns) + 1) for _ in range(len(rows) + 1)]
+    scores = {}
+    for index1, index2, score in edges:
+        row, column = (index2, index1) if transposed else (index1, index2)
+        cost[row_positions[row]][column_positions[column]] = -score
+        scores[row, column] = score
+    assigned = []
+    for row, column in _hungarian(cost, len(rows), len(columns)):
+        row, column = rows[row - 1], columns[column - 1]
+        if (row, column) in scores:  # zero cost cells are not candidates
+            pair = (column, row) if transposed else (row, column)
+            assigned.append(pair + (scores[row, column],))
+    return assigned
+
+
+def _hungarian(cost, count, width):
+    """Find the minimum cost assignment of every row to a column.
+
+    @param cost: 1-indexed matrix with count rows and width >= count columns
+    @return: list of (row, column) positions
+    """
+    inf = float('inf')
+    row_potential = [0.0] * (count + 1)
+    column_potential = [0.0] * (width + 1)
+    owner = [0] * (width + 1)  # row assigned to each column
+    way = [0] * (width + 1)
+    for row in range(1, count + 1):
+        owner[0] = row
+        column0 = 0
+        minimum = [inf] * (width + 1)
+        used = [False] * (width + 1)
+        while True:
+            used[column0] = True
+            row0 = owner[column0]
+            delta, column1 = inf, 0
+            for column in range(1, width + 1):
+                if not used[column]:
+                    current = cost[row0][column] - row_potential[row0] - column_potential[column]
+                    if current < minimum[column]:
+                        minimum[column], way[column] = current, column0
+                    if minimum[column] < delta:
+                        delta, column1 = minimum[column], column
+            for column in range(width + 1):
+                if used[column]:
+                    row_potential[owner[column]] += delta
+                    column_potential[column] -= delta
+                else:
+                    minimum[column] -= delta
+            column0 = column1
+            if owner[column0] == 0:
+                break
+        while column0:
+            column1 = way[column0]
+            owner[column0] = owner[column1]
+            column0 = column1
+    return [(owner[column], column) for column in range(1, width + 1) if owner[column]]
+
+
+def reconcile(left, right, strategy='artist', mode='greedy', minimum=None, limit=OPTIMAL_LIMIT):
+    """Map songs in one library to at most one song in another.
+
+    @param left: iterable of songs
+    @param right: iterable of songs
+    @param strategy: name of a blocking strategy in blocking.STRATEGIES
+    @param mode: 'greedy' (highest scores first) or 'optimal' (highest total score)
+    @param minimum: (optional) lowest score to match (default: similarity threshold)
+    @param limit: most songs in a component solved exactly in optimal mode
+    @return: Reconciliation
+    """
+    if mode not in ('greedy', 'optimal'):
+        raise ValueError("unknown mode: {0}".format(mode))
+    start = time.perf_counter()
+    left, right = list(left), list(right)
+    pairs = candidates(left, right, strategy)
+    blocked = time.perf_counter()
+
+    edges = []
+    for index1, index2 in pairs:
+        similarity = left[index1].similarity(right[index2])
+        score = float(similarity)
+        if (score >= minimum) if minimum is not None else bool(similarity):
+            edges.append((index1, index2, score))
+    scored = time.perf_counter()
+
+    assigned = sorted(greedy(edges) if mode == 'greedy' else optimal(edges, limit))
+    finished = time.perf_counter()
+
+    matched_left = {edge[0] for edge in assigned}
+    matched_right = {edge[1] for edge in assigned}
+    timing = {'blocking': blocked - start,
+              'scoring': scored - blocked,
+              'assignment': finished - scored,
+              'total': finished - start}
+    logging.debug("matched %s of %s and %s songs", len(assigned), len(left), len(right))
+    return Reconciliation(assigned,
+                          [index for index in range(len(left)) if index not in matched_left],
+                          [index for index in range(len(right)) if index not in matched_right],
+                          len(pairs), timing)
@@ -0,0 +1,35 @@
+"""Functions to read and write raw song records."""
+
+import csv
+import json
+
+from enharmony.song import Song
+
+FIELDS = 'artist', 'title', 'album', 'year', 'track', 'duration'
+
+
+def read(stream, fmt='jsonl'):
+    """Get an iterator of song records from a file.
+
+    @param stream: open text file of records
+    @param fmt: 'jsonl' (one object per line) or 'csv' (with a header)
+    @return: generator of dictionaries
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield {key: value or None for key, value in row.items()}
+    else:
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def write(stream, obj):
+    """Write an object to a file as one line of JSON."""
+    stream.write(json.dumps(obj, sort_keys=True) + '\n')
+
+
+def song(record):
+    """Create a song from a record's fields."""
+    return Song(**{field: record.get(field) for field in FIELDS})
@@ -0,0 +1,469 @@
+"""Threaded scanner to read song records from the tags of audio files.
+
+MP3 (ID3v1/ID3v2), FLAC and WAV (RIFF INFO) tags are read with the
+standard library. Other formats are read with mutagen when installed.
+"""
+
+import os
+import json
+import struct
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import mutagen
+except ImportError:  # pragma: no cover (manual test)
+    mutagen = None
+
+from enharmony import records
+from enharmony.index import DedupIndex
+
+MUTAGEN_EXTENSIONS = ('.m4a', '.mp4', '.ogg', '.oga', '.opus', '.wma', '.ape', '.aiff')
+
+ID3_FRAMES = {'TPE1': 'artist', 'TIT2': 'title', 'TALB': 'album', 'TYER': 'year', 'TDRC': 'year',
+              'TRCK': 'track', 'TLEN': 'duration',
+              'TP1': 'artist', 'TT2': 'title', 'TAL': 'album', 'TYE': 'year', 'TRK': 'track',
+              'TLE': 'duration'}
+VORBIS_FIELDS = {'ARTIST': 'artist', 'TITLE': 'title', 'ALBUM': 'album', 'DATE': 'year',
+                 'YEAR': 'year', 'TRACKNUMBER': 'track'}
+RIFF_FIELDS = {b'IART': 'artist', b'INAM': 'title', b'IPRD': 'album', b'ICRD': 'year',
+               b'ITRK': 'track', b'IPRT': 'track'}
+
+# MPEG audio Layer III bit rates (kbps) for MPEG-1 and MPEG-2/2.5
+MPEG_BITRATES = {3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+                 2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)}
+MPEG_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+class TagError(ValueError):
+
+    """Raised when an audio file's tags cannot be read."""
+
+
+def _clean(record):
+    """Convert raw tag strings into song record values."""
+    result = {}
+    for field in records.FIELDS:
+        value = record.get(field)
+        if isinstance(value, str):
+            value = value.strip().strip('\x00').strip() or None
+        if value is not None and field in ('year', 'track'):
+            digits = str(value).split('/')[0].strip()[:4 if field == 'year' else None]
+            value = int(digits) if digits.isdecimal() else None
+        result[field] = value
+    return result
+
+
+def _syncsafe(data):
+    """Decode a 28-bit integer stored in 4 bytes of 7 bits."""
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _id3_text(data):
+    """Decode the first value of an ID3v2 text frame."""
+    if not data:
+        return None
+    encoding, data = data[0], data[1:]
+    if encoding == 1:
+        text = data.decode('utf-16', 'replace')
+    elif encoding == 2:
+        text = data.decode('utf-16-be', 'replace')
+    elif encoding == 3:
+        text = data.decode('utf-8', 'replace')
+    else:
+        text = data.decode('latin-1')
+    return text.split('\x00')[0]
+
+
+def _id3v2(stream):
+    """Read the fields of an ID3v2 tag at the start of a file.
+
+    @return: dictionary of raw fields, size of the tag in bytes
+    """
+    header = stream.read(10)
+    if len(header) < 10 or header[:3] != b'ID3':
+        return {}, 0
+    version, flags, size = header[3], header[5], _syncsafe(header[6:10])
+    data = stream.read(size)
+    if flags & 0x80 and version < 4:
+        data = data.replace(b'\xff\x00', b'\xff')  # remove unsynchronisation
+    position = 0
+    if flags & 0x40 and version >= 3:  # skip the extended header
+        extended = struct.unpack('>I', data[:4])[0]
+        position = _syncsafe(data[:4]) if version == 4 else extended + 4
+    width = 3 if version == 2 else 4
+    fields = {}
+    while position + width * 2 <= len(data):
+        name = data[position:position + width].decode('latin-1')
+        if not name.strip('\x00'):
+            break  # padding
+        if version == 2:
+            length = int.from_bytes(data[position + 3:position + 6], 'big')
+            position += 6
+        else:
+            raw = data[position + 4:position + 8]
+            length = _syncsafe(raw) if version == 4 else struct.unpack('>I', raw)[0]
+            position += 10
+        field = ID3_FRAMES.get(name)
+        if field and field not in fields:
+            fields[field] = _id3_text(data[position:position + length])
+        position += length
+    if 'duration' in fields:
+        milliseconds = fields.pop('duration')
+        if milliseconds and milliseconds.strip().isdecimal():
+            fields['duration'] = round(int(milliseconds) / 1000)
+    return fields, size + 10
+
+
+def _id3v1(stream):
+    """Read the fields of an ID3v1 tag at the end of a file."""
+    stream.seek(-128, os.SEEK_END)
+    data = stream.read(128)
+    if data[:3] != b'TAG':
+        return {}
+    fields = {'title': data[3:33], 'artist': data[33:63], 'album': data[63:93], 'year': data[93:97]}
+    fields = {key: value.split(b'\x00')[0].decode('latin-1') for key, value in fields.items()}
+    if data[125] == 0 and data[126]:  # ID3v1.1 track number
+        fields['track'] = data[126]
+    return fields
+
+
+def _mpeg_duration(stream, offset, size):
+    """Estimate the duration of MPEG audio from its first frame.
+
+    Uses the frame count of a Xing/Info header when present (VBR),
+    otherwise the bit rate of the first frame (CBR).
+    """
+    stream.seek(offset)
+    data = stream.read(4096)
+    position = data.find(b'\xff')
+    while 0 <= position < len(data) - 4:
+        if data[position + 1] & 0xe0 == 0xe0:
+            break
+        position = data.find(b'\xff', position + 1)
+    else:
+        return None
+    header = struct.unpack('>I', data[position:position + 4])[0]
+    version = (header >> 19) & 3  # 3: MPEG-1, 2: MPEG-2, 0: MPEG-2.5
+    layer = (header >> 17) & 3
+    bitrate_index = (header >> 12) & 15
+    rate_index = (header >> 10) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None  # reserved values or not Layer III
+    rate = MPEG_RATES[version][rate_index]
+    samples = 1152 if version == 3 else 576
+    for marker in (b'Xing', b'Info'):
+        found = data.find(marker, position, position + 64)
+        if found >= 0 and struct.unpack('>I', data[found + 4:found + 8])[0] & 1:
+            frames = struct.unpack('>I', data[found + 8:found + 12])[0]
+            return round(frames * samples / rate)
+    bitrate = MPEG_BITRATES[3 if version == 3 else 2][bitrate_index] * 1000
+    return round((size - offset - position) * 8 / bitrate)
+
+
+def _mp3(path):
+    """Read an MP3 file's tags."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as stream:
+        fields, offset = _id3v2(stream)
+        if size >= 128:
+            for key, value in _id3v1(stream).items():
+                fields.setdefault(key, value)
+        if not fields.get('duration'):
+            fields['duration'] = _mpeg_duration(stream, offset, size)
+    return fields
+
+
+def _flac(path):
+    """Read a FLAC file's Vorbis comments and stream info."""
+    fields = {}
+    with open(path, 'rb') as stream:
+        if stream.read(4) != b'fLaC':
+            raise TagError("not a FLAC file")
+        last = False
+        while not last:
+            header = stream.read(4)
+            if len(header) < 4:
+                break
+            last, kind = header[0] & 0x80, header[0] & 0x7f
+            data = stream.read(int.from_bytes(header[1:], 'big'))
+            if kind == 0 and len(data) >= 18:  # STREAMINFO
+                info = int.from_bytes(data[10:18], 'big')
+                rate, samples = info >> 44, info & 0xfffffffff
+                if rate:
+                    fields['duration'] = round(samples / rate)
+            elif kind == 4:  # VORBIS_COMMENT
+                position = 4 + struct.unpack('<I', data[:4])[0]
+                count = struct.unpack('<I', data[position:position + 4])[0]
+                position += 4
+                for _ in range(count):
+                    length = struct.unpack('<I', data[position:position + 4])[0]
+                    comment = data[position + 4:position + 4 + length].decode('utf-8', 'replace')
+                    position += 4 + length
+                    name, _, value = comment.partition('=')
+                    field = VORBIS_FIELDS.get(name.upper())
+                    if field:
+                        fields.setdefault(field, value)
+    return fields
+
+
+def _wav(path):
+    """Read a WAV file's RIFF INFO tags and duration."""
+    fields = {}
+    byte_rate = None
+    with open(path, 'rb') as stream:
+        header = stream.read(12)
+        if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            raise TagError("not a WAV file")
+        while True:
+            chunk = stream.read(8)
+            if len(chunk) < 8:
+                break
+            name, length = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+            if name == b'data':
+                if byte_rate:
+                    fields['duration'] = round(length / byte_rate)
+                stream.seek(length + length % 2, os.SEEK_CUR)
+                continue
+            data = stream.read(length + length % 2)
+            if name == b'fmt ':
+                byte_rate = struct.unpack('<I', data[8:12])[0]
+            elif name == b'LIST' and data[:4] == b'INFO':
+                position = 4
+                while position + 8 <= length:
+                    key, size = data[position:position + 4], struct.unpack('<I', data[position + 4:position + 8])[0]
+                    field = RIFF_FIELDS.get(key)
+                    if field:
+                        value = data[position + 8:position + 8 + size].split(b'\x00')[0]
+                        fields.setdefault(field, value.decode('utf-8', 'replace'))
+                    position += 8 + size + size % 2
+    return fields
+
+
+def _mutagen(path):  # pragma: no cover (optional dependency)
+    """Read any format's tags with mutagen."""
+    audio = mutagen.File(path, easy=True)
+    if audio is None:
+        raise TagError("unknown format")
+    fields = {}
+    for name, field in (('artist', 'artist'), ('title', 'title'), ('album', 'album'),
+                        ('date', 'year'), ('tracknumber', 'track')):
+        values = (audio.tags or {}).get(name)
+        if values:
+            fields[field] = values[0]
+    if audio.info and getattr(audio.info, 'length', None):
+        fields['duration'] = round(audio.info.length)
+    return fields
+
+
+READERS = {'.mp3': _mp3, '.flac': _flac, '.wav': _wav}
+if mutagen:  # pragma: no cover (optional dependency)
+    READERS.update({extension: _mutagen for extension in MUTAGEN_EXTENSIONS})
+
+
+def read(path):
+    """Read a song record from an audio file's tags.
+
+    @param path: path of an audio file
+    @return: dictionary of the fields in records.FIELDS
+    @raise TagError: when the file cannot be read
+    """
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise TagError("unsupported format: {0}".format(path))
+    try:
+        return _clean(reader(path))
+    except (OSError, struct.error, IndexError, UnicodeError) as error:
+        raise TagError("{0}: {1}".format(path, error))
+
+
+class Manifest(object):
+
+    """Saved modification times, sizes and records of scanned files."""
+
+    VERSION = 1
+
+    def __init__(self, path=None):
+        """Initialize a manifest, loading it from a file if it exists.
+
+        @param path: (optional) JSON file to load from and save to
+        """
+        self.path = path
+        self.files = {}
+        if path and os.path.exists(path):
+            with open(path) as stream:
+                data = json.load(stream)
+            if data.get('version') == self.VERSION:
+                self.files = data['files']
+
+    def get(self, name, stat):
+        """Get the saved entry for a file if it has not changed (or None)."""
+        entry = self.files.get(name)
+        if entry and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry
+        return None
+
+    def set(self, name, stat, record, error=None):
+        """Save the record (or error) read from a file."""
+        self.files[name] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size,
+                            'record': record, 'error': error}
+
+    def discard(self, name):
+        """Forget a file if it was saved."""
+        self.files.pop(name, None)
+
+    def prune(self, names):
+        """Forget the files that are not in a set of names.
+
+        @return: list of the names forgotten
+        """
+        removed = [name for name in self.files if name not in names]
+        for name in removed:
+            del self.files[name]
+        return removed
+
+    def save(self):
+        """Write the manifest to its file."""
+        if not self.path:
+            return
+        with open(self.path + '.tmp', 'w') as stream:
+            json.dump({'version': self.VERSION, 'files': self.files}, stream, sort_keys=True)
+        os.replace(self.path + '.tmp', self.path)
+
+
+class Scanner(object):
+
+    """Reads song records from a directory of audio files in a thread pool."""
+
+    def __init__(self, root, manifest=None, workers=8, extensions=None):
+        """Initialize a new scanner.
+
+        @param root: directory to scan recursively
+        @param manifest: (optional) path of a manifest to skip unchanged files
+        @param workers: number of threads reading tags
+        @param extensions: (optional) file extensions to read (default: every readable format)
+        """
+        self.root = root
+        self.manifest = Manifest(manifest)
+        self.workers = workers
+        self.extensions = tuple(extensions or READERS)
+        self.read = self.skipped = self.failed = self.removed = 0
+        self.unchanged = set()  # files taken from the manifest in the last scan
+        self.dropped = set()  # files removed or unreadable in the last scan
+
+    def __repr__(self):
+        return "<Scanner {0!r}: {1} read, {2} skipped, {3} failed, {4} removed>".format(
+            self.root, self.read, self.skipped, self.failed, self.removed)
+
+    def paths(self):
+        """Get an iterator of the audio file paths (relative to the root)."""
+        for directory, names, files in os.walk(self.root):
+            names.sort()
+            for name in sorted(files):
+                if name.lower().endswith(self.extensions):
+                    yield os.path.relpath(os.path.join(directory, name), self.root)
+
+    def _read(self, name):
+        """Read one file's tags (in a worker thread)."""
+        path = os.path.join(self.root, name)
+        try:
+            stat = os.stat(path)
+            return name, stat, read(path), None
+        except TagError as error:
+            return name, stat, None, str(error)
+        except OSError as error:  # removed after it was listed
+            return name, None, None, str(error)
+
+    def _finish(self, result):
+        """Save a read result to the manifest and get its record (or None)."""
+        name, stat, record, error = result
+        if stat is None:
+            logging.debug("skipped missing file: %s", error)
+            self.manifest.discard(name)
+            self.dropped.add(name)
+            self.failed += 1
+            return None
+        self.manifest.set(name, stat, record, error)
+        if error:
+            logging.debug("skipped unreadable file: %s", error)
+            self.dropped.add(name)
+            self.failed += 1
+            return None
+        self.read += 1
+        return dict(record, path=name)
+
+    def __iter__(self):
+        """Get an iterator of song records (with a 'path' key) as they are read.
+
+        Unchanged files are taken from the manifest without being opened.
+        The manifest is saved once every file has been seen.
+        """
+        seen = set()
+        pending = set()
+        self.unchanged = set()
+        self.dropped = set()
+        limit = self.workers * 4  # bound the memory used ahead of the consumer
+        with ThreadPoolExecutor(self.workers) as executor:
+            for name in self.paths():
+                try:
+                    stat = os.stat(os.path.join(self.root, name))
+                except OSError as error:  # removed after it was listed
+                    logging.debug("skipped missing file: %s", error)
+                    self.dropped.add(name)
+                    continue
+                seen.add(name)
+                entry = self.manifest.get(name, stat)
+                if entry:
+                    self.skipped += 1
+                    self.unchanged.add(name)
+                    if entry['record'] is None:
+                        self.dropped.add(name)
+                    else:
+                        yield dict(entry['record'], path=name)
+                    continue
+                pending.add(executor.submit(self._read, name))
+                if len(pending) >= limit:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record = self._finish(future.result())
+                        if record:
+                            yield record
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record = self._finish(future.result())
+                    if record:
+                        yield record
+        removed = self.manifest.prune(seen)
+        self.dropped.update(removed)
+        self.removed = len(removed)
+        self.manifest.save()
+        logging.info("scanned {0}".format(self))
+
+    def songs(self):
+        """Get an iterator of (record, Song) pairs as files are read."""
+        for record in self:
+            yield record, records.song(record)
+
+    def index(self, index=None, strategy='artist'):
+        """Add every song to a duplicate index as it is read (keyed by path).
+
+        Songs already in the index are updated only if their file changed,
+        and removed once the scan finds their file deleted or unreadable.
+
+        @param index: (optional) DedupIndex to add to (default: a new one)
+        @param strategy: blocking strategy for a new index
+        @return: the index
+        """
+        if index is None:
+            index = DedupIndex(strategy=strategy)
+        for record, song in self.songs():
+            if record['path'] in index:
+                if record['path'] not in self.unchanged:
+                    index.update(record['path'], song)
+            else:
+                index.add(song, record['path'])
+        for name in self.dropped:
+            if name in index:
+                index.remove(name)
+        return index
@@ -0,0 +1,391 @@
+"""Asyncio HTTP server for matching and deduplicating songs."""
+
+import json
+import time
+import asyncio
+import logging
+import functools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from enharmony import blocking, config, records, metrics
+from enharmony.dedupe import dedupe
+from enharmony.index import PrefixIndex
+
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf'))
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+_library = []  # songs loaded once in each worker process by _initialize()
+_version = [None]  # version of the server's settings last used in this worker
+
+
+def _initialize(library):
+    """Load the indexed song records in a worker process."""
+    _library[:] = [records.song(record) for record in library]
+
+
+def _configure(settings):
+    """Use the server's settings in a worker process when they changed.
+
+    @param settings: (version, values) of the server's config snapshot
+    """
+    version, values = settings
+    if version != _version[0]:
+        config.update(**values)
+        _version[0] = version
+
+
+def _parse(record):
+    """Create a song from a request's record."""
+    if not isinstance(record, dict):
+        raise TypeError("song records must be JSON objects")
+    return records.song(record)
+
+
+def _score(record, ids, added, library):
+    """Score a query against its candidates."""
+    song = records.song(record)
+    scores = []
+    for song_id in ids:
+        candidate = records.song(added[song_id]) if song_id in added else library[song_id]
+        similarity = song.similarity(candidate)
+        scores.append((song_id, float(similarity), bool(similarity)))
+    return scores
+
+
+def match_batch(queries, library=None, settings=None):
+    """Score a batch of queries against candidates held by the worker.
+
+    @param queries: list of (record, [ID, ...], {ID: record}) with the candidate IDs
+        and the records of candidates added after the worker was started
+    @param library: (optional) list of songs (default: the songs loaded in the worker)
+    @param settings: (optional) (version, values) of the settings to score with
+    @return: list of [(ID, similarity, duplicate), ...] (or the error) for each query
+    """
+    if settings is not None:
+        _configure(settings)
+    library = _library if library is None else library
+    results = []
+    for record, ids, added in queries:
+        try:
+            results.append(_score(record, ids, added, library))
+        except Exception as error:  # pylint: disable=W0703
+            results.append(error)
+    return results
+
+
+def dedupe_batch(libraries, settings=None):
+    """Locate duplicate clusters in a batch of record lists.
+
+    @param libraries: list of record lists
+    @param settings: (optional) (version, values) of the settings to compare with
+    @return: list of clusters (or the error) for each record list
+    """
+    if settings is not None:
+        _configure(settings)
+    results = []
+    for library in libraries:
+        try:
+            results.append(dedupe(records.song(record) for record in library))
+        except Exception as error:  # pylint: disable=W0703
+            results.append(error)
+    return results
+
+
+class Histogram(object):
+
+    """Cumulative latency histogram with fixed buckets (in seconds)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        """Record a latency."""
+        self.count += 1
+        self.sum += seconds
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+
+    def asdict(self):
+        """Get the histogram as a dictionary."""
+        return {'buckets': {('+Inf' if bound == float('inf') else str(bound)): count
+                            for bound, count in zip(self.buckets, self.counts)},
+                'count': self.count,
+                'sum': self.sum}
+
+
+class Batcher(object):
+
+    """Collects concurrent requests into micro-batches for an executor.
+
+    A result that is an exception fails only its own item, so one bad
+    request does not fail the others batched with it.
+    """
+
+    def __init__(self, function, executor, size=64, delay=0.005, settings=False):
+        """Initialize a new batcher.
+
+        @param function: picklable function mapping a list of items to a list of results
+        @param executor: concurrent.futures executor to run batches in (may be set later)
+        @param size: largest number of items per batch
+        @param delay: seconds to wait for a batch to fill
+        @param settings: send the current settings with each batch (for worker processes)
+        """
+        self.function = function
+        self.executor = executor
+        self.size = size
+        self.delay = delay
+        self.settings = settings
+        self.sizes = Histogram(buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, float('inf')))
+        self._pending = []
+        self._timer = None
+
+    async def submit(self, item):
+        """Add an item to the next batch and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.delay, self._flush)
+        return await future
+
+    def _flush(self):
+        """Send the pending items to the executor as one batch."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self.sizes.observe(len(batch))
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        """Run a batch and resolve each item's future."""
+        loop = asyncio.get_running_loop()
+        function = self.function
+        if self.settings:
+            snapshot = config.current()
+            function = functools.partial(function, settings=(snapshot.version, snapshot.asdict()))
+        try:
+            results = await loop.run_in_executor(self.executor, function, [item for item, _ in batch])
+        except Exception as error:  # pylint: disable=W0703
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class Server(object):
+
+    """HTTP server matching songs against a shared in-memory index.
+
+    Worker processes load the indexed records once when the server starts,
+    so match requests only send candidate IDs (and the records of songs
+    added since). Each batch carries the server's settings, which workers
+    swap in when they changed. With one worker, batches run in a thread on
+    the same songs. Records are validated before they are batched.
+
+    Endpoints (JSON object bodies):
+        POST /songs   {"songs": [record, ...]} -> {"ids": [...]}
+        POST /match   {"song": record, "limit": N} -> {"matches": [...]}
+        POST /dedupe  {"songs": [record, ...]} -> {"clusters": [[index, ...], ...]}
+        POST /suggest {"artist": text, "title": text, "limit": N} -> {"matches": [...]}
+        GET  /metrics -> latency and batch size histograms
+    """
+
+    def __init__(self, strategy='artist', workers=1, size=64, delay=0.005):
+        """Initialize a new server.
+
+        @param strategy: name of a blocking strategy in blocking.STRATEGIES
+        @param workers: number of processes to score in (1 uses a thread)
+        @param size: largest number of requests per batch
+        @param delay: seconds to wait for a batch to fill
+        """
+        self.strategy = strategy
+        self.workers = workers
+        self.executor = None  # started with the records added before start()
+        self.loaded = None  # number of records loaded in the worker processes
+        self.matcher = Batcher(match_batch, None, size, delay)
+        self.deduper = Batcher(dedupe_batch, None, size, delay)
+        self.latency = {}
+        self.records = []
+        self.songs = []
+        self.blocks = {}
+        self.prefixes = None  # built on the first suggestion
+        self._server = None
+
+    def add(self, record, song=None):
+        """Add a song record to the index and get its ID.
+
+        @param record: song record
+        @param song: (optional) song already created from the record
+        """
+        song = records.song(record) if song is None else song
+        song_id = len(self.songs)
+        self.records.append(record)
+        self.songs.append(song)
+        for key in blocking.keys(song, self.strategy):
+            self.blocks.setdefault(key, []).append(song_id)
+        if self.prefixes is not None:
+            self.prefixes.add(song)
+        return song_id
+
+    def _candidate_ids(self, song):
+        """Get the sorted IDs of songs sharing a blocking key with a song."""
+        ids = set()
+        for key in blocking.keys(song, self.strategy):
+            ids.update(self.blocks.get(key, ()))
+        return sorted(ids)
+
+    def candidates(self, song):
+        """Get (ID, song) pairs sharing a blocking key with a song."""
+        return [(song_id, self.songs[song_id]) for song_id in self._candidate_ids(song)]
+
+    def _start_workers(self):
+        """Start the executor with the songs indexed so far."""
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=_initialize,
+                                                initargs=(list(self.records),))
+            self.loaded = len(self.records)
+        else:
+            self.executor = ThreadPoolExecutor(1)
+            self.matcher.function = functools.partial(match_batch, library=self.songs)
+            self.loaded = None
+        self.matcher.executor = self.deduper.executor = self.executor
+        self.matcher.settings = self.deduper.settings = self.workers > 1
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start listening and get the bound port."""
+        self._start_workers()
+        self._server = await asyncio.start_server(self._handle, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        logging.info("listening on {0}:{1}".format(host, port))
+        return port
+
+    async def close(self):
+        """Stop listening and shut down the executor."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if self.executor:
+            self.executor.shutdown(wait=False)
+
+    async def _handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on a connection."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, path, _ = line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if not header.strip():
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+                start = time.perf_counter()
+                status, payload = await self._route(method, path, body)
+                self.latency.setdefault(path, Histogram()).observe(time.perf_counter() - start)
+                data = json.dumps(payload).encode('utf-8')
+                writer.write("HTTP/1.1 {0} {1}\r\nContent-Type: application/json\r\n"
+                             "Content-Length: {2}\r\n\r\n".format(status, REASONS[status], len(data))
+                             .encode('latin-1') + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as error:
+            logging.debug("connection closed: %s", error)
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        """Get the status and JSON payload for a request."""
+        routes = {'/songs': ('POST', self._songs),
+                  '/match': ('POST', self._match),
+                  '/dedupe': ('POST', self._dedupe),
+                  '/suggest': ('POST', self._suggest),
+                  '/metrics': ('GET', self._metrics)}
+        if path not in routes:
+            return 404, {'error': "unknown path: {0}".format(path)}
+        expected, handler = routes[path]
+        if method != expected:
+            return 405, {'error': "use {0} for {1}".format(expected, path)}
+        try:
+            data = json.loads(body.decode('utf-8')) if body else {}
+            if not isinstance(data, dict):
+                return 400, {'error': "request body must be a JSON object"}
+            return 200, await handler(data)
+        except (ValueError, KeyError, TypeError) as error:
+            return 400, {'error': str(error)}
+        except Exception as error:  # pylint: disable=W0703
+            logging.exception(error)
+            return 500, {'error': str(error)}
+
+    async def _songs(self, data):
+        songs = [(record, _parse(record)) for record in data['songs']]
+        return {'ids': [self.add(record, song) for record, song in songs]}
+
+    async def _match(self, data):
+        record = data['song']
+        ids = self._candidate_ids(_parse(record))
+        added = {song_id: self.records[song_id] for song_id in ids
+                 if self.loaded is not None and song_id >= self.loaded}
+        scores = await self.matcher.submit((record, ids, added))
+        scores.sort(key=lambda score: (-score[1], score[0]))
+        matches = [{'id': song_id, 'record': self.records[song_id],
+                    'similarity': similarity, 'duplicate': duplicate}
+                   for song_id, similarity, duplicate in scores[:data.get('limit', 10)]]
+        return {'matches': matches}
+
+    async def _dedupe(self, data):
+        library = list(data['songs'])
+        for record in library:
+            _parse(record)
+        return {'clusters': await self.deduper.submit(library)}
+
+    async def _suggest(self, data):
+        if self.prefixes is None:
+            self.prefixes = PrefixIndex(self.songs)
+        results = self.prefixes.search(data.get('artist', ""), data.get('title', ""),
+                                       limit=data.get('limit', 10))
+        return {'matches': [{'id': song_id, 'record': self.records[song_id]} for song_id, _ in results]}
+
+    async def _metrics(self, _):
+        return {'latency': {path: histogram.asdict() for path, histogram in sorted(self.latency.items())},
+                'batches': {'match': self.matcher.sizes.asdict(), 'dedupe': self.deduper.sizes.asdict()},
+                'stages': metrics.snapshot()}
+
+
+def serve(stream=(), host='127.0.0.1', port=8000, **kwargs):
+    """Load song records and serve them until interrupted."""
+    server = Server(**kwargs)
+    for record in stream:
+        server.add(record)
+    logging.info("loaded {0:,} songs".format(len(server.songs)))
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(server.start(host, port))
+        loop.run_forever()
+    except KeyboardInterrupt:  # pragma: no cover (manual test)
+        pass
+    finally:
+        loop.run_until_complete(server.close())
+        loop.close()
@@ -14,6 +14,13 @@ VERBOSE_LOGGING_LEVEL = logging.DEBUG
 ARTICLES = 'a', 'an', 'the'
 JOINERS = 'and', '&', '+'
 
+# Text similarity used by titles and artists:
+#   None: the default comparisons
+#   'levenshtein': bit-parallel edit distance of the normalized names
+TEXT_SIMILARITY = None
+TEXT_SIMILARITY_MINIMUM = 0.5  # ratios below this score 0.0
+TRANSLITERATE = False  # names with equal normalized Latin keys (e.g. 'Кино' and 'Kino') are equal
+
 # Title constants
 VARIANTS = 'Live', 'Acoustic', 'Remix', 'Extended', 'Edit', 'Original'
 
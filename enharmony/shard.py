@@ -0,0 +1,173 @@
+"""Hash-partitioned dedupe across shards that can run on separate hosts.
+
+Each blocking key is owned by exactly one shard. A record is written to
+every shard that owns one of its keys, along with the keys that shard
+owns, so every block is scored by exactly one shard. Merging the
+duplicate pairs of all shards with union-find then gives the same
+clusters as a single-machine run, however many shards are used.
+"""
+
+import os
+import json
+import zlib
+import hashlib
+import logging
+from multiprocessing import Pool
+
+from enharmony import blocking, records
+from enharmony.dedupe import Clusters, score
+
+MANIFEST = 'manifest.json'
+
+
+def owner(key, shards):
+    """Get the shard that owns a blocking key (stable across hosts and runs)."""
+    return zlib.crc32(key.encode('utf-8')) % shards
+
+
+def _name(number):
+    return "shard-{0:04d}.jsonl".format(number)
+
+
+def _output(path):
+    return path[:-len('.jsonl')] + '.pairs.jsonl'
+
+
+def _digest(path):
+    """Get the SHA-1 digest of a file."""
+    sha = hashlib.sha1()
+    with open(path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(65536), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def partition(stream, directory, shards=4, strategy='artist'):
+    """Split song records into shard files by blocking key.
+
+    @param stream: iterable of song records
+    @param directory: directory for the shard files and manifest
+    @param shards: number of shards
+    @param strategy: name of a blocking strategy in blocking.STRATEGIES
+    @return: manifest dictionary
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    paths = [os.path.join(directory, _name(number)) for number in range(shards)]
+    counts = [0] * shards
+    files = [open(path, 'w') for path in paths]
+    total = 0
+    try:
+        for index, record in enumerate(stream):
+            owned = {}
+            for key in blocking.keys(records.song(record), strategy):
+                owned.setdefault(owner(key, shards), []).append(key)
+            for number, keys in sorted(owned.items()):
+                records.write(files[number], {'id': index, 'keys': keys, 'record': record})
+                counts[number] += 1
+            total += 1
+    finally:
+        for file in files:
+            file.close()
+    manifest = {'strategy': strategy,
+                'shards': shards,
+                'records': total,
+                'files': [{'name': os.path.basename(path), 'records': count, 'sha1': _digest(path)}
+                          for path, count in zip(paths, counts)]}
+    with open(os.path.join(directory, MANIFEST), 'w') as stream:
+        json.dump(manifest, stream, indent=2, sort_keys=True)
+    logging.info("partitioned {0:,} records into {1} shards ({2:,} copies)".format(
+        total, shards, sum(counts)))
+    return manifest
+
+
+def load(directory):
+    """Read the manifest of a partitioned library."""
+    with open(os.path.join(directory, MANIFEST)) as stream:
+        return json.load(stream)
+
+
+def dedupe_shard(path):
+    """Find the duplicate pairs within one shard and write them next to it.
+
+    @param path: path of a shard file
+    @return: path of the output file
+    """
+    ids, songs, groups = [], [], {}
+    with open(path) as stream:
+        for position, item in enumerate(records.read(stream)):
+            ids.append(item['id'])
+            songs.append(records.song(item['record']))
+            for key in item['keys']:
+                groups.setdefault(key, []).append(position)
+    pairs, comparisons = [], 0
+    for key in sorted(groups):
+        positions = groups[key]
+        if len(positions) > 1:
+            found, count = score([(ids[position], songs[position]) for position in positions])
+            pairs.extend(found)
+            comparisons += count
+    output = _output(path)
+    with open(output + '.tmp', 'w') as stream:
+        records.write(stream, {'shard': os.path.basename(path), 'sha1': _digest(path),
+                               'comparisons': comparisons})
+        for pair in sorted(pairs):
+            records.write(stream, pair)
+    os.replace(output + '.tmp', output)
+    logging.debug("%s: %s pairs from %s comparisons", path, len(pairs), comparisons)
+    return output
+
+
+def run(directory, workers=None):
+    """Dedupe every shard in its own process (simulating separate hosts).
+
+    @param directory: directory of a partitioned library
+    @param workers: (optional) number of processes (default: one per CPU)
+    @return: list of output paths
+    """
+    manifest = load(directory)
+    paths = [os.path.join(directory, item['name']) for item in manifest['files']]
+    pool = Pool(workers)
+    try:
+        return pool.map(dedupe_shard, paths, chunksize=1)
+    finally:
+        pool.terminate()
+
+
+def merge(directory):
+    """Combine the duplicate pairs of every shard into global clusters.
+
+    @param directory: directory of a partitioned library whose shards have run
+    @return: list of clusters (sorted lists of record indices)
+    """
+    manifest = load(directory)
+    clusters = Clusters(manifest['records'])
+    for item in manifest['files']:
+        path = _output(os.path.join(directory, item['name']))
+        if not os.path.exists(path):
+            raise ValueError("shard has not run: {0}".format(item['name']))
+        with open(path) as stream:
+            lines = records.read(stream)
+            header = next(lines)
+            if header['sha1'] != item['sha1']:
+                raise ValueError("output does not match shard: {0}".format(item['name']))
+            for index1, index2 in lines:
+                clusters.union(index1, index2)
+    return clusters.groups()
+
+
+def groups(directory, clusters):
+    """Get the records of each cluster from the shard files.
+
+    @param directory: directory of a partitioned library
+    @param clusters: list of clusters from merge()
+    @return: list of record lists
+    """
+    wanted = {index for cluster in clusters for index in cluster}
+    found = {}
+    for item in load(directory)['files']:
+        with open(os.path.join(directory, item['name'])) as stream:
+            for entry in records.read(stream):
+                if entry['id'] in wanted:
+                    found.setdefault(entry['id'], entry['record'])
+    return [[found[index] for index in cluster] for cluster in clusters]
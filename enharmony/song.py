@@ -1,22 +1,35 @@
 """Song class to provide textual comparison based on attributes."""
 
+import logging
+from multiprocessing import Pool
+
 from enharmony.title import Title
 from enharmony.artist import Artist
 from enharmony.album import Album
+from enharmony.base import parse_string, parse_int, normalize
+from enharmony import phonetic, translit, config, metrics
 
 from comparable import CompoundComparable
 
 
 class Song(CompoundComparable):
 
-    """Stores identifying song information."""
+    """Stores identifying song information.
+
+    The title, artist and album are parsed on first access, so songs that
+    are only grouped by their keys never pay for full parsing. Parsed parts
+    are reused until a setting they depend on changes.
+    """
+
+    depends = {'title': ('VARIANTS', 'JOINERS'),
+               'artist': ('JOINERS',),
+               'album': ('KINDS', 'JOINERS')}
 
-    similarity_dict = {'title': 100,
-                       'artist': 25,
-                       'album': 5,
-                       'track': 1,
-                       'duration': 150}
-    equality_list = list(similarity_dict.keys())
+    attributes = {'title': 100,
+                  'artist': 25,
+                  'album': 5,
+                  'track': 1,
+                  'duration': 150}
 
     def __init__(self, artist, title, album=None, year=None, track=None, duration=None):
         """Initialize a new song.
@@ -28,18 +41,125 @@ class Song(CompoundComparable):
         @param track: track number on album
         @param duration: length of song in seconds
         """
-        self.title = Title(title)
-        self.artist = Artist(artist)
-        self.album = Album(album, year)
-        self.track = self._parse_int(track, "track number")
-        self.duration = self._parse_int(duration, "song duration")
+        self._artist = parse_string(artist, "artist name")
+        self._title = title
+        self._album = album
+        self._year = year
+        self._parsed = {}
+        self.track = parse_int(track, "track number")
+        self.duration = parse_int(duration, "song duration")
         super(Song, self).__init__()
+        metrics.count('song.created')
 
     def __repr__(self):
         """Represent the song object."""
-        return self._get_repr([str(self.artist), str(self.title), str(self.album), self.album.year, self.track,
-                               self.duration])
+        return self._repr(str(self.artist), str(self.title), album=str(self.album) or None,
+                          year=self.album.year.value, track=self.track, duration=self.duration)
+
+    @property
+    def record(self):
+        """Get the unparsed fields the song was created from."""
+        return {'artist': self._artist, 'title': self._title, 'album': self._album,
+                'year': self._year, 'track': self.track, 'duration': self.duration}
+
+    def _parse(self, name, parser, *args):
+        """Get a parsed part, reparsing it if its settings have changed."""
+        stamp = config.current().stamp(*self.depends[name])
+        cached = self._parsed.get(name)
+        if cached is None or cached[0] != stamp:
+            metrics.count('song.parsed')
+            cached = self._parsed[name] = (stamp, parser(*args))
+        return cached[1]
+
+    @classmethod
+    def from_records(cls, rows, workers=1, chunksize=1000):
+        """Create songs from many records, parsing each distinct title and album once.
+
+        @param rows: iterable of dictionaries with Song's parameter names as keys
+        @param workers: number of processes to parse the distinct strings in
+        @param chunksize: number of distinct strings parsed per task
+        @return: list of songs
+        """
+        rows = list(rows)
+        titles = list({row.get('title'): None for row in rows})
+        albums = list({(row.get('album'), row.get('year')): None for row in rows})
+        tasks = [('title', titles[start:start + chunksize]) for start in range(0, len(titles), chunksize)]
+        tasks += [('album', albums[start:start + chunksize]) for start in range(0, len(albums), chunksize)]
+        logging.debug("parsing %s titles and %s albums for %s songs", len(titles), len(albums), len(rows))
+        if workers > 1 and len(tasks) > 1:
+            pool = Pool(workers, initializer=_initialize, initargs=(config.current().asdict(),))
+            try:
+                results = pool.map(_parse, tasks)
+            finally:
+                pool.terminate()
+        else:
+            results = [_parse(task) for task in tasks]
+        parsed = {'title': {}, 'album': {}}
+        for (kind, values), objects in zip(tasks, results):
+            parsed[kind].update(zip(values, objects))
+
+        current = config.current()
+        title_stamp = current.stamp(*cls.depends['title'])
+        album_stamp = current.stamp(*cls.depends['album'])
+        songs = []
+        for row in rows:
+            song = cls(row.get('artist'), row.get('title'), album=row.get('album'), year=row.get('year'),
+                       track=row.get('track'), duration=row.get('duration'))
+            song._parsed['title'] = (title_stamp, parsed['title'][row.get('title')])
+            song._parsed['album'] = (album_stamp, parsed['album'][row.get('album'), row.get('year')])
+            songs.append(song)
+        return songs
+
+    @property
+    def title(self):
+        """Get the parsed title."""
+        return self._parse('title', Title, self._title)
+
+    @property
+    def artist(self):
+        """Get the parsed artist."""
+        return self._parse('artist', Artist, self._artist)
+
+    @property
+    def album(self):
+        """Get the parsed album."""
+        return self._parse('album', Album, self._album, self._year)
 
+    @property
+    def artist_key(self):
+        """Get the normalized artist name without parsing the artist."""
+        return normalize(self._artist)
+
+    @property
+    def title_key(self):
+        """Get the normalized title name (only the title is parsed)."""
+        return normalize(self.title.name)
+
+    @property
+    def phonetic(self):
+        """Get the phonetic key of the artist name without parsing the artist."""
+        return phonetic.encode(self._artist or "")
+
+    @property
+    def latin_key(self):
+        """Get the Latin key of the artist name without parsing the artist."""
+        return translit.key(self._artist)
+
+    @property
+    def credits(self):
+        """Get the normalized name of every credited artist (primary and featured).
+
+        Featured text lists separate artists, so it is credited whole and
+        split on commas and joiners.
+        """
+        keys = list(self.artist.keys)
+        for featuring in (self.title.featuring, self.album.name.featuring):
+            if featuring:
+                keys.append(normalize(featuring.text))
+                keys.extend(normalize(item.value) for item in featuring.items)
+        return tuple(key for index, key in enumerate(keys) if key and key not in keys[:index])
+
+    @metrics.timed('song.similarity')
     def similarity(self, other):
         """Calculate percent similarity between two songs.
 
@@ -47,11 +167,24 @@ class Song(CompoundComparable):
         """
         # Compare types
         if type(self) != type(other):
-            return 0.0
+            return self.Similarity(0.0)
         # Compare attributes
         value = 0.0
         if self.title == other.title:
             value += 0.5
         if self.artist == other.artist:
             value += 0.5
-        return value
+        return self.Similarity(value)
+
+
+def _initialize(values):
+    """Use the parent process's settings in a worker process."""
+    config.use(config.Config(values))
+
+
+def _parse(task):
+    """Parse a chunk of distinct titles or (album, year) pairs."""
+    kind, values = task
+    if kind == 'title':
+        return [Title(value) for value in values]
+    return [Album(name, year) for name, year in values]
@@ -0,0 +1,192 @@
+"""Persistent storage of songs and blocking keys in SQLite."""
+
+import sqlite3
+import logging
+from itertools import groupby
+
+from enharmony import blocking, records
+from enharmony.dedupe import Clusters, Stats, score
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    id INTEGER PRIMARY KEY,
+    artist TEXT,
+    title TEXT,
+    album TEXT,
+    year INTEGER,
+    track INTEGER,
+    duration INTEGER,
+    name TEXT,
+    alternate TEXT,
+    variant TEXT,
+    featuring TEXT,
+    album_name TEXT,
+    album_kind TEXT,
+    artist_key TEXT,
+    title_key TEXT
+);
+CREATE TABLE IF NOT EXISTS keys (
+    song INTEGER NOT NULL REFERENCES songs (id) ON DELETE CASCADE,
+    strategy TEXT NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS keys_lookup ON keys (strategy, key, song);
+CREATE INDEX IF NOT EXISTS keys_song ON keys (song);
+CREATE INDEX IF NOT EXISTS songs_artist_key ON songs (artist_key);
+CREATE INDEX IF NOT EXISTS songs_title_key ON songs (title_key);
+"""
+
+RAW = records.FIELDS
+PARSED = ('name', 'alternate', 'variant', 'featuring', 'album_name', 'album_kind', 'artist_key', 'title_key')
+
+
+def _row(song_id, record, song):
+    """Get the column values to store for a song."""
+    title = song.title
+    name = song.album.name
+    parsed = (title.name, title.alternate, title.variant,
+              str(title.featuring) if title.featuring else None,
+              str(name.title) or None, name.kind.value,
+              song.artist_key, song.title_key)
+    return (song_id,) + tuple(record.get(field) for field in RAW) + parsed
+
+
+class Store(object):
+
+    """SQLite database of raw, parsed and normalized song fields."""
+
+    def __init__(self, path=':memory:', strategies=None):
+        """Open (and create if needed) a song database.
+
+        @param path: database file path (default: in memory)
+        @param strategies: (optional) blocking strategies to store keys for
+        """
+        self.path = path
+        self.strategies = sorted(strategies or blocking.STRATEGIES)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
+
+    def add(self, stream, batch=10000):
+        """Insert song records in transactions.
+
+        @param stream: iterable of song records
+        @param batch: number of records inserted per transaction
+        @return: list of the new song IDs
+        """
+        ids = []
+        start = self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM songs").fetchone()[0]
+        rows, keys = [], []
+        for record in stream:
+            song_id = start + len(ids) + 1
+            song = records.song(record)
+            rows.append(_row(song_id, record, song))
+            for strategy in self.strategies:
+                keys.extend((song_id, strategy, key) for key in blocking.keys(song, strategy))
+            ids.append(song_id)
+            if len(rows) >= batch:
+                self._insert(rows, keys)
+                rows, keys = [], []
+        if rows:
+            self._insert(rows, keys)
+        return ids
+
+    def _insert(self, rows, keys):
+        """Insert rows of songs and keys in one transaction."""
+        columns = ('id',) + RAW + PARSED
+        with self.connection:
+            self.connection.executemany("INSERT INTO songs ({0}) VALUES ({1})".format(
+                ', '.join(columns), ', '.join('?' * len(columns))), rows)
+            self.connection.executemany("INSERT INTO keys (song, strategy, key) VALUES (?, ?, ?)", keys)
+        logging.debug("inserted %s songs", len(rows))
+
+    def remove(self, song_id):
+        """Delete a song and its keys."""
+        with self.connection:
+            self.connection.execute("DELETE FROM songs WHERE id = ?", (song_id,))
+
+    def record(self, song_id):
+        """Get the raw record stored for a song ID."""
+        row = self.connection.execute("SELECT {0} FROM songs WHERE id = ?".format(', '.join(RAW)),
+                                      (song_id,)).fetchone()
+        if row is None:
+            raise KeyError(song_id)
+        return {field: value for field, value in zip(RAW, row) if value is not None}
+
+    def parts(self, song_id):
+        """Get the parsed and normalized fields stored for a song ID."""
+        row = self.connection.execute("SELECT {0} FROM songs WHERE id = ?".format(', '.join(PARSED)),
+                                      (song_id,)).fetchone()
+        if row is None:
+            raise KeyError(song_id)
+        return dict(zip(PARSED, row))
+
+    def songs(self, ids):
+        """Get songs for a list of IDs.
+
+        @return: list of (ID, Song) pairs in ID order
+        """
+        ids = sorted(set(ids))
+        found = []
+        for start in range(0, len(ids), 500):  # stay below SQLite's variable limit
+            chunk = ids[start:start + 500]
+            query = "SELECT id, {0} FROM songs WHERE id IN ({1}) ORDER BY id".format(
+                ', '.join(RAW), ', '.join('?' * len(chunk)))
+            for row in self.connection.execute(query, chunk):
+                found.append((row[0], records.song(dict(zip(RAW, row[1:])))))
+        return found
+
+    def candidates(self, song, strategy='artist'):
+        """Get stored songs sharing a blocking key with a song.
+
+        @param song: song to find candidates for
+        @param strategy: name of a stored blocking strategy
+        @return: list of (ID, Song) pairs
+        """
+        keys = blocking.keys(song, strategy)
+        query = "SELECT DISTINCT song FROM keys WHERE strategy = ? AND key IN ({0})".format(
+            ', '.join('?' * len(keys)))
+        ids = [row[0] for row in self.connection.execute(query, (strategy,) + tuple(keys))]
+        return self.songs(ids)
+
+    def blocks(self, strategy='artist'):
+        """Get an iterator of (key, song IDs) for blocks with several songs."""
+        query = ("SELECT key, song FROM keys WHERE strategy = ? AND key IN "
+                 "(SELECT key FROM keys WHERE strategy = ? GROUP BY key HAVING COUNT(*) > 1) "
+                 "ORDER BY key, song")
+        rows = self.connection.execute(query, (strategy, strategy))
+        for key, items in groupby(rows, key=lambda row: row[0]):
+            yield key, [song_id for _, song_id in items]
+
+    def cluster(self, strategy='artist', stats=None):
+        """Locate duplicate songs loading one block at a time from the database.
+
+        @param strategy: name of a stored blocking strategy
+        @param stats: (optional) Stats to update while running
+        @return: list of clusters (sorted lists of song IDs)
+        """
+        stats = stats or Stats()
+        stats.rows += len(self)
+        maximum = self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM songs").fetchone()[0]
+        clusters = Clusters(maximum + 1)
+        for _, ids in self.blocks(strategy):
+            stats.candidates += len(ids) * (len(ids) - 1) // 2
+            pairs, comparisons = score(self.songs(ids))
+            stats.comparisons += comparisons
+            for id1, id2 in pairs:
+                clusters.union(id1, id2)
+            stats.tick()
+        return clusters.groups()
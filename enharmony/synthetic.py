@@ -0,0 +1,114 @@
+"""Seeded generator of synthetic music libraries with realistic duplicates."""
+
+import random
+
+from enharmony import settings
+
+WORDS = ('love', 'night', 'heart', 'fire', 'dream', 'road', 'light', 'rain', 'time', 'home',
+         'river', 'summer', 'shadow', 'gold', 'wild', 'blue', 'city', 'stone', 'ghost', 'song',
+         'dance', 'young', 'sky', 'ocean', 'moon', 'electric', 'silver', 'broken', 'sweet', 'lost')
+
+
+def _words(rng, low, high):
+    """Get a capitalized phrase of random words."""
+    return ' '.join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(low, high)))
+
+
+def _artist(rng):
+    """Get a random artist name, sometimes with an article or joiner."""
+    name = _words(rng, 1, 2)
+    roll = rng.random()
+    if roll < 0.2:
+        name = "The " + name
+    elif roll < 0.3:
+        name = name + " & " + _words(rng, 1, 1)
+    return name
+
+
+def _typo(rng, text):
+    """Swap or drop one character of a text."""
+    if len(text) < 4:
+        return text
+    index = rng.randrange(1, len(text) - 2)
+    if rng.random() < 0.5:
+        return text[:index] + text[index + 1] + text[index] + text[index + 2:]
+    return text[:index] + text[index + 1:]
+
+
+def _article(text):
+    """Add or remove a leading article."""
+    for article in settings.ARTICLES:
+        prefix = article.capitalize() + ' '
+        if text.startswith(prefix):
+            return text[len(prefix):]
+    return "The " + text
+
+
+def _joiner(text):
+    """Swap '&' and 'and' joiners."""
+    if ' & ' in text:
+        return text.replace(' & ', ' and ')
+    return text.replace(' and ', ' & ')
+
+
+def perturb(rng, record):
+    """Get a duplicate of a record with one or more realistic changes.
+
+    @param rng: random.Random instance
+    @param record: original song record
+    @return: new record
+    """
+    copy = dict(record)
+    changes = rng.sample(('article', 'joiner', 'featuring', 'kind', 'typo', 'year', 'case'), rng.randint(1, 2))
+    for change in changes:
+        if change == 'article':
+            copy['artist'] = _article(copy['artist'])
+        elif change == 'joiner':
+            copy['artist'] = _joiner(copy['artist'])
+        elif change == 'featuring':
+            copy['title'] = "{0} (feat. {1})".format(copy['title'], _artist(rng))
+        elif change == 'kind' and copy.get('album'):
+            copy['album'] = "{0} [{1}]".format(copy['album'], rng.choice(settings.KINDS))
+        elif change == 'typo':
+            copy['title'] = _typo(rng, copy['title'])
+        elif change == 'year' and copy.get('year'):
+            copy['year'] += rng.choice((-1, 1))
+        elif change == 'case':
+            copy['title'] = copy['title'].lower()
+    return copy
+
+
+def generate(count, seed=0, duplicates=0.3, variants=0.05):
+    """Generate a synthetic library of song records.
+
+    Each record has a 'cluster' field identifying the original recording
+    it was derived from. Bracketed variants (e.g. '[Live]') are distinct
+    recordings, so they start a new cluster.
+
+    @param count: number of records
+    @param seed: random seed for a reproducible library
+    @param duplicates: ratio of records that are perturbed copies
+    @param variants: ratio of records that are variants of another song
+    @return: list of records
+    """
+    rng = random.Random(seed)
+    artists = [_artist(rng) for _ in range(max(count // 20, 1))]
+    library = []
+    for _ in range(count):
+        roll = rng.random()
+        if library and roll < duplicates:
+            record = perturb(rng, rng.choice(library))
+        elif library and roll < duplicates + variants:
+            record = dict(rng.choice(library), cluster=len(library))
+            record['title'] = "{0} [{1}]".format(record['title'], rng.choice(settings.VARIANTS))
+        else:
+            album = _words(rng, 1, 3) if rng.random() < 0.8 else None
+            record = {'artist': rng.choice(artists),
+                      'title': _words(rng, 1, 4),
+                      'album': album,
+                      'year': rng.randint(1960, 2020) if album else None,
+                      'track': rng.randint(1, 15) if album else None,
+                      'duration': rng.randint(90, 420),
+                      'cluster': len(library)}
+        library.append(record)
+    return library
@@ -4,13 +4,17 @@
 Unit tests for the enharmony.base module.
 """
 
+import pickle
 import unittest
 import logging
 
 
 from comparable.test import TestCase
 
-from enharmony.base import TextTitle, TextList
+from enharmony.base import TextTitle, TextList, parse_string
+from enharmony.album import Year, Kind
+from enharmony.artist import Artist
+from enharmony.song import Song
 from enharmony import settings
 
 
@@ -104,6 +108,82 @@ class TestTextList(TestCase):  # pylint: disable=R0904
         self.assertLess(0.99, similarity)
 
 
+class Blank(object):  # pylint: disable=R0903
+
+    """Blank value that counts how many times it is formatted for logging."""
+
+    formatted = 0
+
+    def __str__(self):
+        return " "
+
+    def __repr__(self):
+        Blank.formatted += 1
+        return "Blank()"
+
+
+class TestParseString(TestCase):  # pylint: disable=R0904
+    """Tests for the parse_string function."""
+
+    def test_lazy_logging(self):
+        """Verify debug messages are only formatted when they are logged."""
+        logger = logging.getLogger()
+        level = logger.level
+        logger.setLevel(logging.INFO)
+        try:
+            self.assertIsNone(parse_string(Blank(), "value"))
+            self.assertEqual(0, Blank.formatted)
+        finally:
+            logger.setLevel(level)
+
+
+class TestFlyweight(TestCase):  # pylint: disable=R0904
+    """Tests for the Flyweight metaclass."""
+
+    def test_shared(self):
+        """Verify equal values share one instance."""
+        self.assertIs(Kind('EP'), Kind('EP'))
+        self.assertIs(Year(1999), Year(1999))
+        self.assertIs(Artist("The Beatles"), Artist("The Beatles"))
+
+    def test_distinct(self):
+        """Verify different values and classes are not shared."""
+        self.assertIsNot(Kind('EP'), Kind('Single'))
+        self.assertIsNot(Year(1999), Year(2000))
+
+    def test_types(self):
+        """Verify equal values of different types are not shared."""
+        year = Year(1999)
+        self.assertIsNot(year, Year(1999.0))
+        self.assertIsInstance(Year(1999.0).value, float)
+        self.assertIsNot(Year(1), Year(True))
+        self.assertIs(year, Year(1999))
+
+    def test_pickled(self):
+        """Verify unpickled instances are shared with existing ones."""
+        for value in (Kind('EP'), Year(1999), Artist("The Beatles")):
+            self.assertIs(value, pickle.loads(pickle.dumps(value)))
+
+    def test_parsed_songs(self):
+        """Verify parsed songs share the instances of their repeated parts."""
+        songs = [Song("The Beatles", "Song {0}".format(number), "Album [EP]", 1965)
+                 for number in range(3)]
+        self.assertEqual(1, len({id(song.artist) for song in songs}))
+        self.assertEqual(1, len({id(song.album.year) for song in songs}))
+        self.assertEqual(1, len({id(song.album.name.kind) for song in songs}))
+
+    def test_released(self):
+        """Verify unused instances are not kept by the registry."""
+        key = "Unreferenced Artist Name"
+        Artist(key)
+        self.assertNotIn(((str, key),), Artist._instances)  # pylint: disable=W0212
+
+    def test_identity_comparison(self):
+        """Verify shared instances compare without inspecting values."""
+        artist = Artist("Artist A & Artist B")
+        self.assertComparison(artist, Artist("Artist A & Artist B"), True, True, 1.00)
+
+
 if __name__ == '__main__':
     logging.basicConfig(format=settings.VERBOSE_LOGGING_FORMAT, level=settings.VERBOSE_LOGGING_LEVEL)
     unittest.main()
@@ -0,0 +1,73 @@
+"""
+Unit tests for the enharmony.benchmark module.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from enharmony import benchmark
+from enharmony.cli import main
+from enharmony.song import Song
+
+
+class TestRun(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for running benchmarks."""
+
+    def test_metrics(self):
+        """Verify every metric is measured for each size."""
+        results = benchmark.run([50], repeat=1)
+        self.assertEqual(['50'], list(results))
+        self.assertEqual(['clusters', 'compare', 'dedupe', 'memory', 'parse', 'shared'],
+                         sorted(results['50']))
+        self.assertTrue(all(value > 0 for value in results['50'].values()))
+
+    def test_shared(self):
+        """Verify repeated parts of parsed songs are counted as shared."""
+        songs = [Song("Artist", "Song {0}".format(number), "Album", 2000) for number in range(4)]
+        self.assertEqual(0.75, benchmark.shared(songs))
+        self.assertEqual(0.0, benchmark.shared([]))
+
+
+class TestRegressions(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for comparing results to a baseline."""
+
+    baseline = {'100': {'parse': 1000.0, 'compare': 500.0, 'dedupe': 1.0, 'memory': 1000}}
+
+    def test_within_tolerance(self):
+        """Verify small changes are not regressions."""
+        results = {'100': {'parse': 900.0, 'compare': 600.0, 'dedupe': 1.1, 'memory': 500}}
+        self.assertEqual([], benchmark.regressions(results, self.baseline))
+
+    def test_slower(self):
+        """Verify lower rates and higher costs are regressions."""
+        results = {'100': {'parse': 700.0, 'compare': 500.0, 'dedupe': 1.5, 'memory': 1000},
+                   '200': {'parse': 1.0}}
+        messages = benchmark.regressions(results, self.baseline)
+        self.assertEqual(2, len(messages))
+        self.assertIn("parse changed -30.0%", messages[0])
+        self.assertIn("dedupe changed +50.0%", messages[1])
+
+
+class TestCommand(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the 'benchmark' command."""
+
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp, 'baseline.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp)
+
+    def test_baseline(self):
+        """Verify a saved baseline is compared against later runs."""
+        self.assertEqual(1, main(['benchmark', '-s', '20', '-r', '1', '--baseline', self.path]))
+        self.assertEqual(0, main(['benchmark', '-s', '20', '-r', '1', '--baseline', self.path, '--save']))
+        self.assertEqual({'20'}, set(benchmark.load(self.path)))
+        self.assertEqual(0, main(['benchmark', '-s', '20', '-r', '1', '--baseline', self.path,
+                                  '--tolerance', '1000']))
+
+
+if __name__ == '__main__':
+    unittest.main()
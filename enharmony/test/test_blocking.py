@@ -0,0 +1,132 @@
+"""
+Unit tests for the enharmony.blocking module.
+"""
+
+import unittest
+
+from enharmony.song import Song
+from enharmony import blocking, config
+
+
+class TestKeys(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for blocking keys."""
+
+    def test_artist(self):
+        """Verify artist keys ignore case and articles."""
+        self.assertEqual(('beatles',), blocking.keys(Song("The BEATLES", "Help!")))
+
+    def test_title(self):
+        """Verify title keys use the parsed song name."""
+        song = Song("Artist", "Song Name (feat. Other) [Remix]")
+        self.assertEqual(('song name',), blocking.keys(song, 'title'))
+
+    def test_credits(self):
+        """Verify credit keys include featured artists."""
+        song = Song("Artist A", "Song (feat. Artist B)")
+        self.assertEqual(('artist a', 'artist b'), blocking.keys(song, 'credits'))
+
+    def test_phonetic(self):
+        """Verify phonetic keys group misspelled artists."""
+        self.assertEqual(('BTLS',), blocking.keys(Song("The beetles", "Help!"), 'phonetic'))
+        self.assertEqual(('BTLS',), blocking.keys(Song("Beatles", "Help!"), 'phonetic'))
+
+    def test_latin(self):
+        """Verify Latin keys are added for artists in other scripts."""
+        self.assertEqual(('кино', 'kino'), blocking.keys(Song("Кино", "Звезда"), 'latin'))
+        self.assertEqual(('kino',), blocking.keys(Song("Kino", "Zvezda"), 'latin'))
+
+
+class TestBlocks(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for grouping songs into blocks."""
+
+    def test_artist(self):
+        """Verify songs are grouped by artist."""
+        songs = [Song("A", "1"), Song("B", "2"), Song("a", "3")]
+        self.assertEqual({'a': [0, 2], 'b': [1]}, blocking.blocks(songs))
+
+    def test_credits(self):
+        """Verify a song is placed in a block for each credited artist."""
+        songs = [Song("A", "1 (feat. B)"), Song("B", "2")]
+        self.assertEqual({'a': [0], 'b': [0, 1]}, blocking.blocks(songs, 'credits'))
+
+
+class TestAdaptive(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for splitting oversized blocks."""
+
+    def test_small_blocks_unchanged(self):
+        """Verify blocks within the maximum are not split."""
+        songs = [Song("A", "1"), Song("A", "2"), Song("B", "3")]
+        self.assertEqual(blocking.blocks(songs), blocking.blocks(songs, maximum=2))
+
+    def test_split_by_title(self):
+        """Verify oversized blocks are split by title prefix first."""
+        songs = [Song("Various Artists", title) for title in ("Alpha", "Alpha", "Beta", "Beta", "Gamma")]
+        report = {}
+        groups = blocking.blocks(songs, maximum=2, report=report)
+        self.assertEqual([[0, 1], [2, 3], [4]], sorted(groups.values()))
+        self.assertIn('various artists\x1ftitle=alp', groups)
+        self.assertEqual(1, report['split'])
+        self.assertEqual(5, report['before']['largest'])
+        self.assertEqual(2, report['after']['largest'])
+
+    def test_split_by_transliterated_title(self):
+        """Verify titles equal by their Latin keys are not split apart."""
+        previous = config.update(TRANSLITERATE=True)
+        try:
+            songs = [Song("Kino", "Группа крови"), Song("Kino", "Gruppa krovi"),
+                     Song("Kino", "Zvezda"), Song("Kino", "Zvezda")]
+            self.assertEqual(songs[0].title, songs[1].title)
+            groups = blocking.blocks(songs, maximum=2)
+            self.assertEqual([[0, 1], [2, 3]], sorted(groups.values()))
+        finally:
+            config.use(previous)
+
+    def test_split_by_duration_and_year(self):
+        """Verify blocks with one title are split by duration then year."""
+        songs = [Song("A", "Song", duration=100), Song("A", "Song", duration=100),
+                 Song("A", "Song", duration=200), Song("A", "Song", "X", 2001, duration=200),
+                 Song("A", "Song", "X", 2002, duration=200)]
+        groups = blocking.adapt(songs, blocking.blocks(songs), maximum=2, minimum=1)
+        self.assertEqual([[0, 1], [2, 3], [2, 4]], sorted(groups.values()))  # 2 has no year
+
+    def test_duration_overlap(self):
+        """Verify songs near a bucket's end are also in the next bucket."""
+        songs = [Song("A", "Song", duration=89), Song("A", "Song", duration=90),
+                 Song("A", "Song", duration=10), Song("A", "Song", duration=11)]
+        groups = blocking.adapt(songs, blocking.blocks(songs), maximum=3, minimum=1)
+        self.assertEqual([[0], [0, 1], [2, 3]], sorted(groups.values()))
+
+    def test_unknown_duration(self):
+        """Verify songs without a duration join every duration bucket."""
+        songs = [Song("A", "Song", duration=100), Song("A", "Song", duration=100),
+                 Song("A", "Song", duration=200), Song("A", "Song", duration=200),
+                 Song("A", "Song")]
+        groups = blocking.adapt(songs, blocking.blocks(songs), maximum=3, minimum=1)
+        self.assertEqual([[0, 1, 4], [2, 3, 4]], sorted(groups.values()))
+
+    def test_unsplittable(self):
+        """Verify blocks of identical songs are kept whole."""
+        songs = [Song("A", "Song")] * 4
+        report = {}
+        groups = blocking.blocks(songs, maximum=2, report=report)
+        self.assertEqual([[0, 1, 2, 3]], list(groups.values()))
+        self.assertEqual(1, report['unsplittable'])
+
+    def test_merge_tiny_parts(self):
+        """Verify tiny parts of a split block are merged up to the maximum."""
+        songs = [Song("A", title) for title in ("Alpha", "Beta", "Gamma", "Delta", "Delta")]
+        report = {}
+        groups = blocking.blocks(songs, maximum=3, report=report)
+        self.assertEqual([[0, 1, 2], [3, 4]], sorted(groups.values()))
+        self.assertEqual(3, report['merged'])
+
+    def test_statistics(self):
+        """Verify block statistics count only blocks with candidate pairs."""
+        stats = blocking.statistics({'a': [0, 1, 2], 'b': [3, 4], 'c': [5]})
+        self.assertEqual({'blocks': 2, 'members': 5, 'largest': 3, 'median': 2, 'p90': 3, 'p99': 3,
+                          'pairs': 4, 'top_share': 0.75}, stats)
+        self.assertEqual(0, blocking.statistics({})['largest'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Unit tests for the enharmony.checkpoint module.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from enharmony.song import Song
+from enharmony.dedupe import dedupe
+from enharmony.external import cluster
+from enharmony.checkpoint import Checkpoint
+
+from enharmony.test.test_external import RECORDS
+
+
+class Crash(Song):
+
+    """Song that fails when compared to simulate an interrupted run."""
+
+    def similarity(self, other):
+        raise RuntimeError("crashed")
+
+
+def library(crash=None):
+    """Get songs from the test records, optionally crashing on one."""
+    return [(Crash if index == crash else Song)(record['artist'], record['title'], record.get('album'))
+            for index, record in enumerate(RECORDS)]
+
+
+class TestCheckpoint(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the Checkpoint class."""
+
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp)
+
+    def test_resume(self):
+        """Verify an interrupted run resumes with identical output."""
+        expected = dedupe(library())
+        with self.assertRaises(RuntimeError):
+            dedupe(library(crash=1), checkpoint=Checkpoint(self.temp, interval=0))
+        checkpoint = Checkpoint(self.temp, interval=0)
+        self.assertEqual(expected, dedupe(library(), checkpoint=checkpoint))
+        self.assertEqual({'blocks': 1, 'candidates': 6, 'comparisons': 5}, checkpoint.skipped)
+
+    def test_completed(self):
+        """Verify a completed run is skipped entirely."""
+        expected = dedupe(library(), checkpoint=Checkpoint(self.temp))
+        checkpoint = Checkpoint(self.temp)
+        self.assertEqual(expected, dedupe(library(), checkpoint=checkpoint))
+        self.assertEqual(2, checkpoint.skipped['blocks'])
+
+    def test_different_run(self):
+        """Verify a checkpoint for a different input is not restored."""
+        dedupe(library(), checkpoint=Checkpoint(self.temp))
+        checkpoint = Checkpoint(self.temp)
+        dedupe(library()[:-1], checkpoint=checkpoint)
+        self.assertEqual(0, checkpoint.skipped['blocks'])
+
+    def test_changed_records(self):
+        """Verify a checkpoint is not restored when records change but not their blocks."""
+        dedupe(library(), checkpoint=Checkpoint(self.temp))
+        changed = library()
+        changed[2] = Song("Artist A", "Song 1", "Other Album")
+        checkpoint = Checkpoint(self.temp)
+        self.assertEqual(dedupe(changed), dedupe(changed, checkpoint=checkpoint))
+        self.assertEqual(0, checkpoint.skipped['blocks'])
+        edited = [dict(record, album="Edited") for record in RECORDS]
+        cluster(iter(RECORDS), checkpoint=Checkpoint(self.temp))
+        checkpoint = Checkpoint(self.temp)
+        cluster(iter(edited), checkpoint=checkpoint)
+        self.assertEqual(0, checkpoint.skipped['blocks'])
+
+    def test_out_of_core(self):
+        """Verify out-of-core runs can be resumed."""
+        expected = cluster(iter(RECORDS)).groups()
+        cluster(iter(RECORDS), checkpoint=Checkpoint(self.temp))
+        checkpoint = Checkpoint(self.temp)
+        self.assertEqual(expected, cluster(iter(RECORDS), checkpoint=checkpoint).groups())
+        self.assertEqual(2, checkpoint.skipped['blocks'])
+        self.assertEqual(['parents.bin', 'state.json'], sorted(os.listdir(self.temp)))
+
+
+if __name__ == '__main__':
+    unittest.main()
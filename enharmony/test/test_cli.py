@@ -0,0 +1,97 @@
+"""
+Unit tests for the enharmony.cli module.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from enharmony.cli import main
+
+
+class TestDedupe(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the 'dedupe' command."""
+
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        self.output = os.path.join(self.temp, 'clusters.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp)
+
+    def write(self, name, text):
+        """Write an input file to the temporary directory."""
+        path = os.path.join(self.temp, name)
+        with open(path, 'w') as stream:
+            stream.write(text)
+        return path
+
+    def read(self):
+        """Read the clusters from the output file."""
+        with open(self.output) as stream:
+            return [json.loads(line) for line in stream]
+
+    def test_jsonl(self):
+        """Verify duplicate clusters are written from JSON lines."""
+        path = self.write('songs.jsonl', '\n'.join([
+            '{"artist": "Artist", "title": "Song"}',
+            '{"artist": "Other", "title": "Song"}',
+            '{"artist": "Artist", "title": "Song", "year": 2001}',
+        ]))
+        self.assertEqual(0, main(['dedupe', path, '-o', self.output]))
+        self.assertEqual([{'songs': [{'artist': "Artist", 'title': "Song"},
+                                     {'artist': "Artist", 'title': "Song", 'year': 2001}]}],
+                         self.read())
+
+    def test_out_of_core(self):
+        """Verify out-of-core mode writes the same clusters."""
+        path = self.write('songs.jsonl', '{"artist": "A", "title": "T"}\n' * 3)
+        self.assertEqual(0, main(['dedupe', path, '-o', self.output, '--out-of-core', '--run-size', '1',
+                                  '--temp', self.temp]))
+        self.assertEqual([{'songs': [{'artist': "A", 'title': "T"}] * 3}], self.read())
+        self.assertEqual(['clusters.jsonl', 'songs.jsonl'], sorted(os.listdir(self.temp)))
+
+    def test_csv(self):
+        """Verify duplicate clusters are written from CSV."""
+        path = self.write('songs.csv', "artist,title,album\nA,T (feat. B),\nB,T,X\n")
+        self.assertEqual(0, main(['dedupe', path, '-o', self.output, '--blocking', 'title', '-j', '2']))
+        self.assertEqual([], self.read())
+
+    def test_memory_cap(self):
+        """Verify the command fails when the memory cap is exceeded."""
+        path = self.write('songs.jsonl', '{"artist": "A", "title": "T"}\n' * 1000)
+        self.assertEqual(1, main(['dedupe', path, '-o', self.output, '--memory', '1']))
+        self.assertEqual(1, main(['dedupe', path, '-o', self.output, '--memory', '1', '--preparse']))
+
+    def test_preparse(self):
+        """Verify parsing up front in worker processes writes the same clusters."""
+        rows = ['{"artist": "A", "title": "T", "year": 2000}\n'] * 3 + ['{"artist": "A", "title": "U"}\n']
+        path = self.write('songs.jsonl', ''.join(rows))
+        self.assertEqual(0, main(['dedupe', path, '-o', self.output, '--preparse', '-j', '2']))
+        self.assertEqual([{'songs': [{'artist': "A", 'title': "T", 'year': 2000}] * 3}], self.read())
+
+    def test_max_block(self):
+        """Verify oversized blocks can be split (in memory only)."""
+        path = self.write('songs.jsonl', '{"artist": "A", "title": "T"}\n{"artist": "A", "title": "U"}\n'
+                                         '{"artist": "A", "title": "T"}\n')
+        self.assertEqual(0, main(['dedupe', path, '-o', self.output, '--max-block', '2']))
+        self.assertEqual([{'songs': [{'artist': "A", 'title': "T"}] * 2}], self.read())
+        self.assertEqual(1, main(['dedupe', path, '-o', self.output, '--max-block', '2', '--out-of-core']))
+        self.assertEqual(0, main(['blocks', path, '--max-block', '2']))
+
+    def test_metrics_and_profile(self):
+        """Verify stage metrics and sampled stacks are written."""
+        path = self.write('songs.jsonl', '{"artist": "A", "title": "T"}\n' * 3)
+        prom, profile = os.path.join(self.temp, 'metrics.prom'), os.path.join(self.temp, 'stacks.txt')
+        self.assertEqual(0, main(['dedupe', path, '-o', self.output, '--metrics', prom,
+                                  '--profile', profile, '--profile-after', '60']))
+        with open(prom) as stream:
+            self.assertIn("# TYPE enharmony_song_similarity_seconds summary", stream.read())
+        with open(profile) as stream:
+            self.assertEqual("", stream.read())  # finished before sampling started
+
+
+if __name__ == '__main__':
+    unittest.main()
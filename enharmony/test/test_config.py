@@ -0,0 +1,117 @@
+"""
+Unit tests for the enharmony.config module.
+"""
+
+import operator
+import unittest
+
+from enharmony import config, settings
+from enharmony.config import Config
+from enharmony.song import Song
+from enharmony.album import Year
+from enharmony.artist import Artist
+from enharmony.index import DedupIndex, ArtistIndex
+
+
+class TestConfig(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the Config class."""
+
+    def setUp(self):
+        self.config = Config.fromsettings()
+
+    def test_immutable(self):
+        """Verify snapshots and their values cannot be changed."""
+        self.assertRaises(AttributeError, setattr, self.config, 'KINDS', ())
+        self.assertRaises(TypeError, operator.setitem, self.config.ALBUM_WEIGHTS, 'name', 1.0)
+        self.assertEqual(settings.KINDS, self.config.KINDS)
+
+    def test_replace(self):
+        """Verify only fields set to new values are marked as changed."""
+        new = self.config.replace(KINDS=('EP', 'Single', 'LP'), VARIANTS=list(settings.VARIANTS))
+        self.assertLess(self.config.version, new.version)
+        self.assertEqual({'KINDS'}, new.changes(self.config))
+        self.assertEqual(self.config.stamp('VARIANTS'), new.stamp('VARIANTS'))
+        self.assertNotEqual(self.config.stamp('VARIANTS', 'KINDS'), new.stamp('VARIANTS', 'KINDS'))
+
+    def test_unknown(self):
+        """Verify unknown settings are rejected."""
+        self.assertRaises(ValueError, self.config.replace, COLOR='blue')
+
+    def test_compiled(self):
+        """Verify artifacts are only rebuilt when their fields change."""
+        built = []
+
+        def build(current):
+            """Record each build."""
+            built.append(current.version)
+            return len(current.KINDS)
+
+        self.assertEqual(2, self.config.compiled('test', ('KINDS',), build))
+        new = self.config.replace(VARIANTS=('Live',))
+        self.assertEqual(2, new.compiled('test', ('KINDS',), build))
+        newer = new.replace(KINDS=('EP',))
+        self.assertEqual(1, newer.compiled('test', ('KINDS',), build))
+        self.assertEqual([self.config.version, newer.version], built)
+
+
+class TestSwap(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for swapping the snapshot in use."""
+
+    def setUp(self):
+        self.original = config.current()
+
+    def tearDown(self):
+        config.use(self.original)
+
+    def test_thresholds(self):
+        """Verify class thresholds follow the current snapshot."""
+        self.assertTrue(Year(2000).similarity(Year(2001)))
+        config.update(ALBUM_YEAR_THRESHOLD=0.9)
+        self.assertFalse(Year(2000).similarity(Year(2001)))
+
+    def test_reparse(self):
+        """Verify parsed songs are reparsed when their settings change."""
+        song = Song("Artist", "Song [Demo]")
+        title = song.title
+        self.assertEqual(None, title.variant)
+        config.update(ARTICLES=('the', 'los'))
+        self.assertIs(title, song.title)
+        config.update(VARIANTS=settings.VARIANTS + ('Demo',))
+        self.assertEqual('Demo', song.title.variant)
+
+    def test_reload(self):
+        """Verify values can be reloaded from the settings module."""
+        settings.KINDS = ('Single', 'EP', 'LP')
+        try:
+            self.assertEqual(('Single', 'EP'), config.current().KINDS)
+            config.reload()
+            self.assertEqual(('Single', 'EP', 'LP'), config.current().KINDS)
+        finally:
+            settings.KINDS = self.original.KINDS
+
+    def test_caches(self):
+        """Verify cached keys and shared artists are not reused when stale."""
+        artist = Artist("Los Lobos")
+        self.assertEqual("LS LBS", artist.phonetic)
+        config.update(ARTICLES=('the', 'los'), JOINERS=('and', '&', '+', 'with'))
+        self.assertEqual("LBS", artist.phonetic)
+        self.assertEqual(2, len(Artist("A with B").items))
+        self.assertIsNot(artist, Artist("Los Lobos"))
+
+    def test_indexes(self):
+        """Verify indexes are rebuilt when the settings change."""
+        events = []
+        index = DedupIndex(listener=events.append)
+        index.add(Song("Artist", "Song (Demo)"))
+        index.add(Song("Artist", "Song [Demo]"))
+        artists = ArtistIndex([Song("Artist", "Song (feat. A with B)")])
+        self.assertEqual({}, index.clusters)
+        config.update(VARIANTS=('Demo',), JOINERS=('with',))
+        self.assertEqual({1: frozenset([0, 1])}, index.clusters)
+        self.assertEqual('merge', events[-1].kind)
+        self.assertEqual(4, len(artists))  # "artist", "a and b", "a" and "b"
+        self.assertIn("B", artists)
+
+
+if __name__ == '__main__':
+    unittest.main()
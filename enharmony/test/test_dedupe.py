@@ -0,0 +1,75 @@
+"""
+Unit tests for the enharmony.dedupe module.
+"""
+
+import unittest
+
+from enharmony.song import Song
+from enharmony.dedupe import Clusters, Stats, MemoryLimitError, score, dedupe
+
+
+def library():
+    """Get a small library with two clusters of duplicates."""
+    return [Song("Artist A", "Song 1"),
+            Song("Artist B", "Song 2"),
+            Song("Artist A", "Song 1", album="Album"),
+            Song("Artist A", "Song 1 (Live)"),
+            Song("Artist B", "Song 2"),
+            Song("Artist A", "Song 1")]
+
+
+class TestClusters(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the Clusters class."""
+
+    def test_union(self):
+        """Verify sets are merged under their lowest index."""
+        clusters = Clusters(5)
+        self.assertTrue(clusters.union(3, 4))
+        self.assertTrue(clusters.union(4, 1))
+        self.assertFalse(clusters.union(1, 3))
+        self.assertEqual(1, clusters.find(4))
+        self.assertEqual([[1, 3, 4]], clusters.groups())
+
+    def test_add(self):
+        """Verify new single-item sets can be added."""
+        clusters = Clusters()
+        self.assertEqual(0, clusters.add())
+        self.assertEqual(1, clusters.add())
+        self.assertEqual([[0], [1]], clusters.groups(minimum=1))
+
+
+class TestScore(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for scoring a block."""
+
+    def test_linked_pairs_skipped(self):
+        """Verify pairs already linked by duplicates are not compared."""
+        songs = library()
+        block = [(index, songs[index]) for index in (0, 2, 5)]
+        pairs, comparisons = score(block)
+        self.assertEqual([(0, 2), (0, 5)], pairs)
+        self.assertEqual(2, comparisons)
+
+
+class TestDedupe(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the dedupe pipeline."""
+
+    def test_clusters(self):
+        """Verify duplicate clusters are located."""
+        stats = Stats()
+        self.assertEqual([[0, 2, 5], [1, 4]], dedupe(iter(library()), stats=stats))
+        self.assertEqual(6, stats.rows)
+        self.assertEqual(7, stats.candidates)
+        self.assertAlmostEqual(1 - 7 / 15, stats.reduction)
+
+    def test_workers(self):
+        """Verify scoring in worker processes gives the same clusters."""
+        self.assertEqual(dedupe(library()), dedupe(library(), workers=2))
+
+    def test_memory_cap(self):
+        """Verify exceeding the memory cap aborts the run."""
+        with self.assertRaises(MemoryLimitError):
+            dedupe(library(), stats=Stats(memory=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
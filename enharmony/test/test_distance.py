@@ -0,0 +1,102 @@
+"""
+Unit tests for the enharmony.distance module.
+"""
+
+import random
+import unittest
+
+from enharmony import config
+from enharmony.title import Title
+from enharmony.artist import Artist
+from enharmony.distance import distance, ratio, distances, ratios
+
+
+def levenshtein(text1, text2):
+    """Get the edit distance with the textbook dynamic program."""
+    previous = list(range(len(text2) + 1))
+    for row, char1 in enumerate(text1, start=1):
+        current = [row]
+        for column, char2 in enumerate(text2, start=1):
+            current.append(min(previous[column] + 1, current[column - 1] + 1,
+                               previous[column - 1] + (char1 != char2)))
+        previous = current
+    return previous[-1]
+
+
+class TestDistance(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for edit distances."""
+
+    def test_examples(self):
+        """Verify known edit distances."""
+        self.assertEqual(3, distance("kitten", "sitting"))
+        self.assertEqual(0, distance("", ""))
+        self.assertEqual(4, distance("", "abcd"))
+        self.assertEqual(1, distance("beatles", "beetles"))
+
+    def test_random(self):
+        """Verify distances match the dynamic program for long and short texts."""
+        rng = random.Random(0)
+        for _ in range(300):
+            text1 = ''.join(rng.choice('abc ') for _ in range(rng.randint(0, 90)))
+            text2 = ''.join(rng.choice('abc ') for _ in range(rng.randint(0, 90)))
+            self.assertEqual(levenshtein(text1, text2), distance(text1, text2))
+
+    def test_maximum(self):
+        """Verify distances above a maximum are capped."""
+        self.assertEqual(2, distance("kitten", "sitting", maximum=1))
+        self.assertEqual(3, distance("kitten", "sitting", maximum=3))
+        self.assertEqual(3, distance("a", "abcdefgh", maximum=2))
+
+    def test_batch(self):
+        """Verify one query can be compared with many texts."""
+        texts = ["sitting", "kitten", "mitten", "kitchen"]
+        self.assertEqual([distance("kitten", text) for text in texts], distances("kitten", texts))
+        self.assertEqual([2, 0, 1, 2], distances("kitten", texts, maximum=1))
+
+
+class TestRatio(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for edit distance similarity ratios."""
+
+    def test_ratio(self):
+        """Verify ratios scale distances by the longest text."""
+        self.assertEqual(1.0, ratio("", ""))
+        self.assertAlmostEqual(1 - 3 / 7, ratio("kitten", "sitting"))
+
+    def test_minimum(self):
+        """Verify ratios below a minimum are zero."""
+        self.assertEqual(0.0, ratio("kitten", "sitting", minimum=0.8))
+        self.assertAlmostEqual(0.8, ratio("abcde", "abcdx", minimum=0.8))
+
+    def test_batch(self):
+        """Verify batch ratios match individual ratios."""
+        texts = ["sitting", "kitten", "", "kit"]
+        self.assertEqual([ratio("kitten", text, 0.5) for text in texts], ratios("kitten", texts, 0.5))
+
+
+class TestSelection(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for selecting edit distance for title and artist similarity."""
+
+    def setUp(self):
+        self.previous = config.update(TEXT_SIMILARITY='levenshtein')
+
+    def tearDown(self):
+        config.use(self.previous)
+
+    def test_title(self):
+        """Verify misspelled titles are partially similar."""
+        similarity = Title("Rock and Roll Music").similarity(Title("Rock & Rol Music"))
+        self.assertAlmostEqual(0.5 * (1 - 1 / 19) + 0.5, float(similarity))
+
+    def test_artist(self):
+        """Verify misspelled artists are similar."""
+        self.assertAlmostEqual(1 - 1 / 7, float(Artist("The Beatles").similarity(Artist("beetles"))))
+
+    def test_default(self):
+        """Verify titles only match exactly without edit distance."""
+        config.use(self.previous)
+        similarity = Title("Rock and Roll Music").similarity(Title("Rock & Rol Music"))
+        self.assertEqual(0.5, float(similarity))
+
+
+if __name__ == '__main__':
+    unittest.main()
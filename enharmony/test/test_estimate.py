@@ -0,0 +1,74 @@
+"""
+Unit tests for the enharmony.estimate module.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from enharmony import records, synthetic
+from enharmony.cli import main
+from enharmony.dedupe import dedupe
+from enharmony.estimate import estimate, wilson, asdict
+from enharmony.song import Song
+
+
+class TestEstimate(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for sampled duplicate estimates."""
+
+    def test_wilson(self):
+        """Verify Wilson intervals contain the observed share."""
+        interval = wilson(20, 100)
+        self.assertEqual(0.2, interval.value)
+        self.assertAlmostEqual(0.133, interval.low, places=3)
+        self.assertAlmostEqual(0.289, interval.high, places=3)
+        self.assertEqual((0.0, 0.0, 1.0), wilson(0, 0))
+        self.assertEqual(0.0, wilson(0, 10).low)
+        self.assertEqual(1.0, wilson(10, 10).high)
+
+    def test_exact_counts(self):
+        """Verify block statistics are exact."""
+        songs = [Song("A", "1"), Song("A", "1"), Song("A", "2"), Song("B", "1"), Song("C", "1"),
+                 Song("C", "2")]
+        result = estimate(songs, samples=6, pairs=50)
+        self.assertEqual((6, 2, 3, 4), (result.songs, result.blocks, result.largest, result.candidates))
+        self.assertEqual({2: 1.0}, result.clusters)
+        self.assertAlmostEqual(2 / 6, result.rate.value)
+
+    def test_library(self):
+        """Verify estimates of a synthetic library contain the true values."""
+        songs = [records.song(record) for record in synthetic.generate(600, seed=8)]
+        clusters = dedupe(songs)
+        share = sum(len(cluster) for cluster in clusters) / len(songs)
+        result = estimate(songs, samples=300, pairs=800, confidence=0.99, seed=1)
+        self.assertLessEqual(result.rate.low, share)
+        self.assertGreaterEqual(result.rate.high, share)
+        self.assertLessEqual(result.pairs.low, result.pairs.value)
+        self.assertLessEqual(result.seconds.low, result.seconds.high)
+        self.assertLess(0, result.comparisons)
+
+    def test_no_candidates(self):
+        """Verify a library without candidate pairs has no duplicates."""
+        result = estimate([Song("A", "1"), Song("B", "1")])
+        self.assertEqual(0, result.candidates)
+        self.assertEqual(0.0, result.rate.value)
+        self.assertEqual({}, result.clusters)
+        self.assertEqual((0.0, 0.0, 0.0), result.seconds)
+
+    def test_cli(self):
+        """Verify the estimate command."""
+        temp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp, 'songs.jsonl')
+            with open(path, 'w') as stream:
+                for record in synthetic.generate(50):
+                    records.write(stream, record)
+            self.assertEqual(0, main(['estimate', path, '--samples', '20', '--pairs', '20']))
+        finally:
+            shutil.rmtree(temp)
+        self.assertIn('rate', asdict(estimate([Song("A", "1"), Song("A", "1")])))
+
+
+if __name__ == '__main__':
+    unittest.main()
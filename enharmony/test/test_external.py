@@ -0,0 +1,66 @@
+"""
+Unit tests for the enharmony.external module.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from enharmony import records
+from enharmony.dedupe import dedupe
+from enharmony.external import Runs, cluster, groups
+
+
+RECORDS = [{'artist': "Artist A", 'title': "Song 1"},
+           {'artist': "Artist B", 'title': "Song 2"},
+           {'artist': "Artist A", 'title': "Song 1", 'album': "Album"},
+           {'artist': "Artist A", 'title': "Song 1 (Live)"},
+           {'artist': "Artist B", 'title': "Song 2"},
+           {'artist': "Artist C", 'title': "Song 3"},
+           {'artist': "Artist A", 'title': "Song 1"}]
+
+
+class TestRuns(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the Runs class."""
+
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp)
+
+    def test_merge(self):
+        """Verify spilled runs are merged in key then index order."""
+        with Runs(size=2, directory=self.temp) as runs:
+            for index, key in enumerate("cabca"):
+                runs.add(key, index, {})
+            self.assertEqual(2, len(runs.paths))
+            items = [(key, index) for key, index, _ in runs.merge()]
+        self.assertEqual([('a', 1), ('a', 4), ('b', 2), ('c', 0), ('c', 3)], items)
+
+    def test_close(self):
+        """Verify run files are deleted."""
+        with Runs(size=1, directory=self.temp) as runs:
+            runs.add('a', 0, {})
+        self.assertEqual([], os.listdir(self.temp))
+
+
+class TestCluster(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for out-of-core clustering."""
+
+    def test_matches_in_memory(self):
+        """Verify the same clusters are found as the in-memory pipeline."""
+        songs = [records.song(record) for record in RECORDS]
+        expected = [[RECORDS[index] for index in group] for group in dedupe(songs)]
+        found = cluster(iter(RECORDS), run_size=2)
+        self.assertEqual(expected, list(groups(iter(RECORDS), found, run_size=2)))
+
+    def test_workers(self):
+        """Verify blocks can be scored in worker processes."""
+        found = cluster(iter(RECORDS), strategy='title', run_size=3, workers=2)
+        self.assertEqual([[0, 2, 6], [1, 4]], found.groups())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Unit tests for the enharmony.graph module.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from enharmony import records, synthetic
+from enharmony.cli import main
+from enharmony.dedupe import dedupe
+from enharmony.graph import Graph
+from enharmony.song import Song
+
+
+class TestGraph(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the sparse similarity graph."""
+
+    def setUp(self):
+        self.songs = [Song("The Beatles", "Yesterday"),
+                      Song("The Beatles", "Yesterday (Remastered)"),
+                      Song("The Beatles", "Yesterday"),
+                      Song("The Beatles", "Help!"),
+                      Song("Queen", "Innuendo")]
+        self.graph = Graph.build(self.songs)
+        self.temp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp)
+
+    def test_csr(self):
+        """Verify edges are stored in both songs' rows."""
+        self.assertEqual(5, self.graph.count)
+        self.assertEqual(6, len(self.graph.indptr))
+        self.assertEqual(len(self.graph) * 2, len(self.graph.indices))
+        for index1, index2, value in self.graph.edges():
+            self.assertIn((index2, value), self.graph.neighbors(index1))
+            self.assertIn((index1, value), self.graph.neighbors(index2))
+        self.assertEqual([], self.graph.neighbors(4))
+
+    def test_minimum(self):
+        """Verify scores below the minimum are not stored."""
+        graph = Graph.build(self.songs, minimum=0.9)
+        self.assertLess(len(graph), len(self.graph))
+        self.assertTrue(all(value >= 0.9 for _, _, value in graph.edges()))
+
+    def test_cut(self):
+        """Verify clusters depend on the threshold."""
+        self.assertEqual([[0, 2]], self.graph.cut(1.0))
+        self.assertEqual([[0, 1, 2]], self.graph.cut(0.85))
+        self.assertEqual([[0, 1, 2, 3]], self.graph.cut(0.5))
+
+    def test_hierarchy(self):
+        """Verify a hierarchy matches separate cuts."""
+        thresholds = (1.0, 0.85, 0.6, 0.5)
+        levels = self.graph.hierarchy(thresholds)
+        self.assertEqual({threshold: self.graph.cut(threshold) for threshold in thresholds}, levels)
+
+    def test_merges(self):
+        """Verify merges join clusters in order of decreasing score."""
+        merges = self.graph.merges()
+        self.assertEqual(3, len(merges))
+        self.assertEqual((1.0, 0, 2), merges[0])
+        self.assertEqual(sorted(merges, reverse=True)[0][0], merges[0][0])
+
+    def test_rows(self):
+        """Verify arrays built from edges match rows of sorted neighbors."""
+        rows = [[] for _ in self.songs]
+        for index1, index2, value in self.graph.edges():
+            rows[index1].append((index2, value))
+            rows[index2].append((index1, value))
+        self.assertEqual(Graph.fromrows(rows), self.graph)
+
+    def test_shared_pairs(self):
+        """Verify pairs sharing several blocks are scored once."""
+        songs = [Song("A", "Title (feat. B)"), Song("A", "Title (feat. B)"), Song("B", "Title")]
+        pairs = []
+
+        def scorer(song1, song2):
+            """Record each scored pair."""
+            pairs.append((songs.index(song1), songs.index(song2)))
+            return 1.0
+        graph = Graph.build(songs, strategy='credits', scorer=scorer)
+        self.assertEqual(3, len(pairs))
+        self.assertEqual(3, len(graph))
+
+    def test_maximum(self):
+        """Verify large blocks are split when building."""
+        songs = [Song("A", title) for title in ("Alpha", "Bravo", "Charlie", "Delta", "Echo", "Foxtrot")]
+        pairs = []
+
+        def scorer(song1, song2):
+            """Count the scored pairs."""
+            pairs.append((song1, song2))
+            return 0.5
+        Graph.build(songs, scorer=scorer, maximum=2)
+        self.assertEqual(3, len(pairs))
+
+    def test_same_as_dedupe(self):
+        """Verify a cut at 1.0 finds the same clusters as dedupe."""
+        songs = [records.song(record) for record in synthetic.generate(150, seed=5)]
+        expected = dedupe(songs)
+        self.assertTrue(expected)
+        self.assertEqual(expected, Graph.build(songs).cut(1.0))
+
+    def test_save_and_load(self):
+        """Verify a graph can be saved and loaded."""
+        path = os.path.join(self.temp, 'songs.graph')
+        self.graph.save(path)
+        self.assertEqual(self.graph, Graph.load(path))
+
+    def test_load_invalid(self):
+        """Verify files that are not graphs cannot be loaded."""
+        path = os.path.join(self.temp, 'songs.graph')
+        with open(path, 'wb') as stream:
+            stream.write(b'garbage')
+        self.assertRaises(ValueError, Graph.load, path)
+        self.graph.save(path)
+        with open(path, 'rb+') as stream:
+            stream.truncate(40)
+        self.assertRaises(ValueError, Graph.load, path)
+
+    def test_cli(self):
+        """Verify the graph and cut commands."""
+        songs = os.path.join(self.temp, 'songs.jsonl')
+        with open(songs, 'w') as stream:
+            for song in self.songs:
+                records.write(stream, {'artist': str(song.artist), 'title': song._title})  # pylint: disable=W0212
+        path = os.path.join(self.temp, 'songs.graph')
+        output = os.path.join(self.temp, 'clusters.jsonl')
+        self.assertEqual(0, main(['graph', songs, path]))
+        self.assertEqual(0, main(['cut', path, songs, '-t', '1.0', '0.85', '-o', output]))
+        with open(output) as stream:
+            lines = [json.loads(line) for line in stream]
+        self.assertEqual([(1.0, 2), (0.85, 3)], [(line['threshold'], len(line['songs'])) for line in lines])
+        self.assertEqual(1, main(['cut', songs, songs]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+"""
+Unit tests for the enharmony.index module.
+"""
+
+import unittest
+
+from enharmony import config, index
+from enharmony.song import Song
+from enharmony.index import ArtistIndex, DedupIndex, Event, PrefixIndex, PrefixSearch
+
+
+class TestCredits(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for parsing credited artists."""
+
+    def test_primary(self):
+        """Verify joined primary artists are credited as one name."""
+        song = Song("Simon & Garfunkel", "The Boxer")
+        self.assertEqual(('simon and garfunkel',), song.credits)
+
+    def test_full_name(self):
+        """Verify a name containing commas matches itself credited as one artist."""
+        song1 = Song("Earth, Wind & Fire", "September")
+        song2 = Song("Artist", "Title (feat. Earth, Wind & Fire)")
+        self.assertEqual(('earth, wind and fire',), song1.credits)
+        self.assertEqual([song2], ArtistIndex([song1, song2]).candidates(song1))
+
+    def test_comma_band(self):
+        """Verify a band named with commas is not a candidate for its parts."""
+        songs = [Song("Earth, Wind & Fire", "September"), Song("Fire", "Burn"),
+                 Song("Wind", "Blow")]
+        artists = ArtistIndex(songs)
+        self.assertEqual([], artists.candidates(songs[0]))
+        self.assertEqual([songs[1]], artists.find("fire"))
+
+    def test_featuring(self):
+        """Verify featured artists are credited after primary artists."""
+        song = Song("The Artist", "Title (feat. Artist B and Artist C)",
+                    "Album (featuring Artist D) [EP]")
+        self.assertEqual(('artist', 'artist b and artist c', 'artist b', 'artist c', 'artist d'),
+                         song.credits)
+
+    def test_duplicates(self):
+        """Verify an artist credited twice is only listed once."""
+        song = Song("Artist A", "Title (feat. artist a)")
+        self.assertEqual(('artist a',), song.credits)
+
+
+class TestArtistIndex(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the ArtistIndex class."""
+
+    def setUp(self):
+        self.song1 = Song("Artist A", "Song X (feat. Artist B)")
+        self.song2 = Song("Artist B", "Song Y")
+        self.song3 = Song("Artist C", "Song Z")
+        self.index = ArtistIndex([self.song1, self.song2, self.song3])
+
+    def test_find_featured(self):
+        """Verify a song is found by its featured artist."""
+        self.assertEqual([self.song1, self.song2], self.index.find("artist b"))
+
+    def test_find_missing(self):
+        """Verify an unknown artist has no songs."""
+        self.assertEqual([], self.index.find("Artist D"))
+        self.assertNotIn("Artist D", self.index)
+
+    def test_candidates(self):
+        """Verify candidates share a credited artist."""
+        self.assertEqual([self.song2], self.index.candidates(self.song1))
+        self.assertEqual([], self.index.candidates(self.song3))
+
+    def test_remove(self):
+        """Verify a removed song is no longer found."""
+        self.index.remove(self.song2)
+        self.assertEqual([self.song1], self.index.find("Artist B"))
+        self.index.remove(self.song3)
+        self.assertEqual(2, len(self.index))
+
+
+class Near(Song):
+
+    """Song similar to songs within one second of its duration."""
+
+    def __init__(self, duration):
+        super(Near, self).__init__("Artist", "Song", duration=duration)
+
+    def similarity(self, other):
+        return self.Similarity(abs(self.duration - other.duration) <= 1)
+
+
+class TestDedupIndex(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the DedupIndex class."""
+
+    def setUp(self):
+        self.received = []
+        self.index = DedupIndex(listener=self.received.append)
+
+    def test_add(self):
+        """Verify clusters form as duplicates are added."""
+        first = self.index.add(Song("Artist", "Song"))
+        self.index.add(Song("Artist", "Other Song"))
+        third = self.index.add(Song("Artist", "Song"))
+        self.assertEqual([Event('merge', 1, frozenset([first, third]), ())], list(self.index.stream()))
+        self.assertEqual({1: frozenset([0, 2])}, self.index.clusters)
+        self.assertEqual(None, self.index.cluster(1))
+        self.assertEqual(1, len(self.received))
+
+    def test_merge_clusters(self):
+        """Verify a song linking two clusters merges them."""
+        for song_id, duration in (('a', 1), ('a2', 1), ('c', 3), ('c2', 3), ('b', 2)):
+            self.index.add(Near(duration), song_id)
+        self.assertEqual(Event('merge', 1, frozenset(['a', 'a2', 'b', 'c', 'c2']), (2,)), self.received[-1])
+        self.assertEqual({1: frozenset(['a', 'a2', 'b', 'c', 'c2'])}, self.index.clusters)
+
+    def test_update(self):
+        """Verify an updated song leaves its old cluster and joins a new one."""
+        self.index.add(Song("Artist", "Song"), 'a1')
+        self.index.add(Song("Artist", "Song"), 'a2')
+        self.index.add(Song("Artist", "Song [Live]"), 'b1')
+        self.index.update('a2', Song("Artist", "Song (Live)"))
+        self.assertEqual(Event('dissolve', 1, frozenset(), ()), self.received[-2])
+        self.assertEqual(Event('merge', 2, frozenset(['a2', 'b1']), ()), self.received[-1])
+
+    def test_shrink(self):
+        """Verify removing a song from a connected cluster shrinks it."""
+        for name in 'abc':
+            self.index.add(Song("Artist", "Song"), name)
+        self.index.remove('a')
+        self.assertEqual(Event('shrink', 1, frozenset('bc'), ()), self.received[-1])
+        self.index.remove('b')
+        self.assertEqual(Event('dissolve', 1, frozenset(), ()), self.received[-1])
+        self.assertEqual({}, self.index.clusters)
+        self.assertEqual(1, len(self.index))
+
+    def test_split(self):
+        """Verify removing a linking song splits its cluster."""
+        for song_id, duration in (('a', 1), ('a2', 1), ('b', 2), ('c', 3), ('c2', 3)):
+            self.index.add(Near(duration), song_id)
+        self.index.remove('b')
+        self.assertEqual(['split', 'split'], [event.kind for event in self.received[-2:]])
+        self.assertEqual({2: frozenset(['a', 'a2']), 3: frozenset(['c', 'c2'])}, self.index.clusters)
+        self.assertEqual([2, 3], [event.cluster for event in self.received[-2:]])
+        self.assertEqual(((1,), (1,)), tuple(event.previous for event in self.received[-2:]))
+
+    def test_duplicate_id(self):
+        """Verify an ID cannot be added twice."""
+        self.index.add(Song("A", "B"), 'x')
+        self.assertRaises(KeyError, self.index.add, Song("A", "B"), 'x')
+
+
+class TestPrefixIndex(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the PrefixIndex and PrefixSearch classes."""
+
+    def setUp(self):
+        self.previous = config.current()
+        self.index = PrefixIndex([Song("The Beatles", "Yesterday"),
+                                  Song("The Beatles", "Yellow Submarine"),
+                                  Song("Beach Boys", "Wouldn't It Be Nice"),
+                                  Song("Beatles Tribute Band", "Yesterday"),
+                                  Song("Bee Gees", "Stayin' Alive")])
+
+    def tearDown(self):
+        config.use(self.previous)
+
+    def ids(self, results):
+        """Get the IDs from search results."""
+        return [song_id for song_id, _ in results]
+
+    def test_complete(self):
+        """Verify distinct normalized names starting with a prefix are found."""
+        self.assertEqual(["beatles", "beatles tribute band"], self.index.complete('artist', "The Beat"))
+        self.assertEqual(["yellow submarine", "yesterday"], self.index.complete('title', "Ye"))
+        self.assertEqual([], self.index.complete('artist', "Zz"))
+
+    def test_search_artist(self):
+        """Verify songs are found by an artist prefix, shortest completion first."""
+        self.assertEqual([0, 1, 2, 3], self.ids(self.index.search(artist="bea")))
+        self.assertEqual([4], self.ids(self.index.search(artist="bee")))
+
+    def test_search_both(self):
+        """Verify an exact duplicate of the typed song is ranked first."""
+        self.assertEqual([0, 1, 3], self.ids(self.index.search("The Beatles", "Y")))
+        song_id = self.index.add(Song("Beatles X", "Yes"))
+        self.assertEqual([0, 1, song_id], self.ids(self.index.search("The Beatles", "Ye", limit=3)))
+        self.assertEqual([0, 3], self.ids(self.index.search("The Beatles", "Yesterday")))
+        self.assertEqual([], self.index.search())
+
+    def test_search_limits(self):
+        """Verify the number of songs ranked and returned can be limited."""
+        self.assertEqual([0, 1], self.ids(self.index.search(artist="b", limit=2)))
+        self.assertEqual([0, 2], self.ids(self.index.search(artist="b", scan=2)))
+
+    def test_search_visits(self):
+        """Verify the postings read for one search are bounded."""
+        self.assertEqual([0, 1, 3], self.ids(self.index.search(artist="b", title="y")))
+        original = index.VISIT
+        index.VISIT = 2
+        try:
+            self.assertEqual([0, 1], self.ids(self.index.search(artist="b", title="y")))
+        finally:
+            index.VISIT = original
+
+    def test_search_exact(self):
+        """Verify a song with an exact name is found past the songs scanned."""
+        songs = [Song("Beatles Tribute", "Yellow {0}".format(number)) for number in range(150)]
+        songs += [Song("Beatles Cover", "Zebra")] * 20 + [Song("The Beatles", "Yz")]
+        prefixes = PrefixIndex(songs)
+        self.assertEqual(170, self.ids(prefixes.search(artist="beatles", title="y"))[0])
+        self.assertEqual([170], self.ids(prefixes.search(artist="beatles", title="yz")))
+
+    def test_narrow(self):
+        """Verify each keystroke only searches the span of the previous prefix."""
+        search = PrefixSearch(self.index)
+        spans = []
+        for text in ("b", "be", "bea", "beat", "beatles t"):
+            search.update(artist=text)
+            spans.append(search._spans['artist'])  # pylint: disable=W0212
+        self.assertEqual([(0, 4), (0, 4), (0, 3), (1, 3), (2, 3)], spans)
+        self.assertEqual([4], self.ids(search.update(artist="bee")))
+
+    def test_add_remove(self):
+        """Verify added songs are found before and after they are merged."""
+        song_id = self.index.add(Song("Beck", "Loser"))
+        self.assertEqual(1, self.index.version)
+        self.assertEqual([song_id], self.ids(self.index.search(artist="beck")))
+        self.assertIn("beck", self.index.complete('artist', "bec"))
+        self.index.remove(0)
+        self.assertNotIn(0, self.index)
+        self.assertEqual([3], self.ids(self.index.search(title="yesterday")))
+        self.assertEqual(5, len(self.index))
+        original = index.MERGE
+        index.MERGE = 1
+        try:
+            self.index.add(Song("Bjork", "Joga"))
+        finally:
+            index.MERGE = original
+        self.assertEqual(2, self.index.version)
+        self.assertEqual([song_id], self.ids(self.index.search(artist="beck")))
+
+    def test_complete_removed(self):
+        """Verify names whose songs were all removed are not completed."""
+        songs = PrefixIndex([Song("Abba", "Waterloo"), Song("Adele", "Hello")])
+        songs.remove(0)
+        self.assertEqual(["adele"], songs.complete('artist', "a"))
+
+    def test_settings(self):
+        """Verify the names are normalized again when the settings change."""
+        config.update(ARTICLES=[])
+        self.assertEqual([0, 1], self.ids(self.index.search(artist="the b")))
+
+
+if __name__ == '__main__':
+    unittest.main()
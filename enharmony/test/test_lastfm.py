@@ -0,0 +1,154 @@
+"""
+Unit tests for the enharmony.lastfm module.
+"""
+
+import time
+import asyncio
+import unittest
+
+from enharmony import lastfm, synthetic
+from enharmony.song import Song
+
+
+class TestLastfm(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for fetching recent tracks from a mock server."""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.library = synthetic.generate(45, seed=2)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def fetch(self, server, **kwargs):
+        """Fetch every record from a mock server."""
+        async def collect():
+            url = await server.start()
+            kwargs.setdefault('rate', None)
+            kwargs.setdefault('backoff', 0.01)
+            fetcher = lastfm.Fetcher(server.user, server.api_key, url=url, limit=10, **kwargs)
+            try:
+                return fetcher, [record async for record in fetcher.records()]
+            finally:
+                await server.close()
+
+        return self.loop.run_until_complete(collect())
+
+    def assertLibrary(self, found):  # pylint: disable=C0103
+        """Assert every record of the library was fetched once."""
+        def key(record):
+            return record['artist'] or "", record['title'] or "", record['album'] or ""
+        self.assertEqual(sorted(key(record) for record in self.library),
+                         sorted(key(record) for record in found))
+
+    def test_all_pages(self):
+        """Verify every page of tracks is fetched."""
+        fetcher, found = self.fetch(lastfm.MockServer(self.library))
+        self.assertLibrary(found)
+        self.assertEqual(5, fetcher.requests)
+        self.assertEqual(0, fetcher.retried)
+        self.assertEqual(45, len({record['played'] for record in found}))
+
+    def test_bounded_concurrency(self):
+        """Verify no more requests than allowed are in flight."""
+        server = lastfm.MockServer(self.library, delay=0.02)
+        _, found = self.fetch(server, concurrency=2)
+        self.assertLibrary(found)
+        self.assertEqual(2, server.peak)
+
+    def test_retry(self):
+        """Verify failed requests are retried."""
+        fetcher, found = self.fetch(lastfm.MockServer(self.library, fail_every=3))
+        self.assertLibrary(found)
+        self.assertLess(0, fetcher.retried)
+
+    def test_rate_limit_retry(self):
+        """Verify rate limit errors are retried after backing off."""
+        fetcher, found = self.fetch(lastfm.MockServer(self.library, rate=3), concurrency=5,
+                                    backoff=0.05)
+        self.assertLibrary(found)
+        self.assertLess(0, fetcher.retried)
+
+    def test_give_up(self):
+        """Verify a page that keeps failing raises an error."""
+        server = lastfm.MockServer(self.library, fail_every=1)
+        self.assertRaises(lastfm.LastfmError, self.fetch, server, retries=2)
+        self.assertEqual(3, server.requests)
+
+    def test_dropped_connection(self):
+        """Verify connections closed before the status line are retried."""
+        connections = []
+
+        async def drop(reader, writer):
+            connections.append(writer)
+            while (await reader.readline()).strip():
+                pass
+            writer.close()
+
+        async def fetch():
+            server = await asyncio.start_server(drop, '127.0.0.1', 0)
+            url = "http://127.0.0.1:{0}/".format(server.sockets[0].getsockname()[1])
+            fetcher = lastfm.Fetcher('user', 'key', url=url, rate=None, retries=2, backoff=0.01)
+            try:
+                return await fetcher.page(1)
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        self.assertRaises(lastfm.LastfmError, self.loop.run_until_complete, fetch())
+        self.assertEqual(3, len(connections))
+
+    def test_fatal_error(self):
+        """Verify errors that cannot succeed are not retried."""
+        server = lastfm.MockServer(self.library, api_key='other')
+        server.api_key, key = 'secret', server.api_key
+
+        async def collect():
+            url = await server.start()
+            fetcher = lastfm.Fetcher(server.user, key, url=url, rate=None)
+            try:
+                return [record async for record in fetcher.records()]
+            finally:
+                await server.close()
+
+        self.assertRaises(lastfm.LastfmError, self.loop.run_until_complete, collect())
+        self.assertEqual(1, server.requests)
+
+    def test_rate_limiter(self):
+        """Verify the rate limiter spaces requests."""
+        limiter = lastfm.RateLimiter(rate=50)
+
+        async def acquire():
+            for _ in range(6):
+                await limiter.acquire()
+
+        start = time.monotonic()
+        self.loop.run_until_complete(acquire())
+        self.assertLess(0.09, time.monotonic() - start)
+
+    def test_songs(self):
+        """Verify records are converted to songs."""
+        server = lastfm.MockServer([{'artist': "The Beatles", 'title': "Yesterday",
+                                     'album': "Help!"}])
+
+        async def collect():
+            url = await server.start()
+            fetcher = lastfm.Fetcher(server.user, server.api_key, url=url, rate=None)
+            try:
+                return [song async for _, song in fetcher.songs()]
+            finally:
+                await server.close()
+
+        songs = self.loop.run_until_complete(collect())
+        self.assertEqual([Song("The Beatles", "Yesterday", "Help!")], songs)
+
+    def test_record(self):
+        """Verify API tracks are converted to song records."""
+        track = {'artist': {'mbid': "", '#text': "Queen"}, 'name': "Innuendo",
+                 'album': {'#text': ""}, 'date': {'uts': "1400000000"}}
+        self.assertEqual({'artist': "Queen", 'title': "Innuendo", 'album': None,
+                          'played': 1400000000}, lastfm._record(track))  # pylint: disable=W0212
+
+
+if __name__ == '__main__':
+    unittest.main()
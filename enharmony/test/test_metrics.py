@@ -0,0 +1,108 @@
+"""
+Unit tests for the enharmony.metrics module.
+"""
+
+import time
+import unittest
+
+from enharmony import metrics
+from enharmony.song import Song
+from enharmony.index import DedupIndex
+
+
+class TestMetrics(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for counters, timers and gauges."""
+
+    def setUp(self):
+        metrics.reset()
+
+    def tearDown(self):
+        metrics.enable()
+        metrics.reset()
+
+    def test_count(self):
+        """Verify counters add up."""
+        metrics.count('test.items')
+        metrics.count('test.items', 4)
+        self.assertEqual(5, metrics.snapshot()['counters']['test.items'])
+
+    def test_timed(self):
+        """Verify timed functions count calls and seconds."""
+        @metrics.timed('test.sleep')
+        def sleep():
+            time.sleep(0.01)
+            return 42
+        self.assertEqual(42, sleep())
+        sleep()
+        timer = metrics.snapshot()['timers']['test.sleep']
+        self.assertEqual(2, timer['count'])
+        self.assertLess(0.02, timer['seconds'])
+
+    def test_timer(self):
+        """Verify blocks of code can be timed."""
+        with metrics.Timer('test.block'):
+            pass
+        self.assertEqual(1, metrics.snapshot()['timers']['test.block']['count'])
+
+    def test_disabled(self):
+        """Verify nothing is collected while disabled."""
+        metrics.enable(False)
+        self.assertFalse(metrics.enabled())
+        metrics.count('test.items')
+        Song("Artist", "Title").similarity(Song("Artist", "Title"))
+        values = metrics.snapshot()
+        self.assertEqual({}, values['counters'])
+        self.assertEqual({}, values['timers'])
+
+    def test_stages(self):
+        """Verify parsing, comparing and indexing are instrumented."""
+        index = DedupIndex()
+        index.add(Song("Artist", "Title", "Album"))
+        index.add(Song("Artist", "Title"))
+        values = metrics.snapshot()
+        self.assertEqual(2, values['counters']['song.created'])
+        self.assertEqual(1, values['counters']['index.candidates'])
+        for name in ('song.similarity', 'title.parse', 'index.add'):
+            self.assertLessEqual(1, values['timers'][name]['count'], name)
+        for name in ('cache.phonetic.hits', 'cache.distance.pattern.size', 'flyweight.artist.size'):
+            self.assertIn(name, values['gauges'])
+
+    def test_prometheus(self):
+        """Verify snapshots are formatted as Prometheus text."""
+        values = {'counters': {'song.created': 3},
+                  'timers': {'song.similarity': {'count': 2, 'seconds': 0.5}},
+                  'gauges': {'cache.phonetic.size': 7}}
+        self.assertEqual("# TYPE enharmony_song_created_total counter\n"
+                         "enharmony_song_created_total 3\n"
+                         "# TYPE enharmony_song_similarity_seconds summary\n"
+                         "enharmony_song_similarity_seconds_count 2\n"
+                         "enharmony_song_similarity_seconds_sum 0.5\n"
+                         "# TYPE enharmony_cache_phonetic_size gauge\n"
+                         "enharmony_cache_phonetic_size 7\n", metrics.prometheus(values))
+
+
+class TestSampler(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the sampling profiler."""
+
+    def test_samples(self):
+        """Verify the stacks of a busy thread are sampled."""
+        def busy():
+            end = time.perf_counter() + 0.1
+            while time.perf_counter() < end:
+                pass
+        with metrics.Sampler(interval=0.002) as sampler:
+            busy()
+        self.assertLess(0, sampler.samples)
+        self.assertIn("test_metrics.py:busy", sampler.collapsed())
+        self.assertEqual("test_metrics.py:busy", sampler.top(1)[0][0])
+
+    def test_delay(self):
+        """Verify fast runs are not sampled when delayed."""
+        with metrics.Sampler(interval=0.001, delay=10) as sampler:
+            time.sleep(0.01)
+        self.assertEqual(0, sampler.samples)
+        self.assertEqual("", sampler.collapsed())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Unit tests for the enharmony.phonetic module.
+"""
+
+import unittest
+
+from enharmony.artist import Artist
+from enharmony.phonetic import metaphone, encode, _encode
+
+
+class TestMetaphone(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the metaphone function."""
+
+    def test_sound_alike(self):
+        """Verify common misspellings share a code."""
+        for word1, word2 in (("Beatles", "beetles"), ("Smith", "Smyth"), ("Phish", "Fish"),
+                             ("Jon", "John"), ("Garfunkel", "Garfunkle"), ("Celine", "Céline")):
+            self.assertEqual(metaphone(word1), metaphone(word2))
+
+    def test_different(self):
+        """Verify different-sounding words have different codes."""
+        self.assertNotEqual(metaphone("Beatles"), metaphone("Bach"))
+
+    def test_silent_start(self):
+        """Verify silent leading letters are dropped."""
+        self.assertEqual("NT", metaphone("Knight"))
+        self.assertEqual("RT", metaphone("Wright"))
+
+    def test_empty(self):
+        """Verify words without letters have no code."""
+        self.assertEqual("", metaphone("!!!"))
+
+
+class TestEncode(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the encode function."""
+
+    def test_normalized(self):
+        """Verify articles and joiners are normalized before encoding."""
+        self.assertEqual(encode("Simon & Garfunkel"), encode("simon and garfunkle"))
+        self.assertEqual(encode("The Beatles"), encode("Beatles"))
+
+    def test_numbers(self):
+        """Verify numbers are kept as written."""
+        self.assertEqual("BLNK 182", encode("Blink 182"))
+        self.assertEqual("SM 41", encode("Sum 41"))
+
+    def test_embedded_numbers(self):
+        """Verify digits inside hyphenated or alphanumeric names are kept."""
+        self.assertEqual("BLNK 182", encode("Blink-182"))
+        self.assertNotEqual(encode("Blink"), encode("Blink-182"))
+        self.assertEqual("MRN 5", encode("Maroon5"))
+        self.assertEqual("2 PK", encode("2Pac"))
+        self.assertNotEqual(encode("UB40"), encode("UB"))
+
+    def test_unencodable(self):
+        """Verify names without Latin letters keep their normalized text."""
+        self.assertEqual("пётр", encode("Пётр"))
+
+    def test_cached(self):
+        """Verify artists share encoded names through the cache."""
+        _encode.cache_clear()
+        self.assertEqual(Artist("The Beetles").phonetic, Artist("beetles").phonetic)
+        self.assertEqual(1, _encode.cache_info().hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
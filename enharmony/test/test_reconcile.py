@@ -0,0 +1,92 @@
+"""
+Unit tests for the enharmony.reconcile module.
+"""
+
+import random
+import unittest
+from itertools import permutations
+
+from enharmony.song import Song
+from enharmony.reconcile import reconcile, candidates, greedy, optimal
+
+EDGES = [(0, 0, 0.9), (0, 1, 0.8), (1, 0, 0.7), (5, 7, 0.5)]
+
+
+class TestCandidates(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for blocking candidate pairs."""
+
+    def test_shared_keys(self):
+        """Verify only songs sharing a blocking key are paired."""
+        left = [Song("A", "1"), Song("B", "2")]
+        right = [Song("C", "3"), Song("a", "4"), Song("A", "5")]
+        self.assertEqual([(0, 1), (0, 2)], candidates(left, right))
+
+
+class TestAssignment(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for assigning scored pairs."""
+
+    def test_greedy(self):
+        """Verify greedy assignment takes the highest scores first."""
+        self.assertEqual([(0, 0, 0.9), (5, 7, 0.5)], sorted(greedy(EDGES)))
+
+    def test_optimal(self):
+        """Verify optimal assignment maximizes the total score."""
+        self.assertEqual([(0, 1, 0.8), (1, 0, 0.7), (5, 7, 0.5)], sorted(optimal(EDGES)))
+
+    def test_optimal_brute_force(self):
+        """Verify optimal assignment matches an exhaustive search."""
+        rng = random.Random(0)
+        for _ in range(20):
+            edges = [(index1, index2, rng.random()) for index1 in range(4) for index2 in range(5)
+                     if rng.random() < 0.5]
+            best = 0.0
+            scores = {(edge[0], edge[1]): edge[2] for edge in edges}
+            for columns in permutations(range(5), 4):
+                best = max(best, sum(scores.get(pair, 0.0) for pair in zip(range(4), columns)))
+            total = sum(edge[2] for edge in optimal(edges))
+            self.assertAlmostEqual(best, total)
+            self.assertEqual(len({edge[1] for edge in optimal(edges)}), len(optimal(edges)))
+            swapped = [(index2, index1, score) for index1, index2, score in edges]
+            self.assertAlmostEqual(best, sum(edge[2] for edge in optimal(swapped)))
+
+    def test_optimal_limit(self):
+        """Verify components larger than the limit are assigned greedily."""
+        self.assertEqual(sorted(greedy(EDGES)), sorted(optimal(EDGES, limit=3)))
+        self.assertEqual([(0, 1, 0.8), (1, 0, 0.7), (5, 7, 0.5)], sorted(optimal(EDGES, limit=4)))
+
+
+class TestReconcile(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for reconciling two libraries."""
+
+    def setUp(self):
+        self.left = [Song("Artist A", "Song 1"), Song("Artist A", "Song 1"),
+                     Song("Artist B", "Song 2"), Song("Artist C", "Song 3")]
+        self.right = [Song("Artist B", "Song 2"), Song("Artist A", "Song 1", "Album"),
+                      Song("Artist D", "Song 4")]
+
+    def test_one_to_one(self):
+        """Verify each song is matched at most once."""
+        result = reconcile(self.left, self.right)
+        self.assertEqual([(0, 1, 1.0), (2, 0, 1.0)], result.pairs)
+        self.assertEqual([1, 3], result.left)
+        self.assertEqual([2], result.right)
+        self.assertEqual(3, result.comparisons)
+        self.assertEqual({'blocking', 'scoring', 'assignment', 'total'}, set(result.timing))
+
+    def test_optimal(self):
+        """Verify optimal mode gives the same matches for exact scores."""
+        self.assertEqual(reconcile(self.left, self.right).pairs,
+                         reconcile(self.left, self.right, mode='optimal').pairs)
+
+    def test_minimum(self):
+        """Verify a lower minimum score allows partial matches."""
+        result = reconcile([Song("A", "Title")], [Song("A", "Other")], minimum=0.5)
+        self.assertEqual([(0, 0, 0.5)], result.pairs)
+
+    def test_unknown_mode(self):
+        """Verify an unknown mode is rejected."""
+        self.assertRaises(ValueError, reconcile, [], [], mode='best')
+
+
+if __name__ == '__main__':
+    unittest.main()
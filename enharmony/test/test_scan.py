@@ -0,0 +1,244 @@
+"""
+Unit tests for the enharmony.scan module.
+"""
+
+import os
+import struct
+import shutil
+import tempfile
+import unittest
+
+from enharmony import scan
+from enharmony.cli import main
+
+
+def id3_frame(name, text):
+    """Get an ID3v2.3 text frame (UTF-16 with BOM)."""
+    data = b'\x01' + text.encode('utf-16')
+    return name.encode('latin-1') + struct.pack('>I', len(data)) + b'\x00\x00' + data
+
+
+def write_mp3(path, artist, title, album=None, year=None, track=None, seconds=2, tlen=True):
+    """Write an MP3 file of silent 128 kbps frames with an ID3v2.3 tag."""
+    frames = id3_frame('TPE1', artist) + id3_frame('TIT2', title)
+    if album:
+        frames += id3_frame('TALB', album)
+    if year:
+        frames += id3_frame('TYER', str(year))
+    if track:
+        frames += id3_frame('TRCK', "{0}/12".format(track))
+    if tlen:
+        frames += id3_frame('TLEN', str(seconds * 1000))
+    frames += b'\x00' * 16  # padding
+    size = bytes((len(frames) >> shift) & 0x7f for shift in (21, 14, 7, 0))
+    frame = b'\xff\xfb\x90\x64' + b'\x00' * 413  # MPEG-1 Layer III, 128 kbps, 44.1 kHz
+    with open(path, 'wb') as stream:
+        stream.write(b'ID3\x03\x00\x00' + size + frames)
+        stream.write(frame * round(seconds * 44100 / 1152))
+
+
+def write_flac(path, artist, title, album=None, seconds=3):
+    """Write a FLAC file with stream info and Vorbis comments (no audio)."""
+    rate, samples = 44100, seconds * 44100
+    info = struct.pack('>HH', 4096, 4096) + b'\x00' * 6
+    info += ((rate << 44) | (1 << 41) | (15 << 36) | samples).to_bytes(8, 'big') + b'\x00' * 16
+    comments = ["ARTIST=" + artist, "TITLE=" + title, "TRACKNUMBER=4"]
+    if album:
+        comments.append("ALBUM=" + album)
+    vorbis = struct.pack('<I', 6) + b'pyflac' + struct.pack('<I', len(comments))
+    for comment in comments:
+        data = comment.encode('utf-8')
+        vorbis += struct.pack('<I', len(data)) + data
+    with open(path, 'wb') as stream:
+        stream.write(b'fLaC')
+        stream.write(b'\x00' + len(info).to_bytes(3, 'big') + info)
+        stream.write(b'\x84' + len(vorbis).to_bytes(3, 'big') + vorbis)
+
+
+def write_wav(path, artist, title, year=None, seconds=1):
+    """Write a silent 8 kHz mono WAV file with RIFF INFO tags."""
+    info = b'INFO'
+    for key, value in ((b'IART', artist), (b'INAM', title), (b'ICRD', year and str(year))):
+        if value:
+            data = value.encode('utf-8') + b'\x00'
+            data += b'\x00' * (len(data) % 2)
+            info += key + struct.pack('<I', len(data)) + data
+    fmt = struct.pack('<HHIIHH', 1, 1, 8000, 8000, 1, 8)
+    audio = b'\x80' * (8000 * seconds)
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+    body += b'LIST' + struct.pack('<I', len(info)) + info
+    body += b'data' + struct.pack('<I', len(audio)) + audio
+    with open(path, 'wb') as stream:
+        stream.write(b'RIFF' + struct.pack('<I', len(body)) + body)
+
+
+class TestRead(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for reading tags from audio files."""
+
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp)
+
+    def path(self, name):
+        """Get a path in the temporary directory."""
+        return os.path.join(self.temp, name)
+
+    def test_mp3(self):
+        """Verify ID3v2 tags are read from MP3 files."""
+        write_mp3(self.path('a.mp3'), "The Beatles", "Yesterday", "Help!", 1965, 13, seconds=125)
+        self.assertEqual({'artist': "The Beatles", 'title': "Yesterday", 'album': "Help!",
+                          'year': 1965, 'track': 13, 'duration': 125},
+                         scan.read(self.path('a.mp3')))
+
+    def test_mp3_duration_from_frames(self):
+        """Verify an MP3's duration is estimated without a TLEN frame."""
+        write_mp3(self.path('a.mp3'), "Queen", "Innuendo", seconds=4, tlen=False)
+        self.assertEqual(4, scan.read(self.path('a.mp3'))['duration'])
+
+    def test_mp3_id3v1(self):
+        """Verify ID3v1 tags are read from MP3 files."""
+        tag = b'TAG' + b'Help!'.ljust(30, b'\x00') + b'The Beatles'.ljust(30, b'\x00')
+        tag += b'Help!'.ljust(30, b'\x00') + b'1965' + b'\x00' * 29 + b'\x07' + b'\x11'
+        with open(self.path('a.mp3'), 'wb') as stream:
+            stream.write(b'\x00' * 100 + tag)
+        record = scan.read(self.path('a.mp3'))
+        self.assertEqual(("The Beatles", "Help!", 1965, 7),
+                         (record['artist'], record['title'], record['year'], record['track']))
+
+    def test_flac(self):
+        """Verify Vorbis comments are read from FLAC files."""
+        write_flac(self.path('a.flac'), "Björk", "Jóga", "Homogenic", seconds=305)
+        self.assertEqual({'artist': "Björk", 'title': "Jóga", 'album': "Homogenic",
+                          'year': None, 'track': 4, 'duration': 305},
+                         scan.read(self.path('a.flac')))
+
+    def test_wav(self):
+        """Verify RIFF INFO tags are read from WAV files."""
+        write_wav(self.path('a.wav'), "Moby", "Porcelain", 1999, seconds=2)
+        self.assertEqual({'artist': "Moby", 'title': "Porcelain", 'album': None,
+                          'year': 1999, 'track': None, 'duration': 2},
+                         scan.read(self.path('a.wav')))
+
+    def test_unreadable(self):
+        """Verify unreadable files raise a TagError."""
+        with open(self.path('a.flac'), 'wb') as stream:
+            stream.write(b'garbage')
+        self.assertRaises(scan.TagError, scan.read, self.path('a.flac'))
+        self.assertRaises(scan.TagError, scan.read, self.path('a.txt'))
+
+
+class TestScanner(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for scanning directories of audio files."""
+
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp, 'music')
+        os.makedirs(os.path.join(self.root, 'beatles'))
+        write_mp3(os.path.join(self.root, 'beatles', '1.mp3'), "The Beatles", "Yesterday", "Help!")
+        write_flac(os.path.join(self.root, 'beatles', '2.flac'), "The Beatles", "Yesterday", seconds=2)
+        write_wav(os.path.join(self.root, 'porcelain.wav'), "Moby", "Porcelain")
+        with open(os.path.join(self.root, 'notes.txt'), 'w') as stream:
+            stream.write("not audio")
+        self.manifest = os.path.join(self.temp, 'manifest.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp)
+
+    def test_scan(self):
+        """Verify every audio file is read in the thread pool."""
+        scanner = scan.Scanner(self.root, workers=2)
+        found = sorted(scanner, key=lambda record: record['path'])
+        self.assertEqual([os.path.join('beatles', '1.mp3'), os.path.join('beatles', '2.flac'),
+                          'porcelain.wav'], [record['path'] for record in found])
+        self.assertEqual(3, scanner.read)
+
+    def test_manifest_skips_unchanged(self):
+        """Verify unchanged files are not read again."""
+        first = sorted(scan.Scanner(self.root, self.manifest), key=lambda record: record['path'])
+        path = os.path.join(self.root, 'porcelain.wav')
+        write_wav(path, "Moby", "Porcelain (Live)")
+        os.utime(path, ns=(0, 10 ** 9))
+        scanner = scan.Scanner(self.root, self.manifest)
+        second = sorted(scanner, key=lambda record: record['path'])
+        self.assertEqual((1, 2), (scanner.read, scanner.skipped))
+        self.assertEqual(first[:2], second[:2])
+        self.assertEqual("Porcelain (Live)", second[2]['title'])
+
+    def test_manifest_removed_and_failed(self):
+        """Verify deleted files are forgotten and unreadable files are remembered."""
+        with open(os.path.join(self.root, 'broken.flac'), 'wb') as stream:
+            stream.write(b'garbage')
+        scanner = scan.Scanner(self.root, self.manifest)
+        self.assertEqual(3, len(list(scanner)))
+        self.assertEqual(1, scanner.failed)
+        os.remove(os.path.join(self.root, 'porcelain.wav'))
+        scanner = scan.Scanner(self.root, self.manifest)
+        self.assertEqual(2, len(list(scanner)))
+        self.assertEqual((0, 3, 1), (scanner.read, scanner.skipped, scanner.removed))
+
+    def test_index(self):
+        """Verify scanned songs stream into a duplicate index."""
+        index = scan.Scanner(self.root).index()
+        self.assertEqual(3, len(index))
+        self.assertEqual([{os.path.join('beatles', '1.mp3'), os.path.join('beatles', '2.flac')}],
+                         [set(members) for members in index.clusters.values()])
+
+    def test_index_unchanged(self):
+        """Verify a rescan only updates the indexed songs of changed files."""
+        index = scan.Scanner(self.root, self.manifest).index()
+        list(index.stream())
+        scan.Scanner(self.root, self.manifest).index(index)
+        self.assertEqual([], list(index.stream()))
+        path = os.path.join(self.root, 'beatles', '2.flac')
+        write_flac(path, "The Beatles", "Help!", seconds=2)
+        os.utime(path, ns=(0, 10 ** 9))
+        scan.Scanner(self.root, self.manifest).index(index)
+        self.assertEqual(['dissolve'], [event.kind for event in index.stream()])
+
+    def test_index_removed(self):
+        """Verify songs of deleted and unreadable files leave the index."""
+        index = scan.Scanner(self.root, self.manifest).index()
+        os.remove(os.path.join(self.root, 'porcelain.wav'))
+        path = os.path.join(self.root, 'beatles', '2.flac')
+        with open(path, 'wb') as stream:
+            stream.write(b'garbage')
+        os.utime(path, ns=(0, 10 ** 9))
+        scanner = scan.Scanner(self.root, self.manifest)
+        scanner.index(index)
+        self.assertEqual({'porcelain.wav', os.path.join('beatles', '2.flac')}, scanner.dropped)
+        self.assertEqual(1, len(index))
+        self.assertIn(os.path.join('beatles', '1.mp3'), index)
+
+    def test_bad_numbers(self):
+        """Verify digits int() cannot parse are ignored instead of aborting."""
+        record = scan._clean({'artist': "A", 'title': "T", 'year': "²", 'track': "1²"})  # pylint: disable=W0212
+        self.assertEqual((None, None), (record['year'], record['track']))
+
+    def test_missing(self):
+        """Verify files removed after they are listed do not abort a scan."""
+        class Vanishing(scan.Scanner):
+            """Scanner listing a file that no longer exists."""
+            def paths(self):
+                yield 'gone.mp3'
+                for name in super(Vanishing, self).paths():
+                    yield name
+        scanner = Vanishing(self.root, self.manifest)
+        self.assertEqual(3, len(list(scanner)))
+        self.assertIsNone(scanner._finish(scanner._read('gone.mp3')))  # pylint: disable=W0212
+        self.assertEqual(1, scanner.failed)
+        self.assertNotIn('gone.mp3', scanner.manifest.files)
+
+    def test_cli(self):
+        """Verify the scan command writes song records."""
+        output = os.path.join(self.temp, 'songs.jsonl')
+        self.assertEqual(0, main(['scan', self.root, '--output', output, '--manifest', self.manifest]))
+        with open(output) as stream:
+            self.assertEqual(3, len(stream.readlines()))
+        self.assertTrue(os.path.exists(self.manifest))
+        self.assertEqual(1, main(['scan', os.path.join(self.temp, 'missing')]))
+
+
+if __name__ == '__main__':
+    unittest.main()
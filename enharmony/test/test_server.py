@@ -0,0 +1,167 @@
+"""
+Unit tests for the enharmony.server module.
+"""
+
+import json
+import asyncio
+import unittest
+import urllib.error
+import urllib.request
+
+from enharmony import config, records
+from enharmony.server import Server, Histogram, match_batch, dedupe_batch
+
+from enharmony.test.test_external import RECORDS
+
+
+def request(port, path, data=None):
+    """Send a request to a local server and get the status and JSON reply."""
+    body = None if data is None else json.dumps(data).encode('utf-8')
+    url = "http://127.0.0.1:{0}{1}".format(port, path)
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=body)) as response:
+            return response.status, json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read().decode('utf-8'))
+
+
+class TestHistogram(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the Histogram class."""
+
+    def test_observe(self):
+        """Verify latencies are counted in cumulative buckets."""
+        histogram = Histogram(buckets=(0.1, 1.0, float('inf')))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        self.assertEqual({'buckets': {'0.1': 1, '1.0': 2, '+Inf': 2}, 'count': 2, 'sum': 0.55},
+                         histogram.asdict())
+
+
+class TestBatches(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the functions run on batches in workers."""
+
+    def test_errors(self):
+        """Verify an invalid item only fails its own result."""
+        library = [records.song(RECORDS[0])]
+        results = match_batch([(1, [0], {}), (RECORDS[0], [0], {})], library=library)
+        self.assertIsInstance(results[0], AttributeError)
+        self.assertEqual([(0, 1.0, True)], results[1])
+        results = dedupe_batch([[1], RECORDS[:3]])
+        self.assertIsInstance(results[0], AttributeError)
+        self.assertEqual([[0, 2]], results[1])
+
+
+class TestServer(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the Server class using a local client."""
+
+    def run_server(self, *paths, **kwargs):
+        """Start a server with the test records and send concurrent requests.
+
+        The reply to GET /metrics is appended after the concurrent requests.
+        """
+        async def run():
+            server = Server(**kwargs)
+            for record in RECORDS:
+                server.add(record)
+            port = await server.start()
+            loop = asyncio.get_running_loop()
+            try:
+                replies = await asyncio.gather(*[loop.run_in_executor(None, request, port, *path)
+                                                 for path in paths])
+                metrics = await loop.run_in_executor(None, request, port, '/metrics')
+                return replies + [metrics]
+            finally:
+                await server.close()
+        return asyncio.run(run())
+
+    def test_match(self):
+        """Verify concurrent match requests are answered from one batch."""
+        query = ('/match', {'song': {'artist': "Artist A", 'title': "Song 1"}, 'limit': 3})
+        replies = self.run_server(query, query, query, delay=0.2)
+        status, reply = replies[0]
+        self.assertEqual(200, status)
+        self.assertEqual([0, 2, 6], [match['id'] for match in reply['matches']])
+        self.assertTrue(all(match['duplicate'] for match in reply['matches']))
+        self.assertEqual(RECORDS[0], reply['matches'][0]['record'])
+        metrics = replies[-1][1]
+        self.assertEqual(1, metrics['batches']['match']['count'])
+        self.assertEqual(3, metrics['latency']['/match']['count'])
+
+    def test_dedupe(self):
+        """Verify a list of songs can be deduplicated in worker processes."""
+        replies = self.run_server(('/dedupe', {'songs': RECORDS}), ('/songs', {'songs': RECORDS[:1]}),
+                                  workers=2)
+        self.assertEqual((200, {'clusters': [[0, 2, 6], [1, 4]]}), replies[0])
+        self.assertEqual((200, {'ids': [7]}), replies[1])
+
+    def test_match_workers(self):
+        """Verify worker processes match against their loaded songs and new ones."""
+        async def run():
+            server = Server(workers=2)
+            for record in RECORDS:
+                server.add(record)
+            port = await server.start()
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, request, port, '/songs', {'songs': RECORDS[:1]})
+                return await loop.run_in_executor(None, request, port, '/match',
+                                                  {'song': {'artist': "Artist A", 'title': "Song 1"}})
+            finally:
+                await server.close()
+        status, reply = asyncio.run(run())
+        self.assertEqual(200, status)
+        self.assertEqual([0, 2, 6, 7], [match['id'] for match in reply['matches'] if match['duplicate']])
+
+    def test_suggest(self):
+        """Verify songs are suggested by the artist and title typed so far."""
+        replies = self.run_server(('/suggest', {'artist': "artist a", 'title': "song 1", 'limit': 2}),
+                                  ('/suggest', {'artist': "artist"}))
+        status, reply = replies[0]
+        self.assertEqual(200, status)
+        self.assertEqual([0, 2], [match['id'] for match in reply['matches']])
+        self.assertEqual(RECORDS[0], reply['matches'][0]['record'])
+        self.assertEqual(7, len(replies[1][1]['matches']))
+
+    def test_errors(self):
+        """Verify invalid requests get error replies."""
+        replies = self.run_server(('/unknown',), ('/match',), ('/match', {}), ('/metrics', {}),
+                                  ('/match', []), ('/songs', "x"))
+        self.assertEqual([404, 405, 400, 405, 400, 400, 200], [status for status, _ in replies])
+        self.assertEqual("request body must be a JSON object", replies[4][1]['error'])
+
+    def test_invalid_records(self):
+        """Verify invalid records get error replies without failing their batch."""
+        replies = self.run_server(('/dedupe', {'songs': [1]}), ('/dedupe', {'songs': RECORDS}),
+                                  ('/match', {'song': 1}), ('/songs', {'songs': [RECORDS[0], 1]}),
+                                  delay=0.2)
+        self.assertEqual([400, 200, 400, 400], [status for status, _ in replies[:-1]])
+        self.assertEqual("song records must be JSON objects", replies[0][1]['error'])
+        self.assertEqual({'clusters': [[0, 2, 6], [1, 4]]}, replies[1][1])
+
+    def test_settings(self):
+        """Verify worker processes use settings changed after they started."""
+        previous = config.current()
+        library = [{'artist': "Artist", 'title': "Song (Demo)"},
+                   {'artist': "Artist", 'title': "Song [Demo]"}]
+
+        async def run():
+            server = Server(workers=2)
+            port = await server.start()
+            loop = asyncio.get_running_loop()
+            try:
+                before = await loop.run_in_executor(None, request, port, '/dedupe', {'songs': library})
+                config.update(VARIANTS=('Demo',))
+                after = await loop.run_in_executor(None, request, port, '/dedupe', {'songs': library})
+                return before, after
+            finally:
+                await server.close()
+        try:
+            before, after = asyncio.run(run())
+        finally:
+            config.use(previous)
+        self.assertEqual((200, {'clusters': []}), before)
+        self.assertEqual((200, {'clusters': [[0, 1]]}), after)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Unit tests for the enharmony.shard module.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from enharmony import records, shard, synthetic
+from enharmony.cli import main
+from enharmony.dedupe import dedupe
+
+from enharmony.test.test_external import RECORDS
+
+
+class TestShard(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for partitioned dedupe."""
+
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp)
+
+    def sharded(self, library, shards, strategy='artist'):
+        """Get the clusters of a library deduped in shards."""
+        directory = os.path.join(self.temp, str(shards))
+        shard.partition(library, directory, shards, strategy)
+        manifest = shard.load(directory)
+        for item in manifest['files']:
+            shard.dedupe_shard(os.path.join(directory, item['name']))
+        return shard.merge(directory)
+
+    def test_manifest(self):
+        """Verify the manifest describes every shard."""
+        manifest = shard.partition(RECORDS, self.temp, 3)
+        self.assertEqual(7, manifest['records'])
+        self.assertEqual(7, sum(item['records'] for item in manifest['files']))
+        self.assertEqual(manifest, shard.load(self.temp))
+        self.assertEqual(['shard-0000.jsonl', 'shard-0001.jsonl', 'shard-0002.jsonl'],
+                         [item['name'] for item in manifest['files']])
+
+    def test_same_as_single_machine(self):
+        """Verify the clusters do not depend on the number of shards."""
+        library = synthetic.generate(120, seed=4)
+        for strategy in ('artist', 'credits'):
+            expected = dedupe((records.song(record) for record in library), strategy=strategy)
+            self.assertTrue(expected)
+            for shards in (1, 5):
+                self.assertEqual(expected, self.sharded(library, shards, strategy))
+
+    def test_keys_in_several_shards(self):
+        """Verify songs with keys owned by several shards are linked globally."""
+        library = [{'artist': "A", 'title': "Song (feat. B)"},
+                   {'artist': "B", 'title': "Other"},
+                   {'artist': "A & B", 'title': "Song"},
+                   {'artist': "B", 'title': "Other"}]
+        shards = next(count for count in range(2, 20)
+                      if shard.owner('a', count) != shard.owner('b', count))
+        self.assertEqual([[1, 3]], self.sharded(library, shards, 'credits'))
+        self.assertEqual(dedupe((records.song(record) for record in library), strategy='credits'),
+                         self.sharded(library, shards, 'credits'))
+
+    def test_not_run(self):
+        """Verify merging fails until every shard has run."""
+        shard.partition(RECORDS, self.temp, 2)
+        self.assertRaises(ValueError, shard.merge, self.temp)
+
+    def test_run(self):
+        """Verify shards can run in separate processes."""
+        shard.partition(RECORDS, self.temp, 2)
+        shard.run(self.temp, workers=2)
+        self.assertEqual([[0, 2, 6], [1, 4]], shard.merge(self.temp))
+
+    def test_cli(self):
+        """Verify the partition, shard and merge commands."""
+        path = os.path.join(self.temp, 'songs.jsonl')
+        output = os.path.join(self.temp, 'clusters.jsonl')
+        directory = os.path.join(self.temp, 'shards')
+        with open(path, 'w') as stream:
+            for record in RECORDS:
+                records.write(stream, record)
+        self.assertEqual(0, main(['partition', path, directory, '-n', '2']))
+        self.assertEqual(1, main(['merge', directory, '-o', output]))
+        self.assertEqual(0, main(['shard', os.path.join(directory, 'shard-0000.jsonl'),
+                                  os.path.join(directory, 'shard-0001.jsonl')]))
+        self.assertEqual(0, main(['merge', directory, '-o', output]))
+        with open(output) as stream:
+            clusters = [json.loads(line)['songs'] for line in stream]
+        self.assertEqual([[RECORDS[0], RECORDS[2], RECORDS[6]], [RECORDS[1], RECORDS[4]]], clusters)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ Unit tests for the enharmony.song module.
 import unittest
 
 from enharmony.song import Song, Artist, Title, Album
+from enharmony import blocking
 
 
 @unittest.skip("not implemented")
@@ -60,5 +61,63 @@ class TestInequality(unittest.TestCase):  # pylint: disable=R0904
         self.assertNotEqual(Song("Artist", "Title"), Song("Artist", "Title (live)"))
 
 
+class TestLazy(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for lazily parsing song attributes."""
+
+    def test_keys(self):
+        """Verify blocking keys do not parse the artist or album."""
+        song = Song(" The Beatles ", "Help! [Live]", "Help!", 1965)
+        self.assertEqual(('beatles',), blocking.keys(song, 'artist'))
+        self.assertEqual(('BTLS',), blocking.keys(song, 'phonetic'))
+        self.assertEqual(('help!',), blocking.keys(song, 'title'))
+        self.assertEqual(['title'], list(song._parsed))  # pylint: disable=W0212
+
+    def test_parsed_once(self):
+        """Verify attributes are parsed on first access and then reused."""
+        song = Song("Artist", "Title")
+        self.assertIs(song.title, song.title)
+        self.assertEqual(Artist("Artist").name, song.artist.name)
+
+    def test_repr(self):
+        """Verify the representation includes every parsed attribute."""
+        song = Song("Artist", "Title", "Album [EP]", 2000, 7, 123)
+        self.assertEqual("Song('Artist', 'Title', album='Album [EP]', duration=123, track=7, year=2000)",
+                         repr(song))
+
+    def test_comparison(self):
+        """Verify lazily parsed songs compare on their parsed attributes."""
+        self.assertTrue(Song("Artist", "Title").similarity(Song("Artist", "Title", "Album")))
+        self.assertFalse(Song("Artist", "Title").similarity(Song("Artist", "Title (Live)")))
+
+
+class TestFromRecords(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for creating songs in bulk."""
+
+    rows = [{'artist': "Artist", 'title': "Song (feat. Other) [Live]", 'album': "Album [EP]", 'year': 2000},
+            {'artist': "Other", 'title': "Song (feat. Other) [Live]", 'album': "Album [EP]", 'year': 2000},
+            {'artist': "Artist", 'title': "Another", 'album': "Album [EP]", 'year': 2001, 'track': "3"},
+            {'artist': "Artist", 'title': None}]
+
+    def test_equivalent(self):
+        """Verify bulk songs match songs created one at a time."""
+        expected = [repr(Song(**row)) for row in self.rows]
+        self.assertEqual(expected, [repr(song) for song in Song.from_records(self.rows)])
+
+    def test_shared(self):
+        """Verify identical strings are parsed once and shared."""
+        songs = Song.from_records(self.rows)
+        self.assertIs(songs[0].title, songs[1].title)
+        self.assertIs(songs[0].album, songs[1].album)
+        self.assertIsNot(songs[0].album, songs[2].album)
+
+    def test_workers(self):
+        """Verify distinct strings can be parsed in worker processes."""
+        songs = Song.from_records(self.rows, workers=2, chunksize=1)
+        self.assertEqual([repr(Song(**row)) for row in self.rows], [repr(song) for song in songs])
+        self.assertTrue(songs[0].similarity(Song(**self.rows[0])))
+        self.assertIs(Song(**self.rows[0]).album.year, songs[0].album.year)
+        self.assertIs(Song(**self.rows[0]).album.name.kind, songs[0].album.name.kind)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,86 @@
+"""
+Unit tests for the enharmony.store module.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from enharmony import records
+from enharmony.song import Song
+from enharmony.dedupe import dedupe
+from enharmony.store import Store
+
+from enharmony.test.test_external import RECORDS
+
+
+class TestStore(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the Store class."""
+
+    def setUp(self):
+        self.store = Store()
+        self.ids = self.store.add(RECORDS, batch=3)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_add(self):
+        """Verify records are inserted with sequential IDs."""
+        self.assertEqual(list(range(1, len(RECORDS) + 1)), self.ids)
+        self.assertEqual(len(RECORDS), len(self.store))
+        self.assertEqual([8], self.store.add([{'artist': "X", 'title': "Y"}]))
+
+    def test_record(self):
+        """Verify raw records are stored."""
+        self.assertEqual(RECORDS[2], self.store.record(3))
+        self.assertRaises(KeyError, self.store.record, 99)
+
+    def test_parts(self):
+        """Verify parsed and normalized parts are stored."""
+        self.store.add([{'artist': "The Artist", 'title': "Song (Reprise) [Live] (feat. A & B)",
+                         'album': "Album [EP]", 'year': 2001}])
+        self.assertEqual({'name': "Song", 'alternate': "Reprise", 'variant': "Live",
+                          'featuring': "A, B", 'album_name': "Album", 'album_kind': "EP",
+                          'artist_key': "artist", 'title_key': "song"}, self.store.parts(8))
+
+    def test_candidates(self):
+        """Verify candidates are selected by blocking key."""
+        found = self.store.candidates(Song("artist b", "Anything"))
+        self.assertEqual([2, 5], [song_id for song_id, _ in found])
+        found = self.store.candidates(Song("Nobody", "Song 3 (feat. Artist C)"), 'credits')
+        self.assertEqual([6], [song_id for song_id, _ in found])
+
+    def test_remove(self):
+        """Verify removed songs are not candidates."""
+        self.store.remove(2)
+        found = self.store.candidates(Song("Artist B", "Song 2"))
+        self.assertEqual([5], [song_id for song_id, _ in found])
+
+    def test_cluster(self):
+        """Verify clusters match the in-memory pipeline."""
+        expected = [[index + 1 for index in group] for group in dedupe(map(records.song, RECORDS))]
+        self.assertEqual(expected, self.store.cluster())
+
+
+class TestPersistence(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for reopening a database file."""
+
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp)
+
+    def test_reopen(self):
+        """Verify songs survive closing the database."""
+        path = os.path.join(self.temp, 'songs.sqlite')
+        with Store(path) as store:
+            store.add(RECORDS)
+        with Store(path) as store:
+            self.assertEqual(len(RECORDS), len(store))
+            self.assertEqual([[2, 5]], store.cluster('title')[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
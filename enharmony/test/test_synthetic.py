@@ -0,0 +1,48 @@
+"""
+Unit tests for the enharmony.synthetic module.
+"""
+
+import random
+import unittest
+
+from enharmony import records
+from enharmony.synthetic import generate, perturb
+
+
+class TestGenerate(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the generate function."""
+
+    def test_seeded(self):
+        """Verify the same seed generates the same library."""
+        self.assertEqual(generate(50, seed=1), generate(50, seed=1))
+        self.assertNotEqual(generate(50, seed=1), generate(50, seed=2))
+
+    def test_duplicates(self):
+        """Verify a ratio of records are copies of earlier clusters."""
+        library = generate(200, duplicates=0.5, variants=0.0)
+        clusters = {record['cluster'] for record in library}
+        self.assertEqual(200, len(library))
+        self.assertTrue(60 < 200 - len(clusters) < 140)
+
+    def test_records(self):
+        """Verify generated records can be parsed into songs."""
+        for record in generate(20):
+            self.assertEqual(record['artist'], str(records.song(record).artist))
+
+
+class TestPerturb(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the perturb function."""
+
+    def test_changed(self):
+        """Verify a perturbed record differs from the original."""
+        rng = random.Random(0)
+        record = {'artist': "The Artist & Band", 'title': "Song Title", 'album': "Album",
+                  'year': 2000, 'cluster': 0}
+        for _ in range(20):
+            copy = perturb(rng, record)
+            self.assertEqual(0, copy['cluster'])
+            self.assertNotEqual(record, copy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Unit tests for the enharmony.tools module.
+"""
+
+import io
+import os
+import re
+import unittest
+import contextlib
+
+from enharmony import match, Song
+
+README = os.path.join(os.path.dirname(__file__), '..', '..', 'README.md')
+
+
+class Counted(Song):
+
+    """Song that counts how many times it is compared."""
+
+    count = 0
+
+    def similarity(self, other):
+        Counted.count += 1
+        return super(Counted, self).similarity(other)
+
+
+class TestMatch(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the match function."""
+
+    def setUp(self):
+        Counted.count = 0
+        self.base = Counted("Artist", "Song")
+        self.items = [Counted("Artist", "Other"),
+                      Counted("Artist", "Song", "Album 1"),
+                      Counted("Other", "Song"),
+                      Counted("Artist", "Song", "Album 2")]
+
+    def test_as_found(self):
+        """Verify matching items are yielded in input order."""
+        self.assertEqual([self.items[1], self.items[3]], list(match(self.base, self.items)))
+
+    def test_stop_early(self):
+        """Verify items after the first result read are not scored."""
+        results = match(self.base, iter(self.items))
+        self.assertIs(self.items[1], next(results))
+        self.assertEqual(2, Counted.count)
+
+    def test_ordered(self):
+        """Verify items are yielded from most to least similar."""
+        results = list(match(self.base, self.items, ordered=True, minimum=0.5))
+        self.assertEqual([self.items[1], self.items[3], self.items[0], self.items[2]], results)
+
+    def test_lazy(self):
+        """Verify a generator is returned before any scoring."""
+        results = match(self.base, self.items, ordered=True)
+        self.assertEqual(0, Counted.count)
+        self.assertIs(self.items[1], next(results))
+        self.assertEqual(4, Counted.count)
+
+    def test_ordered_minimum(self):
+        """Verify partial matches are included after full matches."""
+        items = [Song("The Beatles", "Rocky Raccoon"), Song("The Beatles", "Rock and Roll Music")]
+        results = list(match(Song("The Beatles", "Rock and Roll Music"), items, ordered=True, minimum=0.5))
+        self.assertEqual([items[1], items[0]], results)
+
+
+@unittest.skipUnless(os.path.exists(README), "README is not installed")
+class TestReadme(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for the sample script in the README."""
+
+    def test_example(self):
+        """Verify the sample script prints the documented output."""
+        with open(README) as stream:
+            text = stream.read()
+        script = re.search(r"```python\n(.*?)```", text, re.DOTALL).group(1)
+        expected = re.search(r"this prints:\n\n```\n(.*?)```", text, re.DOTALL).group(1)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            exec(script, {})  # pylint: disable=W0122
+        self.assertEqual(expected, output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
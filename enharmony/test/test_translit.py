@@ -0,0 +1,100 @@
+"""
+Unit tests for the enharmony.translit module.
+"""
+
+import unittest
+
+from enharmony import translit, config
+from enharmony.song import Song
+from enharmony.dedupe import dedupe
+
+
+class TestTransliterate(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for transliterating other scripts."""
+
+    def test_cyrillic(self):
+        """Verify Cyrillic is transliterated."""
+        self.assertEqual("zemfira", translit.transliterate("Земфира"))
+        self.assertEqual("mumiy troll", translit.transliterate("Мумий Тролль"))
+        self.assertEqual("shchedrin", translit.transliterate("Щедрин"))
+
+    def test_kana(self):
+        """Verify hiragana and katakana are transliterated."""
+        self.assertEqual("sakura", translit.transliterate("さくら"))
+        self.assertEqual("supittsu", translit.transliterate("スピッツ"))
+        self.assertEqual("kyaripamyupamyu", translit.transliterate("きゃりーぱみゅぱみゅ"))
+        self.assertEqual("fanki monki", translit.transliterate("ファンキー・モンキー"))
+        self.assertEqual("chatto", translit.transliterate("チャット"))
+
+    def test_width(self):
+        """Verify full-width letters are normalized."""
+        self.assertEqual("yoasobi", translit.transliterate("ＹＯＡＳＯＢＩ"))
+
+    def test_other_scripts(self):
+        """Verify characters without a table are kept (or given to unidecode)."""
+        if translit.unidecode is None:
+            self.assertEqual("東京事変", translit.transliterate("東京事変"))
+
+    def test_fold(self):
+        """Verify accents and special letters are folded."""
+        self.assertEqual("bjork", translit.fold("Björk"))
+        self.assertEqual("sigur ros", translit.fold("Sigur Rós"))
+        self.assertEqual("strasse", translit.fold("Straße"))
+        self.assertEqual("mgla", translit.fold("Mgła"))
+
+
+class TestKey(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Latin keys."""
+
+    def test_normalized(self):
+        """Verify keys are normalized like other keys."""
+        self.assertEqual("kino", translit.key("The Кино"))
+        self.assertEqual("", translit.key(None))
+
+    def test_cached(self):
+        """Verify each distinct name is transliterated once."""
+        translit.key("Аквариум")
+        hits = translit._key.cache_info().hits  # pylint: disable=W0212
+        translit.key("Аквариум")
+        self.assertEqual(hits + 1, translit._key.cache_info().hits)  # pylint: disable=W0212
+
+    def test_song_key(self):
+        """Verify songs get a Latin key without parsing the artist."""
+        song = Song("Кино", "Звезда")
+        self.assertEqual("kino", song.latin_key)
+        self.assertNotIn('artist', song._parsed)  # pylint: disable=W0212
+
+
+class TestComparison(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for comparing names by Latin keys."""
+
+    def setUp(self):
+        self.songs = [Song("Кино", "Группа крови"), Song("Kino", "Gruppa Krovi"),
+                      Song("Kino", "Zvezda")]
+        self.previous = config.current()
+
+    def tearDown(self):
+        config.use(self.previous)
+
+    def test_disabled(self):
+        """Verify scripts are different by default."""
+        self.assertFalse(self.songs[0].similarity(self.songs[1]))
+        self.assertEqual([], dedupe(self.songs, strategy='latin'))
+
+    def test_enabled(self):
+        """Verify names in different scripts are equal when enabled."""
+        config.update(TRANSLITERATE=True)
+        self.assertEqual(self.songs[0].artist, self.songs[1].artist)
+        self.assertEqual(self.songs[0].title, self.songs[1].title)
+        self.assertTrue(self.songs[0].similarity(self.songs[1]))
+        self.assertFalse(self.songs[0].similarity(self.songs[2]))
+        self.assertEqual([[0, 1]], dedupe(self.songs, strategy='latin'))
+
+    def test_variants_still_differ(self):
+        """Verify title variants are still compared when enabled."""
+        config.update(TRANSLITERATE=True)
+        self.assertNotEqual(Song("A", "Звезда (Live)").title, Song("A", "Zvezda").title)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,10 +3,13 @@
 import re
 import logging
 
-import enharmony.settings as settings
+from enharmony import config
 
 from comparable import CompoundComparable
 
+from enharmony.base import TextList, parse_string, normalize
+from enharmony import distance, translit, metrics
+
 RE_FEATURING = r"""
 \(                            # opening parenthesis
 (?:feat)(?:(?:\.)|(?:uring))  # "feat." or "featuring"
@@ -30,14 +33,21 @@ RE_ALTERNATE = r"""
 """.strip()
 
 
+def _variants(current):
+    """Compile a pattern for each bracketed song variant."""
+    return [(variant, re.compile(RE_VARIANT.replace('<variant>', variant), re.IGNORECASE | re.VERBOSE))
+            for variant in current.VARIANTS]
+
+
 class Title(CompoundComparable):
 
     """Stores a song's title and provides comparison algorithms."""
 
     attributes = {'name': 0.5,
-                  'alternative': 0.25,
+                  'alternate': 0.25,
                   'variant': 0.25}
 
+    @metrics.timed('title.parse')
     def __init__(self, name, alternate=None, variant=None, featuring=None):
         """Initialize a new title.
 
@@ -49,7 +59,8 @@ class Title(CompoundComparable):
         self.name, self.alternate, self.variant, self.featuring = self._parse_title(name)
         self.alternate = self.alternate or alternate
         self.variant = self.variant or variant
-        self.featuring = self.featuring or featuring
+        if not self.featuring and featuring:
+            self.featuring = TextList(featuring)
 
     def __str__(self):
         """Format the song title as a string."""
@@ -64,7 +75,8 @@ class Title(CompoundComparable):
 
     def __repr__(self):
         """Represent the title object."""
-        return self._get_repr([self.name, self.alternate, self.variant, self.featuring])
+        featuring = str(self.featuring) if self.featuring else None
+        return self._repr(self.name, alternate=self.alternate, variant=self.variant, featuring=featuring)
 
     def _parse_title(self, value):
         """Attempt to split the value into a title's parts.
@@ -72,7 +84,7 @@ class Title(CompoundComparable):
         @param value: value to convert
         @return: name, alternate, variant, featuring
         """
-        text = self._parse_string(value, "song title")
+        text = parse_string(value, "song title")
         if not text:
             return None, None, None, None
         else:
@@ -87,44 +99,78 @@ class Title(CompoundComparable):
         """
         alternate = variant = featuring = None
         # Strip featured artists
-        logging.debug("searching for featured artists in: {0}".format(text))
+        logging.debug("searching for featured artists in: %s", text)
         match = re.search(RE_FEATURING, text, re.IGNORECASE | re.VERBOSE)
         if match:
-            featuring = match.group(1)
-            logging.debug("match found: {0}".format(featuring))
+            featuring = TextList(match.group(1))
+            logging.debug("match found: %s", featuring)
             text = text.replace(match.group(0), '').strip()  # remove the match from the remaining text
         # Strip song variants
-        for variant in settings.VARIANTS:
-            re_variant = RE_VARIANT.replace('<variant>', variant)
-            logging.debug("searching for '{0}' variant in: {1}".format(variant, text))
-            match = re.search(re_variant, text, re.IGNORECASE | re.VERBOSE)
+        for variant, pattern in config.current().compiled('variants', ('VARIANTS',), _variants):
+            logging.debug("searching for '%s' variant in: %s", variant, text)
+            match = pattern.search(text)
             if match:
-                logging.debug("match found: {0}".format(variant))
+                logging.debug("match found: %s", variant)
                 text = text.replace(match.group(0), '').strip()  # remove the match from the remaining text
                 break
         else:
             variant = None
         # Strip alternate song title
-        logging.debug("searching for alternate title: {0}".format(text))
+        logging.debug("searching for alternate title: %s", text)
         match = re.match(RE_ALTERNATE, text, re.IGNORECASE | re.VERBOSE)
         if match:
             alternate = match.group(1)
-            logging.debug("match found: {0}".format(alternate))
+            logging.debug("match found: %s", alternate)
             text = text.replace(alternate, '').strip("() ")
         # Return parts
         return text, alternate, variant, featuring
 
+    def equality(self, other):
+        """Determine if two titles are equal (by Latin keys when enabled)."""
+        if translit.enabled() and type(self) == type(other):
+            if self.variant != other.variant:
+                return False
+            return all(self._latin_equal(text1, text2) for text1, text2 in
+                       ((self.name, other.name), (self.alternate, other.alternate)))
+        return super(Title, self).equality(other)
+
+    @staticmethod
+    def _latin_equal(text1, text2):
+        """Determine if two title parts share a Latin key (None is preserved)."""
+        if text1 is None or text2 is None:
+            return text1 == text2
+        return translit.key(text1) == translit.key(text2)
+
+    @metrics.timed('title.similarity')
     def similarity(self, other):
         """Calculate percent similarity between two song titles."""
         # Compare types
         if type(self) != type(other):
-            return 0.0
+            return self.Similarity(0.0)
         # Compare attributes
         value = 0.0
-        if self._strip_text(self.name) == self._strip_text(other.name):
-            value += 0.5
-        if self._strip_text(self.alternate) == self._strip_text(other.alternate):
-            value += 0.25
+        value += 0.5 * self._compare_text(self.name, other.name)
+        value += 0.25 * self._compare_text(self.alternate, other.alternate)
         if self.variant == other.variant:
             value += 0.25
-        return value
+        return self.Similarity(value)
+
+    @classmethod
+    def _compare_text(cls, text1, text2):
+        """Get the similarity of two title parts (0.0 to 1.0)."""
+        text1, text2 = cls._strip_text(text1), cls._strip_text(text2)
+        if text1 == text2:
+            return 1.0
+        if text1 is not None and text2 is not None and translit.enabled():
+            if translit.key(text1) == translit.key(text2):
+                return 1.0
+        if text1 is None or text2 is None or not distance.enabled():
+            return 0.0
+        return distance.ratio(text1, text2, config.current().TEXT_SIMILARITY_MINIMUM)
+
+    @staticmethod
+    def _strip_text(text):
+        """Get normalized text for comparison (None is preserved)."""
+        if text is None:
+            return None
+        return normalize(text)
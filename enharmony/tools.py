@@ -0,0 +1,35 @@
+"""Functions to locate matching songs."""
+
+import heapq
+
+
+def _scored(base, items, minimum):
+    """Get an iterator of (similarity, item) for items that match a base."""
+    for item in items:
+        similarity = base.similarity(item)
+        if (float(similarity) >= minimum) if minimum is not None else bool(similarity):
+            yield similarity, item
+
+
+def match(base, items, ordered=False, minimum=None):
+    """Get a generator of the items that match a base item.
+
+    Items are only scored as the generator is consumed, so callers that
+    stop early avoid scoring the rest. With ordering, every item is
+    scored but only the results that are read are sorted.
+
+    @param base: item to compare against (e.g. a Song)
+    @param items: iterable of items to compare
+    @param ordered: yield the most similar items first (ties keep input order)
+    @param minimum: (optional) lowest score to match (default: similarity threshold)
+    @return: generator of matching items
+    """
+    if not ordered:
+        for _, item in _scored(base, items, minimum):
+            yield item
+        return
+    heap = [(-float(similarity), index, item)
+            for index, (similarity, item) in enumerate(_scored(base, items, minimum))]
+    heapq.heapify(heap)  # linear time, each result read costs O(log n)
+    while heap:
+        yield heapq.heappop(heap)[2]
@@ -0,0 +1,141 @@
+"""Transliteration of names in other scripts to a folded Latin key.
+
+Cyrillic and Japanese kana are mapped with built-in tables. Other
+characters are transliterated with unidecode when installed and kept
+otherwise, so identical names in any script still share a key.
+"""
+
+import unicodedata
+from functools import lru_cache
+
+try:
+    from unidecode import unidecode
+except ImportError:  # pragma: no cover (manual test)
+    unidecode = None
+
+from enharmony import config, metrics
+from enharmony.base import normalize
+
+CACHE_SIZE = 65536
+FIELDS = ('ARTICLES', 'JOINERS')  # settings used to normalize names
+
+CYRILLIC = dict(zip(
+    "абвгдеёжзийклмнопрстуфхцчшщъыьэюяіїєґўђјљњћџ",
+    ['a', 'b', 'v', 'g', 'd', 'e', 'e', 'zh', 'z', 'i', 'y', 'k', 'l', 'm', 'n', 'o', 'p', 'r', 's',
+     't', 'u', 'f', 'kh', 'ts', 'ch', 'sh', 'shch', '', 'y', '', 'e', 'yu', 'ya', 'i', 'yi', 'ye', 'g',
+     'u', 'dj', 'j', 'lj', 'nj', 'c', 'dz']))
+
+KANA = dict(zip(
+    "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわゐゑをん"
+    "がぎぐげござじずぜぞだぢづでどばびぶべぼぱぴぷぺぽゔ",
+    "a i u e o ka ki ku ke ko sa shi su se so ta chi tsu te to na ni nu ne no ha hi fu he ho "
+    "ma mi mu me mo ya yu yo ra ri ru re ro wa i e o n "
+    "ga gi gu ge go za ji zu ze zo da ji zu de do ba bi bu be bo pa pi pu pe po vu".split()))
+SMALL_Y = {'ゃ': 'a', 'ゅ': 'u', 'ょ': 'o'}
+SMALL_VOWELS = {'ぁ': 'a', 'ぃ': 'i', 'ぅ': 'u', 'ぇ': 'e', 'ぉ': 'o'}
+SMALL_TSU = 'っ'
+LONG = 'ー'
+
+LETTERS = {'ß': 'ss', 'æ': 'ae', 'œ': 'oe', 'ø': 'o', 'ł': 'l', 'đ': 'd', 'ð': 'd', 'þ': 'th',
+           'ı': 'i'}
+
+
+def _hiragana(char):
+    """Get the hiragana for a katakana character (others are unchanged)."""
+    if 'ァ' <= char <= 'ヶ':
+        return chr(ord(char) - 0x60)
+    return char
+
+
+def _kana(chars, index):
+    """Get the romaji of the kana at an index and the number of characters used."""
+    char = chars[index]
+    following = chars[index + 1] if index + 1 < len(chars) else ''
+    if char == SMALL_TSU:  # doubles the next consonant
+        romaji, used = _kana(chars, index + 1) if following else ('', 0)
+        if romaji[:2] == 'ch':
+            return 't' + romaji, used + 1
+        return (romaji[:1] if romaji[:1] not in 'aeiou' else '') + romaji, used + 1
+    romaji = KANA.get(char)
+    if romaji is None:
+        return SMALL_Y.get(char) or SMALL_VOWELS.get(char, char), 1
+    if following in SMALL_Y:
+        if romaji in ('shi', 'chi', 'ji'):
+            return romaji[:-1] + SMALL_Y[following], 2
+        return romaji[:-1] + 'y' + SMALL_Y[following], 2
+    if following in SMALL_VOWELS:
+        return ('w' if romaji == 'u' else romaji[:-1]) + SMALL_VOWELS[following], 2
+    return romaji, 1
+
+
+def transliterate(text):
+    """Get a Latin spelling of text in Cyrillic, kana or other scripts.
+
+    @param text: text in any script
+    @return: lowercase text with only Latin letters and other characters
+    """
+    chars = [_hiragana(char) for char in unicodedata.normalize('NFKC', text).lower()]
+    parts = []
+    index = 0
+    while index < len(chars):
+        char = chars[index]
+        if char in CYRILLIC:
+            parts.append(CYRILLIC[char])
+        elif char == LONG:
+            pass  # long vowels are usually written without a mark
+        elif 'ぁ' <= char <= 'ゟ':
+            romaji, used = _kana(chars, index)
+            parts.append(romaji)
+            index += used
+            continue
+        elif char == '・':  # katakana middle dot separates words
+            parts.append(' ')
+        else:
+            parts.append(char)
+        index += 1
+    return ''.join(parts)
+
+
+def fold(text):
+    """Get text without accents or special Latin letters.
+
+    @param text: text in the Latin script
+    @return: lowercase text (other scripts are passed to unidecode if installed)
+    """
+    chars = []
+    for char in unicodedata.normalize('NFKD', text.lower()):
+        if unicodedata.combining(char):
+            continue
+        char = LETTERS.get(char, char)
+        if unidecode and not char.isascii():
+            char = unidecode(char).lower()
+        chars.append(char)
+    return ''.join(chars)
+
+
+def key(name):
+    """Get a cached Latin key for a name in any script.
+
+    The key is computed once per distinct name and normalized like other
+    keys (lowercase, joiners replaced, articles stripped), so it can be
+    used as a blocking key and compared for equality.
+
+    @param name: name to transliterate
+    @return: normalized Latin text
+    """
+    return _key(name or "")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _key(name):
+    """Transliterate, fold and normalize a name."""
+    return normalize(fold(transliterate(name)))
+
+
+def enabled():
+    """Determine if names are compared by their Latin keys."""
+    return config.current().TRANSLITERATE
+
+
+config.subscribe(FIELDS, _key.cache_clear)
+metrics.cache('translit', _key)
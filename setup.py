@@ -25,7 +25,7 @@ setuptools.setup(
 
     packages=setuptools.find_packages(),
 
-    entry_points={'console_scripts': []},
+    entry_points={'console_scripts': ['enharmony = enharmony.cli:main']},
     scripts=["bin/demo_lastfm.py"],
 
     long_description=(README + '\n' + CHANGES),